@@ -2,6 +2,10 @@ from fastapi import FastAPI
 from pydantic import BaseModel
 from typing import List
 
+# The heuristic rules engine and its rule table ship in the claimwatch-rules
+# package, shared with ml/app.py and ml/app_explainable.py
+from claimwatch_rules import RuleEngine
+
 
 class ClaimInput(BaseModel):
   policy_state: str
@@ -52,6 +56,7 @@ class PredictionOutput(BaseModel):
 
 
 app = FastAPI(title="Fraud Detection ML API")
+heuristic_rules = RuleEngine()
 
 
 @app.get("/")
@@ -62,83 +67,14 @@ def read_root():
 @app.post("/predict", response_model=PredictionOutput)
 def predict_claim(data: ClaimInput):
   # Simple heuristic using categorical and numeric fields to derive risk
-  score = 0
-
-  # Higher coverage limits can indicate higher exposure
-  if data.policy_csl in {"500/1000", "250/500"}:
-    score += 10
-
-  # Occupations with more financial exposure
-  risky_jobs = {
-    "exec-managerial",
-    "prof-specialty",
-    "sales",
-    "armed-forces",
-  }
-  if data.insured_occupation in risky_jobs:
-    score += 10
-
-  # Risky hobbies
-  risky_hobbies = {
-    "skydiving",
-    "base-jumping",
-    "bungie-jumping",
-    "yachting",
-    "polo",
-    "cross-fit",
-  }
-  if data.insured_hobbies in risky_hobbies:
-    score += 15
-
-  # Severe incidents
-  if data.incident_severity in {"Total Loss", "Major Damage"}:
-    score += 25
-
-  # Certain incident types generally higher risk
-  if data.incident_type in {
-    "Multi-vehicle Collision",
-    "Vehicle Theft",
-  }:
-    score += 15
-
-  # Questionable collision / damage reporting
-  if data.collision_type == "?":
-    score += 10
-  if data.property_damage == "Yes" and data.police_report_available == "No":
-    score += 15
-
-  # Reported as fraud by someone
-  if data.fraud_reported == "Yes":
-    score += 20
-
-  # Incorporate numeric dimensions
-  if data.total_claim_amount > 20000:
-    score += 20
-  if data.witnesses == 0:
-    score += 5
-  if data.number_of_vehicles_involved > 2:
-    score += 5
-  if data.injury_claim > 10000 or data.property_claim > 10000 or data.vehicle_claim > 15000:
-    score += 10
+  scores = heuristic_rules.score([data])
 
   # Bound and convert score to probability
-  score = max(0, min(100, score))
-  prob = float(round(score / 100.0, 2))
-  fraud_flag = 1 if prob >= 0.5 else 0
+  prob = float(round(scores.probability[0], 2))
+  fraud_flag = int(scores.fraud[0])
   risk_score = int(round(prob * 100))
 
-  reasons: List[str] = []
-  if data.incident_severity in {"Total Loss", "Major Damage"}:
-    reasons.append(f"Incident severity is {data.incident_severity}")
-  if data.insured_hobbies in risky_hobbies:
-    reasons.append(f"Risky hobby: {data.insured_hobbies}")
-  if data.incident_type in {"Multi-vehicle Collision", "Vehicle Theft"}:
-    reasons.append(f"High-risk incident type: {data.incident_type}")
-  if data.property_damage == "Yes" and data.police_report_available == "No":
-    reasons.append("Property damage without police report")
-  if data.fraud_reported == "Yes":
-    reasons.append("Fraud already reported flag is Yes")
-
+  reasons: List[str] = scores.reasons(0)
   if not reasons:
     reasons.append("No strong fraud indicators")
 
@@ -0,0 +1,9 @@
+"""
+ClaimWatch heuristic rules: the rule table (rules.json) and the engine
+that scores claims with it. Shared by ml/app.py, ml/app_explainable.py
+and backend/ml-api/app.py, so every API scores with the same rules.
+"""
+
+from claimwatch_rules.rules import RULES_PATH, RuleEngine, RuleScores, RuleSet
+
+__all__ = ["RULES_PATH", "RuleEngine", "RuleScores", "RuleSet"]
@@ -0,0 +1,409 @@
+"""
+Heuristic rules engine
+The rule table (rules.json) is data. Each rule ANDs ("when") or ORs
+("any") field predicates and carries a score weight, a confidence step
+and optional reason / contributing-factor templates:
+
+    {"name": "high_claim_amount",
+     "when": [{"field": "total_claim_amount", "gt": 20000}],
+     "weight": 20, "confidence": 0.10,
+     "reason": "High claim amount: ${total_claim_amount}",
+     "factor": "High Claim Amount (${total_claim_amount})", "importance": 0.20}
+
+Predicates: in, eq, ne, gt, ge, lt, le. A table is compiled once into a
+RuleSet, which scores a whole batch with one NumPy mask per predicate:
+score = clip(sum of hit weights, 0, 100), probability = score / 100.
+Batches of up to SCALAR_BATCH claims take a plain-Python path with the
+same results. Fields a batch doesn't carry never match.
+
+ml/app.py, ml/app_explainable.py and backend/ml-api/app.py all score
+with RuleEngine, which re-reads the table when the file changes
+(RULES_PATH, checked at most every RULES_RELOAD_INTERVAL seconds).
+
+Usage (from ml/):
+    python -m claimwatch_rules.rules                   # check rules.json, measure claims/s
+    python -m claimwatch_rules.rules --rows 2000000
+"""
+
+import hashlib
+import json
+import logging
+import operator
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+RULES_PATH = os.getenv("RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules.json"))
+RULES_RELOAD_INTERVAL = float(os.getenv("RULES_RELOAD_INTERVAL", "2"))
+
+# Child of the APIs' "claimwatch" logger, so it shares their handler and level
+log = logging.getLogger("claimwatch.rules")
+
+# Work on scalars and, elementwise, on NumPy columns
+OPS = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "gt": operator.gt,
+    "ge": operator.ge,
+    "lt": operator.lt,
+    "le": operator.le,
+}
+
+# Batches up to this size are scored in plain Python; NumPy's per-call
+# overhead only pays off on larger ones
+SCALAR_BATCH = 8
+
+
+# ============================================
+# Rule Table
+# ============================================
+
+@dataclass(frozen=True)
+class Predicate:
+    field: str
+    op: str
+    value: Any          # frozenset for "in"
+    numeric: bool       # compare as floats (operands are numbers) or as text
+
+    def mask(self, column: np.ndarray) -> np.ndarray:
+        if self.op == "in":
+            if column.dtype == object:
+                return np.fromiter(map(self.value.__contains__, column), dtype=bool, count=len(column))
+            return np.isin(column, list(self.value))
+        return OPS[self.op](column, self.value)
+
+    def test(self, value: Any) -> bool:
+        """mask() for a single value"""
+        if self.numeric:
+            value = _to_float(value)
+        elif value.__class__ is not str:
+            value = str(value)
+        if self.op == "in":
+            return value in self.value
+        return OPS[self.op](value, self.value)
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    predicates: Tuple[Predicate, ...]
+    any: bool
+    weight: float
+    confidence: float
+    reason: str = ""
+    factor: str = ""
+    importance: float = 0.0
+
+    def fires(self, values: Mapping[str, Any]) -> bool:
+        """Whether the rule matches one claim's values (field -> value)"""
+        for p in self.predicates:
+            hit = p.field in values and p.test(values[p.field])
+            if hit == self.any:
+                return hit
+        return not self.any
+
+
+def parse_predicate(spec: dict) -> Predicate:
+    ops = [op for op in spec if op != "field"]
+    if "field" not in spec or len(ops) != 1 or ops[0] not in OPS and ops[0] != "in":
+        raise ValueError(f"bad predicate {spec}: needs a field and one of in, {', '.join(OPS)}")
+    op = ops[0]
+    operands = spec[op] if op == "in" else [spec[op]]
+    numeric = all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in operands)
+    value = frozenset(operands) if op == "in" else spec[op]
+    return Predicate(spec["field"], op, value, numeric)
+
+
+def parse_rule(spec: dict) -> Rule:
+    if ("when" in spec) == ("any" in spec):
+        raise ValueError(f"rule {spec.get('name')!r} needs exactly one of 'when' / 'any'")
+    clauses = spec.get("when") or spec.get("any")
+    if not clauses:
+        raise ValueError(f"rule {spec.get('name')!r} has no predicates")
+    return Rule(
+        name=spec["name"],
+        predicates=tuple(parse_predicate(clause) for clause in clauses),
+        any="any" in spec,
+        weight=float(spec["weight"]),
+        confidence=float(spec.get("confidence", 0.0)),
+        reason=spec.get("reason", ""),
+        factor=spec.get("factor", ""),
+        importance=float(spec.get("importance", 0.0)),
+    )
+
+
+# ============================================
+# Compiled Rule Set
+# ============================================
+
+class _Row(Mapping):
+    """One claim's raw values, for filling reason / factor templates"""
+
+    def __init__(self, columns: Dict[str, Sequence], i: int):
+        self.columns = columns
+        self.i = i
+
+    def __getitem__(self, field: str) -> Any:
+        value = self.columns[field][self.i]
+        return value.item() if isinstance(value, np.generic) else value
+
+    def __iter__(self):
+        return iter(self.columns)
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+
+@dataclass
+class RuleScores:
+    """Rule hits for a batch; reasons / factors are filled in on request"""
+    rules: "RuleSet"
+    columns: Dict[str, Sequence]  # raw values by field
+    hits: np.ndarray          # (rules, claims) bool
+    score: np.ndarray         # 0-100
+    probability: np.ndarray
+    fraud: np.ndarray
+    confidence: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.score)
+
+    def fired(self, i: int) -> List[Rule]:
+        return [self.rules.rules[j] for j in np.flatnonzero(self.hits[:, i])]
+
+    def reasons(self, i: int) -> List[str]:
+        row = _Row(self.columns, i)
+        return [rule.reason.format_map(row) for rule in self.fired(i) if rule.reason]
+
+    def factors(self, i: int) -> List[dict]:
+        row = _Row(self.columns, i)
+        return [
+            {"feature": rule.factor.format_map(row), "importance": rule.importance}
+            for rule in self.fired(i) if rule.factor
+        ]
+
+
+class RuleSet:
+    """A rule table compiled to weight / confidence vectors"""
+
+    def __init__(self, table: dict, source: str = ""):
+        self.source = source
+        self.version = table.get("version")
+        # Content hash: changes with any edit, even without a version bump
+        self.digest = hashlib.blake2b(json.dumps(table, sort_keys=True).encode(), digest_size=8).hexdigest()
+        self.fraud_threshold = float(table.get("fraud_threshold", 0.5))
+        self.base_confidence = float(table.get("base_confidence", 0.5))
+        self.max_confidence = float(table.get("max_confidence", 0.85))
+        self.rules = [parse_rule(spec) for spec in table["rules"]]
+        self.weights = np.array([rule.weight for rule in self.rules])
+        self.confidences = np.array([rule.confidence for rule in self.rules])
+        predicates = [p for rule in self.rules for p in rule.predicates]
+        self.fields = sorted({p.field for p in predicates})
+        self.numeric_fields = {p.field for p in predicates if p.numeric}
+        self.text_fields = {p.field for p in predicates if not p.numeric}
+        self._getters: Dict[type, tuple] = {}
+
+    @classmethod
+    def load(cls, path: str) -> "RuleSet":
+        with open(path) as f:
+            return cls(json.load(f), source=path)
+
+    def score(self, claims: Sequence[Any]) -> RuleScores:
+        """Score claim objects (pydantic models) or dicts; the first claim decides which fields exist"""
+        first = claims[0] if len(claims) else {}
+        if isinstance(first, Mapping):
+            fields = [f for f in self.fields if f in first]
+            rows = [tuple(claim.get(f) for f in fields) for claim in claims]
+        else:
+            fields, get = self._getter(first)
+            rows = list(map(get, claims))
+        if len(claims) <= SCALAR_BATCH:
+            return self._score_rows(fields, rows)
+        # Object arrays: building fixed-width str arrays costs more than the masks
+        text_only = self.text_fields - self.numeric_fields
+        columns = {
+            f: np.array(values, dtype=object) if f in text_only else values
+            for f, values in zip(fields, zip(*rows))
+        }
+        return self.score_columns(columns, len(claims))
+
+    def _getter(self, claim: Any) -> tuple:
+        """Fields claims of this class carry, and a function reading them off one claim as a tuple"""
+        cls = type(claim)
+        if cls not in self._getters:
+            fields = [f for f in self.fields if hasattr(claim, f)]
+            get = operator.attrgetter(*fields) if len(fields) > 1 else lambda claim: tuple(getattr(claim, f) for f in fields)
+            self._getters[cls] = (fields, get)
+        return self._getters[cls]
+
+    def score_columns(self, columns: Mapping[str, Any], n: Optional[int] = None) -> RuleScores:
+        """Score a columnar batch: a DataFrame or a dict of field -> values"""
+        raw = {}
+        for field in self.fields:
+            values = columns.get(field) if field in columns else None
+            if values is not None:
+                raw[field] = np.asarray(values)
+        if n is None:
+            n = len(next(iter(raw.values()))) if raw else 0
+
+        numeric = {f: _as_float(raw[f]) for f in self.numeric_fields if f in raw}
+        text = {f: _as_text(raw[f]) for f in self.text_fields if f in raw}
+        hits = np.zeros((len(self.rules), n), dtype=bool)
+        for j, rule in enumerate(self.rules):
+            masks = []
+            for p in rule.predicates:
+                column = (numeric if p.numeric else text).get(p.field)
+                masks.append(p.mask(column) if column is not None else np.zeros(n, dtype=bool))
+            hits[j] = np.logical_or.reduce(masks) if rule.any else np.logical_and.reduce(masks)
+        score = np.clip(self.weights @ hits, 0, 100)
+        confidence = np.minimum(self.max_confidence, self.base_confidence + self.confidences @ hits)
+        return self._result(raw, hits, score, confidence)
+
+    def _score_rows(self, fields: List[str], rows: List[tuple]) -> RuleScores:
+        """score_columns() in plain Python, one claim at a time, for small batches"""
+        fired, score, confidence = [], [], []
+        for row in rows:
+            values = dict(zip(fields, row))
+            hits = [rule.fires(values) for rule in self.rules]
+            weight, step = 0.0, 0.0
+            for rule, hit in zip(self.rules, hits):
+                if hit:
+                    weight += rule.weight
+                    step += rule.confidence
+            fired.append(hits)
+            score.append(min(100.0, max(0.0, weight)))
+            confidence.append(min(self.max_confidence, self.base_confidence + step))
+        columns = dict(zip(fields, zip(*rows))) if rows else {}
+        hits = np.array(fired, dtype=bool).reshape(len(rows), len(self.rules)).T
+        return self._result(columns, hits, np.array(score), np.array(confidence))
+
+    def _result(self, columns: Dict[str, Sequence], hits: np.ndarray, score: np.ndarray, confidence: np.ndarray) -> RuleScores:
+        probability = score / 100.0
+        return RuleScores(
+            rules=self,
+            columns=columns,
+            hits=hits,
+            score=score,
+            probability=probability,
+            fraud=(probability >= self.fraud_threshold).astype(int),
+            confidence=confidence,
+        )
+
+
+def _as_float(values: np.ndarray) -> np.ndarray:
+    """float64 column; entries that don't convert become NaN and match nothing"""
+    try:
+        return values.astype(np.float64)
+    except (ValueError, TypeError):
+        return np.array([_to_float(value) for value in values], dtype=np.float64)
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def _as_text(values: np.ndarray) -> np.ndarray:
+    return values if values.dtype.kind in "UO" else values.astype(str)
+
+
+# ============================================
+# Hot Reload
+# ============================================
+
+class RuleEngine:
+    """
+    RuleSet loaded from RULES_PATH. A call that finds the file changed
+    (checked at most every reload_interval seconds; 0 disables) compiles
+    the new table and swaps it in. A table that fails to parse is logged
+    and the previous rules stay active.
+    """
+
+    def __init__(self, path: str = RULES_PATH, reload_interval: float = RULES_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._mtime = os.stat(path).st_mtime_ns
+        self._checked = time.monotonic()
+        self.rules = RuleSet.load(path)
+        self.reloads = 0
+
+    def current(self) -> RuleSet:
+        if self.reload_interval > 0 and time.monotonic() - self._checked >= self.reload_interval:
+            self.reload()
+        return self.rules
+
+    def reload(self, force: bool = False) -> bool:
+        """Swap in the table on disk if it changed; True if it did"""
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            self._checked = time.monotonic()
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError as e:
+                log.warning("⚠️ Rule table %s not readable, keeping version %s: %s", self.path, self.rules.version, e)
+                return False
+            if mtime == self._mtime and not force:
+                return False
+            # Remember the mtime even if the table is broken, so it's reported once
+            self._mtime = mtime
+            try:
+                rules = RuleSet.load(self.path)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                log.warning("⚠️ Rule table %s not reloaded, keeping version %s: %s", self.path, self.rules.version, e)
+                return False
+            self.rules = rules
+            self.reloads += 1
+            log.info("🔁 Rule table reloaded: %d rules, version %s", len(rules.rules), rules.version)
+            return True
+        finally:
+            self._lock.release()
+
+    def score(self, claims: Sequence[Any]) -> RuleScores:
+        return self.current().score(claims)
+
+    def score_columns(self, columns: Mapping[str, Any], n: Optional[int] = None) -> RuleScores:
+        return self.current().score_columns(columns, n)
+
+    def info(self) -> dict:
+        rules = self.rules
+        return {"path": self.path, "version": rules.version, "digest": rules.digest, "rules": len(rules.rules), "reloads": self.reloads}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Check the rule table and measure scoring throughput")
+    parser.add_argument("csv", nargs="?", default="insurance_claims.csv")
+    parser.add_argument("--rules", default=RULES_PATH)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rules = RuleSet.load(args.rules)
+    print(f"✅ {args.rules}: {len(rules.rules)} rules over {len(rules.fields)} fields, version {rules.version}")
+
+    df = pd.read_csv(args.csv, keep_default_na=False)
+    frame = df.iloc[np.arange(args.rows) % len(df)].reset_index(drop=True)
+    start = time.perf_counter()
+    scores = rules.score_columns(frame)
+    columnar = time.perf_counter() - start
+
+    records = df.to_dict("records")
+    start = time.perf_counter()
+    rules.score(records)
+    per_record = time.perf_counter() - start
+
+    print(f"📊 columnar:   {args.rows:,} claims in {columnar:.3f}s = {args.rows / columnar:,.0f} claims/s")
+    print(f"📊 dicts:      {len(records):,} claims in {per_record:.3f}s = {len(records) / per_record:,.0f} claims/s")
+    print(f"   mean score {scores.score.mean():.1f}, flagged {scores.fraud.mean() * 100:.1f}%")
+    for rule, rate in zip(rules.rules, scores.hits.mean(axis=1)):
+        print(f"   {rule.name:<32} +{rule.weight:>4.0f}  fires on {rate * 100:5.1f}%")
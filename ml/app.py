@@ -5,9 +5,13 @@ import pandas as pd
 from typing import List
 from datetime import datetime
 
+from claimwatch_rules import RuleEngine
+
 app = FastAPI(title="Fraud Detection ML API")
 
 # Heuristic-based fraud detection - no ML model files needed
+# Rules live in the claimwatch-rules package, shared with app_explainable.py and backend/ml-api
+heuristic_rules = RuleEngine()
 
 
 # Input Schema
@@ -84,79 +88,14 @@ def root():
 @app.post("/predict", response_model=PredictionOutput)
 def predict_claim(data: ClaimInput):
     # Heuristic-based fraud detection (no encoder dependencies)
-    score = 0
-
-    # Higher coverage limits can indicate higher exposure
-    if data.policy_csl in {"500/1000", "250/500"}:
-        score += 10
-
-    # Occupations with more financial exposure
-    risky_jobs = {
-        "exec-managerial",
-        "prof-specialty",
-        "sales",
-        "armed-forces",
-    }
-    if data.insured_occupation in risky_jobs:
-        score += 10
-
-    # Risky hobbies
-    risky_hobbies = {
-        "skydiving",
-        "base-jumping",
-        "bungie-jumping",
-        "yachting",
-        "polo",
-        "cross-fit",
-    }
-    if data.insured_hobbies in risky_hobbies:
-        score += 15
-
-    # Severe incidents
-    if data.incident_severity in {"Total Loss", "Major Damage"}:
-        score += 25
-
-    # Certain incident types generally higher risk
-    if data.incident_type in {
-        "Multi-vehicle Collision",
-        "Vehicle Theft",
-    }:
-        score += 15
-
-    # Questionable collision / damage reporting
-    if data.collision_type == "?":
-        score += 10
-    if data.property_damage == "Yes" and data.police_report_available == "No":
-        score += 15
-
-    # Incorporate numeric dimensions
-    if data.total_claim_amount > 20000:
-        score += 20
-    if data.witnesses == 0:
-        score += 5
-    if data.number_of_vehicles_involved > 2:
-        score += 5
-    if data.injury_claim > 10000 or data.property_claim > 10000 or data.vehicle_claim > 15000:
-        score += 10
+    scores = heuristic_rules.score([data])
 
     # Bound and convert score to probability
-    score = max(0, min(100, score))
-    prob = float(round(score / 100.0, 3))
-    fraud_flag = 1 if prob >= 0.5 else 0
+    prob = float(round(scores.probability[0], 3))
+    fraud_flag = int(scores.fraud[0])
     risk_score = int(round(prob * 100))
 
-    reasons = []
-    if data.incident_severity in {"Total Loss", "Major Damage"}:
-        reasons.append(f"Incident severity is {data.incident_severity}")
-    if data.insured_hobbies in risky_hobbies:
-        reasons.append(f"Risky hobby: {data.insured_hobbies}")
-    if data.incident_type in {"Multi-vehicle Collision", "Vehicle Theft"}:
-        reasons.append(f"High-risk incident type: {data.incident_type}")
-    if data.property_damage == "Yes" and data.police_report_available == "No":
-        reasons.append("Property damage without police report")
-    if data.total_claim_amount > 20000:
-        reasons.append(f"High claim amount: ${data.total_claim_amount}")
-
+    reasons = scores.reasons(0)
     if not reasons:
         reasons.append("No strong fraud indicators")
 
@@ -169,15 +108,7 @@ def predict_claim(data: ClaimInput):
         status = "Low Risk"
 
     # Calculate contributing factors
-    top_factors = []
-    if data.incident_severity in {"Total Loss", "Major Damage"}:
-        top_factors.append({"feature": f"Incident Severity ({data.incident_severity})", "importance": 0.25})
-    if data.insured_hobbies in risky_hobbies:
-        top_factors.append({"feature": f"Risky Hobby ({data.insured_hobbies})", "importance": 0.15})
-    if data.total_claim_amount > 20000:
-        top_factors.append({"feature": f"High Claim Amount (${data.total_claim_amount})", "importance": 0.20})
-    if data.property_damage == "Yes" and data.police_report_available == "No":
-        top_factors.append({"feature": "Property Damage without Police Report", "importance": 0.15})
+    top_factors = scores.factors(0)
 
     return PredictionOutput(
         fraud=fraud_flag,
@@ -3,84 +3,490 @@ Explainable AI Fraud Detection System
 With SHAP, Feature Importance, and Anomaly Detection
 """
 
-from fastapi import FastAPI
-from pydantic import BaseModel
+import time
+_import_start = time.perf_counter()
+
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, ValidationError, model_validator
+from starlette.requests import ClientDisconnect
+import asyncio
+import hmac
+import json
+import logging
+import os
 import pickle
-import pandas as pd
+import random
+import threading
 import numpy as np
-from typing import List, Dict
-from datetime import datetime
-import shap
-from sklearn.ensemble import IsolationForest
+from typing import Any, AsyncIterator, List, Dict, Optional, Tuple
 import warnings
 warnings.filterwarnings("ignore")
 
+from claimwatch_rules import RuleEngine
+
+from batcher import MicroBatcher
+from bundle import BUNDLE_PATH, load_model_bundle
+from cache import PredictionCache, artifact_fingerprint
+from cascade import Cascade, screen_result
+from compiled_trees import SmallBatchRouter, compile_trees, compile_xgboost
+from encoding import compile_encoders
+from ensemble import EnsembleEngine
+from explain import LocalExplainer, XGBoostContributions
+from features import FeatureBuilder
+from lazy import LazyModel
+from logs import get_logger, sampled
+from metrics import (
+    LATENCY_BUCKETS, Counter, PhaseTimer, histogram_samples, metric_family, process_memory, timings
+)
+from profiling import ProfileStore, StackProfile
+from registry import REGISTRY_PATH, ModelRegistry
+
+# Startup time breakdown, served by GET /startup
+startup = PhaseTimer()
+startup.record("imports", time.perf_counter() - _import_start)
+
+log = get_logger("api")
+
+# ============================================
+# Request Metrics
+# ============================================
+
+# Exposed by GET /metrics together with the stage / model timings
+predictions = Counter("claimwatch_predictions_total", "Claims answered, by scoring path", ["path"])
+http_requests = Counter("claimwatch_http_requests_total", "HTTP requests, by route and status", ["path", "method", "status"])
+
+
+class TimedRequest(Request):
+    async def json(self) -> Any:
+        """Request body as JSON; decoding is timed as stage.parse"""
+        if not hasattr(self, "_json"):
+            body = await self.body()
+            start = time.perf_counter()
+            self._json = json.loads(body)
+            timings.observe("stage.parse", time.perf_counter() - start)
+        return self._json
+
+
+class TimedRoute(APIRoute):
+    """Times every request (http.<route>) and counts responses by status"""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        path = self.path_format
+
+        async def timed_handler(request: Request) -> Response:
+            start = time.perf_counter()
+            status = 500
+            try:
+                response = await handler(TimedRequest(request.scope, request.receive))
+                status = response.status_code
+                return response
+            except HTTPException as e:
+                status = e.status_code
+                raise
+            except RequestValidationError:
+                status = 422
+                raise
+            finally:
+                timings.observe(f"http.{path}", time.perf_counter() - start)
+                http_requests.inc(path, request.method, str(status))
+
+        return timed_handler
+
+
+def json_response(output: BaseModel) -> Response:
+    """
+    Response body without None fields (same bytes as response_model_exclude_none),
+    timed as stage.serialization
+    """
+    start = time.perf_counter()
+    body = output.model_dump_json(exclude_none=True)
+    timings.observe("stage.serialization", time.perf_counter() - start)
+    return Response(body, media_type="application/json")
+
+
 app = FastAPI(title="Explainable Fraud Detection ML API")
+app.router.route_class = TimedRoute
 
 # ============================================
 # Load Models & Artifacts
 # ============================================
 
-model = None
-xgb_model = None
-dt_model = None
-scaler = None
-feature_names = None
-feature_importance = None
-models_loaded = False
-
-try:
-    import os
-    print(f"Current directory: {os.getcwd()}")
-    print(f"Files in directory: {os.listdir('.')}")
-    
-    if os.path.exists("fraud_model.pkl"):
-        model = pickle.load(open("fraud_model.pkl", "rb"))
-        print("✅ RandomForest model loaded")
-    else:
-        print("⚠️  fraud_model.pkl not found")
-    
-    if os.path.exists("scaler.pkl"):
-        scaler = pickle.load(open("scaler.pkl", "rb"))
-        print("✅ Scaler loaded")
-    else:
-        print("⚠️  scaler.pkl not found")
-    
-    if os.path.exists("feature_names.pkl"):
-        feature_names = pickle.load(open("feature_names.pkl", "rb"))
-        print(f"✅ Feature names loaded ({len(feature_names)} features)")
-    else:
-        print("⚠️  feature_names.pkl not found")
-    
-    if os.path.exists("feature_importance.pkl"):
-        feature_importance = pickle.load(open("feature_importance.pkl", "rb"))
-        print("✅ Feature importance loaded")
-    else:
-        print("⚠️  feature_importance.pkl not found")
-    
-    if os.path.exists("xgb_model.pkl"):
-        xgb_model = pickle.load(open("xgb_model.pkl", "rb"))
-        print("✅ XGBoost model loaded")
-    else:
-        print("⚠️  xgb_model.pkl not found")
-    
-    if os.path.exists("dt_model.pkl"):
-        dt_model = pickle.load(open("dt_model.pkl", "rb"))
-        print("✅ Decision Tree model loaded")
-    else:
-        print("⚠️  dt_model.pkl not found")
-    
-    # Check if we have minimum requirements
-    if model and scaler and feature_names:
-        models_loaded = True
-        print("✅ ALL CORE MODELS LOADED - Running in ML Mode")
-    else:
-        print("⚠️  Running in Heuristic Fallback Mode")
+# The registry's active version is served; without a registry the bundle
+# file written by model.py, and without that the .pkl files
+MODEL_REGISTRY = os.getenv("MODEL_REGISTRY", REGISTRY_PATH)
+MODEL_BUNDLE = os.getenv("MODEL_BUNDLE", BUNDLE_PATH)
+ARTIFACT_FILES = [
+    "fraud_model.pkl", "xgb_model.pkl", "dt_model.pkl", "scaler.pkl",
+    "feature_names.pkl", "encoders.pkl", "anomaly_model.pkl"
+]
+
+registry = ModelRegistry(MODEL_REGISTRY)
+
+
+class ModelSet:
+    """
+    One loaded model version and everything built from it. Requests read
+    the active set once, so a hot swap never mixes two versions.
+    """
+
+    def __init__(
+        self,
+        version: str,
+        source: str,
+        feature_names: Optional[List[str]] = None,
+        scaler: Any = None,
+        category_tables: Optional[Dict] = None,
+        rf: Any = None,
+        dt: Any = None,
+        xgb_compiled: Any = None,
+        xgb_model: Any = None,
+        anomaly_model: Any = None,
+        rf_importances: Optional[np.ndarray] = None,
+        phases: Optional[PhaseTimer] = None
+    ):
+        self.version = version
+        self.source = source
+        self.feature_names = feature_names
+        self.scaler = scaler
+        self.xgb_model = xgb_model
+        self.anomaly_model = anomaly_model
+        self.phases = phases or PhaseTimer()
+        self.loaded = rf is not None and scaler is not None and bool(feature_names)
+        self.feature_builder = None
+        self.explainer = None
+        self.global_importances = []
+
+        # Claims -> scaled float32 rows without going through pandas
+        try:
+            if self.loaded:
+                self.feature_builder = FeatureBuilder(feature_names, scaler, category_tables or {})
+        except Exception as e:
+            log.error(f"❌ Error preparing feature builder: {e}")
+            self.loaded = False
+
+        # Each member is evaluated once per request/batch. Small XGBoost batches
+        # use the compiled trees, larger ones xgboost itself once it has loaded
+        self.ensemble = EnsembleEngine({
+            "RandomForest": rf,
+            "XGBoost": SmallBatchRouter(xgb_compiled, xgb_model) if xgb_compiled is not None else xgb_model,
+            "DecisionTree": dt
+        })
+
+        if not self.loaded:
+            return
+
+        # Per-claim TreeSHAP / path contributions over the same members
+        try:
+            with self.phases.phase("explainer"):
+                self.explainer = LocalExplainer(feature_names, {
+                    **self.ensemble.models,
+                    "XGBoost": XGBoostContributions(xgb_model) if xgb_model is not None else None
+                })
+            log.info(f"✅ Local explainer ready ({', '.join(self.explainer.members)})")
+        except Exception as e:
+            log.warning(f"⚠️  Local explanations unavailable, using global importances: {e}")
+
+        # Global top features from the Random Forest (fallback explanation)
+        if rf_importances is not None:
+            top = np.argsort(rf_importances)[::-1][:5]
+            self.global_importances = [(feature_names[i], float(rf_importances[i])) for i in top]
+
+    def lazy_models(self) -> List[LazyModel]:
+        return [m for m in (self.xgb_model, self.anomaly_model) if isinstance(m, LazyModel)]
+
+    def warm_up(self, predict: bool = False) -> None:
+        """
+        Load deferred models; with predict=True also push one row through
+        every stage so the first real request finds everything paged in
+        """
+        for lazy_model in self.lazy_models():
+            try:
+                lazy_model.get()
+                log.info(f"✅ {lazy_model.name} loaded ({lazy_model.load_seconds * 1000:.0f} ms)")
+            except Exception as e:
+                log.warning(f"⚠️  {lazy_model.name} failed to load: {e}")
+
+        if predict and self.loaded:
+            X = np.zeros((1, len(self.feature_names)), dtype=np.float32)
+            ensemble = self.ensemble.predict(X)
+            if self.explainer is not None:
+                self.explainer.explain(X, list(ensemble.probabilities))
+            if self.anomaly_model is not None:
+                self.anomaly_model.score_samples(X)
+
+
+def load_bundle_models(path: str, version: Optional[str] = None, phases: Optional[PhaseTimer] = None) -> ModelSet:
+    """ModelSet from a memory-mapped bundle (xgboost / sklearn stay unloaded)"""
+    phases = phases or PhaseTimer()
+    with phases.phase("bundle"):
+        artifacts = load_model_bundle(path)
+    log.info(f"✅ Model bundle loaded ({path}, version {version or artifacts.version}, {len(artifacts.feature_names)} features)")
+    return ModelSet(
+        version or artifacts.version,
+        path,
+        feature_names=artifacts.feature_names,
+        scaler=artifacts.scaler,
+        category_tables=artifacts.category_tables,
+        rf=artifacts.rf_compiled,
+        dt=artifacts.dt_compiled,
+        xgb_compiled=artifacts.xgb_compiled,
+        xgb_model=artifacts.xgb_model,
+        anomaly_model=artifacts.anomaly_model,
+        rf_importances=artifacts.feature_importances,
+        phases=phases
+    )
+
+
+def load_pickle_models(phases: PhaseTimer) -> ModelSet:
+    """ModelSet from the individual .pkl files written by model.py"""
+    model = None
+    xgb_model = None
+    dt_model = None
+    scaler = None
+    feature_names = None
+    anomaly_model = None
+    category_tables = {}
+    version = "2.0-XAI"
+
+    try:
+        if os.path.exists("fraud_model.pkl"):
+            with phases.phase("load.fraud_model"):
+                model = pickle.load(open("fraud_model.pkl", "rb"))
+            log.info("✅ RandomForest model loaded")
+        else:
+            log.warning("⚠️  fraud_model.pkl not found")
+        
+        if os.path.exists("scaler.pkl"):
+            with phases.phase("load.scaler"):
+                scaler = pickle.load(open("scaler.pkl", "rb"))
+            log.info("✅ Scaler loaded")
+        else:
+            log.warning("⚠️  scaler.pkl not found")
+        
+        if os.path.exists("feature_names.pkl"):
+            with phases.phase("load.feature_names"):
+                feature_names = pickle.load(open("feature_names.pkl", "rb"))
+            log.info(f"✅ Feature names loaded ({len(feature_names)} features)")
+        else:
+            log.warning("⚠️  feature_names.pkl not found")
+        
+        if os.path.exists("xgb_model.pkl"):
+            with phases.phase("load.xgb_model"):
+                xgb_model = pickle.load(open("xgb_model.pkl", "rb"))
+            log.info("✅ XGBoost model loaded")
+        else:
+            log.warning("⚠️  xgb_model.pkl not found")
+        
+        if os.path.exists("dt_model.pkl"):
+            with phases.phase("load.dt_model"):
+                dt_model = pickle.load(open("dt_model.pkl", "rb"))
+            log.info("✅ Decision Tree model loaded")
+        else:
+            log.warning("⚠️  dt_model.pkl not found")
+        
+        if os.path.exists("encoders.pkl"):
+            with phases.phase("load.encoders"):
+                category_tables = compile_encoders(pickle.load(open("encoders.pkl", "rb")))
+            log.info(f"✅ Encoders compiled ({len(category_tables)} categorical columns)")
+        else:
+            log.warning("⚠️  encoders.pkl not found")
         
-except Exception as e:
-    print(f"❌ Error loading models: {e}")
-    print("⚠️  Running in Heuristic Fallback Mode")
-    models_loaded = False
+        if os.path.exists("anomaly_model.pkl"):
+            anomaly_model = LazyModel("anomaly_model", lambda: pickle.load(open("anomaly_model.pkl", "rb")))
+        else:
+            log.warning("⚠️  anomaly_model.pkl not found (anomaly scoring disabled, re-run model.py)")
+        
+        with phases.phase("fingerprint"):
+            version = artifact_fingerprint(ARTIFACT_FILES)
+            
+    except Exception as e:
+        log.error(f"❌ Error loading models: {e}")
+
+    # Flat-array versions of the tree models: same probabilities as
+    # sklearn bit for bit, without its per-call overhead
+    rf_compiled = None
+    dt_compiled = None
+    xgb_compiled = None
+    try:
+        with phases.phase("compile"):
+            rf_compiled = compile_trees(model) if model else None
+            dt_compiled = compile_trees(dt_model) if dt_model else None
+            xgb_compiled = compile_xgboost(xgb_model) if xgb_model else None
+        log.info("✅ Tree models compiled for fast inference")
+    except Exception as e:
+        log.warning(f"⚠️  Tree compilation failed, using sklearn inference: {e}")
+
+    with phases.phase("feature_importances"):
+        rf_importances = model.feature_importances_ if model else None
+
+    return ModelSet(
+        version,
+        "pickle files",
+        feature_names=feature_names,
+        scaler=scaler,
+        category_tables=category_tables,
+        rf=rf_compiled or model,
+        dt=dt_compiled or dt_model,
+        xgb_compiled=xgb_compiled,
+        xgb_model=xgb_model,
+        rf_importances=rf_importances,
+        anomaly_model=anomaly_model,
+        phases=phases
+    )
+
+
+def load_initial_models() -> ModelSet:
+    active_version = registry.current()
+    if active_version:
+        try:
+            return load_bundle_models(registry.bundle_path(active_version), active_version, startup)
+        except Exception as e:
+            log.error(f"❌ Error loading registry version {active_version}: {e}")
+    if os.path.exists(MODEL_BUNDLE):
+        try:
+            return load_bundle_models(MODEL_BUNDLE, phases=startup)
+        except Exception as e:
+            log.error(f"❌ Error loading {MODEL_BUNDLE}, falling back to .pkl files: {e}")
+    return load_pickle_models(startup)
+
+
+log.info(f"Current directory: {os.getcwd()}")
+active_models = load_initial_models()
+# Kept in memory so a rollback is a reference flip too
+previous_models: Optional[ModelSet] = None
+
+# Check if we have minimum requirements
+if active_models.loaded:
+    log.info("✅ ALL CORE MODELS LOADED - Running in ML Mode")
+else:
+    log.warning("⚠️  Running in Heuristic Fallback Mode")
+
+# Rule table shared with app.py and backend/ml-api (claimwatch-rules, hot-reloaded)
+heuristic_rules = RuleEngine()
+
+# Repeat submissions of the same claim are answered from memory.
+# Keys include the model version and the rule table, so retraining or
+# editing rules.json never serves stale predictions
+prediction_cache = PredictionCache(
+    max_entries=int(os.getenv("PREDICTION_CACHE_SIZE", "10000")),
+    max_bytes=int(os.getenv("PREDICTION_CACHE_MB", "64")) << 20,
+    ttl_seconds=float(os.getenv("PREDICTION_CACHE_TTL", "600"))
+)
+
+
+def cache_version(models: ModelSet) -> str:
+    """
+    Cache version of results scored with models: the model version plus
+    the rule table's digest (rules feed the cascade screen and the reasons).
+    A reloaded table switches the cache over like a model swap.
+    """
+    version = f"{models.version}+rules.{heuristic_rules.current().digest}"
+    if models is active_models and version != prediction_cache.version:
+        prediction_cache.set_version(version)
+    return version
+
+
+if active_models.loaded and prediction_cache.enabled:
+    log.info(f"✅ Prediction cache ready (version {cache_version(active_models)})")
+
+
+def warm_up_lazy_models():
+    """Load deferred models in the background so the first request doesn't wait"""
+    active_models.warm_up()
+
+
+if active_models.loaded and os.getenv("LAZY_WARMUP", "1") != "0":
+    threading.Thread(target=warm_up_lazy_models, name="model-warmup", daemon=True).start()
+
+# ============================================
+# Model Hot-Swap
+# ============================================
+
+# Admin endpoints are disabled unless ADMIN_TOKEN is set
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+# Seconds between checks of the registry's CURRENT file (0 = off)
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "5"))
+
+swap_lock = threading.Lock()
+
+
+def record_switch(version: str, rollback: bool) -> None:
+    """Point the registry at a version this worker now serves"""
+    if rollback:
+        registry.rollback()
+    else:
+        registry.activate(version)
+
+
+def switch_models(version: str, record: bool = True, rollback: bool = False) -> Dict[str, Any]:
+    """
+    Load and warm a registry version off the request path, then make it
+    active with one reference flip. Requests already holding the old set
+    finish on it. The registry is only updated once the new set is live,
+    so a version that fails to load leaves both untouched. record=False
+    when following another worker's switch; rollback=True records it by
+    popping HISTORY instead of appending to it.
+    """
+    global active_models, previous_models
+
+    with swap_lock:
+        old = active_models
+        # A follower that read CURRENT before a switch recorded meanwhile is stale
+        stale = not record and registry.current() != version
+        if version == old.version or stale:
+            if record:
+                record_switch(version, rollback)
+            return {"active": old.version, "previous": previous_models.version if previous_models else None, "load_ms": 0.0}
+
+        phases = PhaseTimer()
+        if previous_models is not None and previous_models.version == version:
+            new = previous_models
+        else:
+            new = load_bundle_models(registry.bundle_path(version), version, phases)
+            if not new.loaded:
+                raise ValueError(f"Model version {version} is incomplete")
+            with phases.phase("warm_up"):
+                new.warm_up(predict=True)
+
+        active_models = new
+        previous_models = old
+        cache_version(new)
+        if record:
+            record_switch(version, rollback)
+
+    log.info(f"🔄 Model version {old.version} -> {new.version} ({phases.total_ms()} ms: {phases.snapshot()})")
+    return {"active": new.version, "previous": old.version, "load_ms": phases.total_ms(), "phases_ms": phases.snapshot()}
+
+
+def watch_registry(interval: float) -> None:
+    """Follow the registry's CURRENT pointer (e.g. set by another worker or model.py)"""
+    failed_version = None
+    while True:
+        time.sleep(interval)
+        version = None
+        try:
+            version = registry.current()
+            if version and version != active_models.version and version != failed_version:
+                switch_models(version, record=False)
+        except Exception as e:
+            if version is None:
+                # Missing or half-written CURRENT: retry on the next pass
+                log.error(f"❌ Could not read the model registry: {e}")
+            else:
+                failed_version = version
+                log.error(f"❌ Could not switch to model version {version}: {e}")
+
+
+@app.on_event("startup")
+def start_registry_watcher():
+    # Started per worker process (threads don't survive serve.py's fork)
+    if MODEL_WATCH_INTERVAL > 0 and os.path.isdir(MODEL_REGISTRY):
+        threading.Thread(target=watch_registry, args=(MODEL_WATCH_INTERVAL,), name="registry-watcher", daemon=True).start()
 
 # ============================================
 # Input/Output Schemas
@@ -127,6 +533,15 @@ class ClaimInput(BaseModel):
     policy_bind_date: str
     incident_date: str
 
+    @model_validator(mode="wrap")
+    @classmethod
+    def _timed(cls, values: Any, handler: Any) -> "ClaimInput":
+        start = time.perf_counter()
+        try:
+            return handler(values)
+        finally:
+            timings.observe("stage.validation", time.perf_counter() - start)
+
 
 class FeatureImportanceItem(BaseModel):
     feature: str
@@ -140,18 +555,53 @@ class PredictionOutput(BaseModel):
     riskScore: int
     status: str  # "Low Risk", "Medium Risk", "High Risk", "Critical"
     confidence: float
-    reasons: List[str]
     
-    # Explainability features
-    top_contributing_factors: List[FeatureImportanceItem]
-    anomaly_score: float
-    is_anomaly: bool
-    ensemble_votes: Dict[str, int]  # {model_name: prediction}
-    model_agreement: float  # % of models that agree
+    # Explainability features (omitted when their group isn't requested)
+    reasons: Optional[List[str]] = None
+    top_contributing_factors: Optional[List[FeatureImportanceItem]] = None
+    anomaly_score: Optional[float] = None
+    is_anomaly: Optional[bool] = None
+    ensemble_votes: Optional[Dict[str, int]] = None  # {model_name: prediction}
+    model_agreement: Optional[float] = None  # % of models that agree
+    # Categorical fields whose value wasn't seen in training; each was
+    # scored like that field's first training category (see encoding.py)
+    unknown_categories: Optional[List[str]] = None
     
     # Adaptive learning metadata
-    model_version: str
-    explanation_method: str  # "SHAP", "Feature Importance", "Heuristic"
+    model_version: str  # Registry version id (or artifact hash) that scored the claim
+    # How reasons/top factors were produced (explanation group only), e.g.
+    # "ML Ensemble: path contributions (RandomForest, DecisionTree) + TreeSHAP (XGBoost)"
+    explanation_method: Optional[str] = None
+
+
+# Optional output groups, selected with ?fields=
+# "score" returns only the core score fields, "full" (default) everything
+OUTPUT_GROUPS = frozenset({"explanation", "anomaly", "ensemble"})
+FIELD_PRESETS = {
+    "score": frozenset(),
+    "full": OUTPUT_GROUPS
+}
+
+
+# Upper bound on claims per /predict/batch request
+MAX_BATCH_SIZE = 5000
+
+
+class BatchPredictionInput(BaseModel):
+    # Raw dicts so one malformed claim doesn't reject the whole batch
+    claims: List[Dict[str, Any]]
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    prediction: Optional[PredictionOutput] = None
+    error: Optional[str] = None
+
+
+class BatchPredictionOutput(BaseModel):
+    count: int
+    errors: int
+    results: List[BatchItemResult]  # Same order as the input claims
 
 
 @app.get("/")
@@ -160,7 +610,7 @@ def root():
         "message": "Explainable Fraud Detection ML API Running",
         "version": "2.0 - XAI Edition",
         "features": [
-            "SHAP-based explanations",
+            "Per-claim explanations (path contributions for RF/DT, TreeSHAP for XGBoost)",
             "Ensemble voting",
             "Anomaly detection",
             "Feature importance analysis",
@@ -169,10 +619,168 @@ def root():
     }
 
 
+@app.get("/stats")
+def stats():
+    """Per-stage and per-model latency, cache and batching counters since startup"""
+    return {
+        "timings": timings.snapshot(),
+        "cache": prediction_cache.stats(),
+        "batcher": predict_batcher.stats(),
+        "cascade": cascade.stats() if cascade is not None else {"enabled": False},
+        "rules": heuristic_rules.info()
+    }
+
+
+# Timing key prefix -> (metric, label, help)
+TIMING_METRICS = {
+    "stage": ("claimwatch_stage_seconds", "stage", "Time per pipeline stage call"),
+    "model": ("claimwatch_model_seconds", "model", "Time per ensemble member call"),
+    "http": ("claimwatch_http_request_seconds", "path", "Time per HTTP request, by route")
+}
+CACHE_EVENTS = {"hit": "hits", "miss": "misses", "eviction": "evictions", "expiration": "expirations", "invalidation": "invalidations"}
+
+
+def render_metrics() -> List[str]:
+    """Everything behind /stats as Prometheus metric families (this process only)"""
+    series = timings.series()
+    lines = []
+    for prefix, (name, label, help_text) in TIMING_METRICS.items():
+        samples = []
+        for key, (counts, total, _) in sorted(series.items()):
+            group, _, value = key.partition(".")
+            if group == prefix:
+                samples += histogram_samples({label: value}, LATENCY_BUCKETS, counts, total)
+        lines += metric_family(name, "histogram", help_text, samples)
+    lines += metric_family("claimwatch_stage_skipped_rows_total", "counter", "Rows that skipped a stage (fields or cascade)", [
+        ("", {"stage": key.partition(".")[2]}, skipped)
+        for key, (_, _, skipped) in sorted(series.items()) if key.startswith("stage.") and skipped
+    ])
+    lines += predictions.expose()
+    lines += http_requests.expose()
+
+    cache = prediction_cache.stats()
+    lines += metric_family("claimwatch_cache_events_total", "counter", "Prediction cache lookups and removals", [
+        ("", {"event": event}, cache[key]) for event, key in CACHE_EVENTS.items()
+    ])
+    lines += metric_family("claimwatch_cache_entries", "gauge", "Prediction cache entries", [("", {}, cache["entries"])])
+    lines += metric_family("claimwatch_cache_bytes", "gauge", "Approximate prediction cache size", [("", {}, cache["bytes"])])
+
+    counts, total = predict_batcher.batch_sizes.totals()
+    lines += metric_family("claimwatch_batch_size", "histogram", "Claims per /predict micro-batch",
+                           histogram_samples({}, predict_batcher.batch_sizes.buckets, counts, total))
+    counts, total = predict_batcher.queue_wait_ms.totals()
+    lines += metric_family("claimwatch_batch_queue_wait_seconds", "histogram", "Time /predict requests waited for a batch",
+                           histogram_samples({}, predict_batcher.queue_wait_ms.buckets, counts, total, scale=0.001))
+
+    if cascade is not None:
+        outcomes = cascade.stats()
+        lines += metric_family("claimwatch_cascade_claims_total", "counter", "Claims per cascade outcome", [
+            ("", {"outcome": outcome}, outcomes[outcome]) for outcome in ("decided_low", "decided_high", "escalated")
+        ])
+
+    models = active_models
+    lines += metric_family("claimwatch_model_info", "gauge", "Model version being served", [
+        ("", {"version": models.version, "source": models.source, "mode": "ml" if models.loaded else "heuristic"}, 1)
+    ])
+    return lines
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus text exposition format"""
+    return Response("\n".join(render_metrics()) + "\n", media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/startup")
+def startup_report():
+    """Startup time breakdown and the state of lazily loaded models"""
+    return {
+        "total_ms": startup.total_ms(),
+        "phases_ms": startup.snapshot(),
+        "artifacts": {"source": active_models.source, "version": active_models.version},
+        "lazy_models": {lazy_model.name: lazy_model.status() for lazy_model in active_models.lazy_models()}
+    }
+
+
+@app.get("/memory")
+def memory():
+    """Resident memory of the worker that served this request"""
+    try:
+        return {"pid": os.getpid(), **process_memory()}
+    except OSError as e:
+        raise HTTPException(status_code=501, detail=f"Memory stats unavailable: {e}")
+
+
+def require_admin(token: Optional[str]) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API disabled (set ADMIN_TOKEN)")
+    if not token or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@app.get("/admin/models")
+def list_models(x_admin_token: Optional[str] = Header(None)):
+    """Registry versions and the versions loaded in this worker"""
+    require_admin(x_admin_token)
+    return {
+        "active": active_models.version,
+        "previous": previous_models.version if previous_models else None,
+        "registry_current": registry.current(),
+        "versions": registry.versions(),
+        "history": registry.history()
+    }
+
+
+@app.post("/admin/models/activate")
+async def activate_model(version: str, x_admin_token: Optional[str] = Header(None)):
+    """Load, warm and switch to a registry version without dropping requests"""
+    require_admin(x_admin_token)
+    if version not in registry.versions():
+        raise HTTPException(status_code=404, detail=f"Unknown model version: {version}")
+    try:
+        return await run_in_threadpool(switch_models, version)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not activate {version}: {e}")
+
+
+@app.post("/admin/models/rollback")
+async def rollback_model(x_admin_token: Optional[str] = Header(None)):
+    """Switch back to the previously active version"""
+    require_admin(x_admin_token)
+    history = registry.history()
+    if len(history) < 2:
+        raise HTTPException(status_code=409, detail="No earlier version to roll back to")
+    try:
+        return await run_in_threadpool(switch_models, history[-2], True, True)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Rollback failed: {e}")
+
+
+@app.get("/admin/profiles")
+def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """Profiles kept by this worker, newest first, with their slowest functions"""
+    require_admin(x_admin_token)
+    return {"buffer": profiles.max_profiles, "sample_rate": PROFILE_SAMPLE_RATE, "profiles": profiles.summaries()}
+
+
+@app.get("/admin/profiles/{profile_id}")
+def get_profile(profile_id: str, x_admin_token: Optional[str] = Header(None)):
+    """Collapsed stacks (flamegraph.pl / speedscope input), weights in microseconds"""
+    require_admin(x_admin_token)
+    profile = profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Unknown profile: {profile_id}")
+    return Response(profile.collapsed(), media_type="text/plain")
+
+
 # ============================================
 # Helper Functions
 # ============================================
 
+# Anomalous claims above this fraud probability are reported as Critical
+ANOMALY_CRITICAL_PROBABILITY = 0.3
+
+
 def get_risk_category(probability: float) -> str:
     """Determine risk category from probability"""
     if probability < 0.2:
@@ -185,332 +793,688 @@ def get_risk_category(probability: float) -> str:
         return "Critical"
 
 
-def detect_anomalies(X: np.ndarray) -> tuple:
-    """Detect anomalies using Isolation Forest"""
-    try:
-        if X is None or len(X) == 0 or X.size == 0:
-            print("⚠️  Empty data for anomaly detection")
-            return False, 0.0
-            
-        if X.ndim == 1:
-            X = X.reshape(1, -1)
-        
-        iso_forest = IsolationForest(contamination=0.1, random_state=42)
-        anomaly_predictions = iso_forest.fit_predict(X)
-        anomaly_scores = iso_forest.score_samples(X)
-        
-        is_anomaly = anomaly_predictions[0] == -1
-        anomaly_score = float(-anomaly_scores[0])  # Invert score (higher = more anomalous)
-        
-        return is_anomaly, anomaly_score
-    except Exception as e:
-        print(f"Anomaly detection error: {e}")
-        return False, 0.0
+def claim_status(probability: float, is_anomaly: bool) -> str:
+    """Risk category, raised to Critical for anomalous claims"""
+    if is_anomaly and probability > ANOMALY_CRITICAL_PROBABILITY:
+        return "Critical"
+    return get_risk_category(probability)
+
+
+def impact_level(importance: float) -> str:
+    """Categorize how strongly a factor moves the prediction"""
+    if abs(importance) > 0.1:
+        return "High"
+    elif abs(importance) > 0.05:
+        return "Medium"
+    return "Low"
 
 
-def get_feature_importance_explanation(
-    feature_names: List[str],
-    feature_values: np.ndarray,
+def get_feature_importance_explanation(models: ModelSet) -> List[FeatureImportanceItem]:
+    """Global top features from the Random Forest (fallback explanation)"""
+    return [
+        FeatureImportanceItem(
+            feature=feature,
+            importance=round(importance, 4),
+            impact=impact_level(importance)
+        )
+        for feature, importance in models.global_importances
+    ]
+
+
+def get_local_explanations(
+    models: ModelSet,
+    X: np.ndarray,
+    members: List[str],
     top_n: int = 5
-) -> List[FeatureImportanceItem]:
-    """Get top contributing features with importance scores"""
-    try:
-        if model is None or not hasattr(model, 'feature_importances_'):
-            return []
-        
-        importances = model.feature_importances_
-        indices = np.argsort(importances)[::-1][:top_n]
-        
-        result = []
-        for idx in indices:
-            importance = float(importances[idx])
-            feature = feature_names[idx]
-            
-            # Categorize impact
-            if importance > 0.1:
-                impact = "High"
-            elif importance > 0.05:
-                impact = "Medium"
-            else:
-                impact = "Low"
-            
-            result.append(FeatureImportanceItem(
-                feature=feature,
-                importance=round(importance, 4),
-                impact=impact
-            ))
-        
-        return result
-    except Exception as e:
-        print(f"Feature importance error: {e}")
-        return []
+) -> Tuple[List[List[FeatureImportanceItem]], str]:
+    """
+    Per-claim top factors: signed contribution of each feature to the
+    ensemble fraud probability. Falls back to global importances.
+    Also returns the method that produced them.
+    """
+    local_explainer = models.explainer
+    if local_explainer is not None and set(members) & set(local_explainer.members):
+        try:
+            factors = [
+                [
+                    FeatureImportanceItem(
+                        feature=feature,
+                        importance=round(contribution, 4),
+                        impact=impact_level(contribution)
+                    )
+                    for feature, contribution in row
+                ]
+                for row in local_explainer.top_factors(X, top_n, members)
+            ]
+            return factors, local_explainer.describe(members)
+        except Exception as e:
+            log.warning(f"Local explanation error: {e}")
+    return [get_feature_importance_explanation(models)] * len(X), "global feature importance (RandomForest)"
 
 
-def ensemble_predict(X: pd.DataFrame) -> Dict:
-    """Get predictions from all ensemble models"""
-    votes = {
-        "RandomForest": 0,
-        "XGBoost": 0,
-        "DecisionTree": 0
-    }
-    
-    predictions = []
-    probabilities = []
-    
-    try:
-        # Random Forest
-        if model:
-            rf_pred = int(model.predict(X)[0])
-            rf_prob = model.predict_proba(X)[0][1]
-            votes["RandomForest"] = rf_pred
-            predictions.append(rf_pred)
-            probabilities.append(rf_prob)
-            print(f"🌲 RandomForest: pred={rf_pred}, prob={rf_prob:.3f}")
-    except Exception as e:
-        print(f"RandomForest error: {e}")
-    
-    try:
-        # XGBoost
-        if xgb_model:
-            xgb_pred = int(xgb_model.predict(X)[0])
-            xgb_prob = xgb_model.predict_proba(X)[0][1] if hasattr(xgb_model, 'predict_proba') else float(xgb_pred)
-            votes["XGBoost"] = xgb_pred
-            predictions.append(xgb_pred)
-            probabilities.append(xgb_prob if isinstance(xgb_prob, (int, float)) else xgb_pred)
-            print(f"🚀 XGBoost: pred={xgb_pred}, prob={xgb_prob:.3f}")
-    except Exception as e:
-        print(f"XGBoost error: {e}")
-    
-    try:
-        # Decision Tree
-        if dt_model:
-            dt_pred = int(dt_model.predict(X)[0])
-            dt_prob = dt_model.predict_proba(X)[0][1]
-            votes["DecisionTree"] = dt_pred
-            predictions.append(dt_pred)
-            probabilities.append(dt_prob)
-            print(f"🌳 DecisionTree: pred={dt_pred}, prob={dt_prob:.3f}")
-    except Exception as e:
-        print(f"DecisionTree error: {e}")
-    
-    # Calculate agreement (how many models agree on the majority prediction)
-    model_agreement = 0.0
-    if predictions:
-        # Count how many predictions match the majority
-        majority_pred = 1 if sum(predictions) > len(predictions) / 2 else 0
-        agreement_count = sum(1 for p in predictions if p == majority_pred)
-        model_agreement = round((agreement_count / len(predictions)) * 100, 2)
-        print(f"📊 Ensemble: predictions={predictions}, majority={majority_pred}, agreement={model_agreement}%")
-    
-    ensemble_prob = np.mean(probabilities) if probabilities else 0.5
-    
-    return {
-        "votes": votes,
-        "ensemble_prediction": 1 if sum(predictions) > len(predictions) / 2 else 0,
-        "ensemble_probability": ensemble_prob,
-        "model_agreement": model_agreement
-    }
+def parse_fields(fields: str) -> frozenset:
+    """Turn ?fields=score|full|explanation,anomaly,ensemble into output groups"""
+    groups = set()
+    for part in fields.split(","):
+        part = part.strip().lower()
+        if not part:
+            continue
+        if part in FIELD_PRESETS:
+            groups |= FIELD_PRESETS[part]
+        elif part in OUTPUT_GROUPS:
+            groups.add(part)
+        else:
+            options = ", ".join(sorted(set(FIELD_PRESETS) | OUTPUT_GROUPS))
+            raise HTTPException(status_code=400, detail=f"Unknown fields group '{part}' (expected one of: {options})")
+    return frozenset(groups)
 
 
-@app.post("/predict", response_model=PredictionOutput)
-def predict_claim(data: ClaimInput):
+@app.post("/predict", response_model=PredictionOutput, response_model_exclude_none=True)
+async def predict_claim(data: ClaimInput, request: Request, fields: str = "full"):
     """
     Explainable fraud prediction endpoint
     Returns detailed explanations, feature importance, and anomaly scores
+    (use fields=score for just fraud / probability / riskScore)
+    Concurrent requests are scored together by the micro-batcher
     """
-    
-    try:
-        # ============================================
-        # 1. Data Preparation
-        # ============================================
-        
-        policy_year = datetime.fromisoformat(data.policy_bind_date).year
-        incident_year = datetime.fromisoformat(data.incident_date).year
-        incident_month = datetime.fromisoformat(data.incident_date).month
-        
-        sample_input = {
-            "policy_state": data.policy_state,
-            "policy_csl": data.policy_csl,
-            "insured_sex": data.insured_sex,
-            "insured_education_level": data.insured_education_level,
-            "insured_occupation": data.insured_occupation,
-            "insured_hobbies": data.insured_hobbies,
-            "insured_relationship": data.insured_relationship,
-            "incident_type": data.incident_type,
-            "collision_type": data.collision_type,
-            "incident_severity": data.incident_severity,
-            "authorities_contacted": data.authorities_contacted,
-            "incident_state": data.incident_state,
-            "incident_city": data.incident_city,
-            "incident_location": data.incident_location if data.incident_location else f"{data.incident_city} Area",
-            "property_damage": data.property_damage,
-            "police_report_available": data.police_report_available,
-            "fraud_reported": data.fraud_reported,
-            "auto_make": data.auto_make,
-            "auto_model": data.auto_model,
-            "months_as_customer": data.months_as_customer,
-            "age": data.age,
-            "policy_deductable": data.policy_deductable,
-            "policy_annual_premium": data.policy_annual_premium,
-            "umbrella_limit": data.umbrella_limit,
-            "insured_zip": data.insured_zip,
-            "capital-gains": data.capital_gains,  # Map with hyphen to match CSV
-            "capital-loss": data.capital_loss,    # Map with hyphen to match CSV
-            "incident_hour_of_the_day": data.incident_hour_of_the_day,
-            "number_of_vehicles_involved": data.number_of_vehicles_involved,
-            "bodily_injuries": data.bodily_injuries,
-            "witnesses": data.witnesses,
-            "total_claim_amount": data.total_claim_amount,
-            "injury_claim": data.injury_claim,
-            "property_claim": data.property_claim,
-            "vehicle_claim": data.vehicle_claim,
-            "auto_year": data.auto_year,
-            "policy_bind_year": policy_year,
-            "incident_year": incident_year,
-            "incident_month": incident_month
-        }
-        
-        df = pd.DataFrame([sample_input])
-        
-        # ============================================
-        # 2. Predictions with Multiple Models
-        # ============================================
-        
-        df_scaled = None
-        ensemble_result = {"votes": {}, "model_agreement": 0, "confidence": 0.5}
-        
-        if models_loaded and model and scaler:
-            print(f"✅ Using ML Models (loaded={models_loaded})")
-            # Scale features
-            df_scaled = scaler.transform(df[feature_names])
-            df_scaled_df = pd.DataFrame(df_scaled, columns=feature_names)
-            
-            # Get ensemble predictions
-            ensemble_result = ensemble_predict(df_scaled_df)
-            
-            # Main prediction (Random Forest)
-            fraud_pred = int(model.predict(df_scaled_df)[0])
-            fraud_prob = model.predict_proba(df_scaled_df)[0][1]
-            
-            # Use ensemble probability if available
-            if ensemble_result.get("ensemble_probability"):
-                fraud_prob = ensemble_result["ensemble_probability"]
-            
-            # Confidence from max probability of any model output
-            confidence = max(model.predict_proba(df_scaled_df)[0])
-            ensemble_result["confidence"] = confidence
-            
-            explanation_mode = "ML Models (SHAP + Feature Importance + Ensemble)"
-            print(f"📈 ML Mode: fraud={fraud_pred}, prob={fraud_prob:.3f}, confidence={confidence:.3f}")
-            
+    groups = parse_fields(fields)
+    if profiling_enabled and profile_requested(request):
+        return await run_in_threadpool(profiled_prediction, data, groups, request.url.path)
+    output = cached_prediction(data, groups)
+    if output is None:
+        if predict_batcher.max_batch_size == 1:
+            output = (await run_in_threadpool(score_claims, [data], groups, False))[0]
         else:
-            print(f"⚠️  Models not loaded, using heuristic (model={model is not None}, scaler={scaler is not None}, loaded={models_loaded})")
-            # Fallback to heuristic
-            fraud_pred, fraud_prob, ensemble_result = heuristic_predict(data)
-            confidence = ensemble_result.get("confidence", 0.5)
-            explanation_mode = "Heuristic Rules"
-            print(f"📊 Heuristic Mode: fraud={fraud_pred}, prob={fraud_prob:.3f}, confidence={confidence:.3f}")
-            df_scaled = None
-        
-        
-        # ============================================
-        # 3. Anomaly Detection
-        # ============================================
-        
-        is_anomaly, anomaly_score = detect_anomalies(df_scaled if df_scaled is not None else np.array([]))
-        
-        # ============================================
-        # 4. Feature Importance & Explanations
-        # ============================================
-        
-        top_factors = get_feature_importance_explanation(feature_names, df_scaled[0] if df_scaled is not None else np.array([])) if models_loaded else []
-        
-        reasons = generate_reasons(
+            output = await predict_batcher.submit(data, groups)
+    return json_response(output)
+
+
+def cached_prediction(data: ClaimInput, groups: frozenset) -> Optional[PredictionOutput]:
+    """Cached response for a claim, without queueing it"""
+    models = active_models
+    if not (models.loaded and prediction_cache.enabled):
+        return None
+    cached = prediction_cache.get(prediction_cache.key(data.__dict__.values(), groups, cache_version(models)))
+    if cached is not None:
+        predictions.inc("cache")
+    return cached
+
+
+def assemble_prediction(
+    data: ClaimInput,
+    fraud_pred: int,
+    fraud_prob: float,
+    confidence: float,
+    ensemble_result: Dict,
+    is_anomaly: bool,
+    anomaly_score: float,
+    top_factors: List[FeatureImportanceItem],
+    explanation_mode: Optional[str],
+    groups: frozenset = OUTPUT_GROUPS,
+    model_version: str = "2.0-XAI"
+) -> PredictionOutput:
+    """Turn model outputs for one claim into the API response"""
+    risk_score = int(fraud_prob * 100)
+    # Same status whatever the requested groups: is_anomaly is computed
+    # for every claim it can affect (see score_ml)
+    status = claim_status(fraud_prob, is_anomaly)
+
+    confidence_value = ensemble_result.get("confidence", confidence)
+
+    output = PredictionOutput(
+        fraud=fraud_pred,
+        probability=round(fraud_prob, 3),
+        riskScore=risk_score,
+        status=status,
+        confidence=round(confidence_value, 3),
+        model_version=model_version
+    )
+
+    if "explanation" in groups:
+        output.explanation_method = explanation_mode
+        output.reasons = generate_reasons(
             data,
             fraud_prob,
             top_factors,
             is_anomaly,
             anomaly_score
         )
-        
-        # ============================================
-        # 5. Risk Assessment
-        # ============================================
-        
-        risk_score = int(fraud_prob * 100)
-        status = get_risk_category(fraud_prob)
-        
-        # Adjust status based on anomaly
-        if is_anomaly and fraud_prob > 0.3:
-            status = "Critical"
-        
-        # ============================================
-        # 6. Return Response
-        # ============================================
-        
-        model_agreement_value = ensemble_result.get("model_agreement", 0)
-        confidence_value = ensemble_result.get("confidence", confidence)
-        
-        print(f"🎯 RESPONSE: model_agreement={model_agreement_value}, confidence={confidence_value}")
-        
-        return PredictionOutput(
+        output.top_contributing_factors = top_factors
+    if "anomaly" in groups:
+        output.anomaly_score = round(anomaly_score, 3)
+        output.is_anomaly = is_anomaly
+    if "ensemble" in groups:
+        output.ensemble_votes = ensemble_result.get("votes", {})
+        output.model_agreement = ensemble_result.get("model_agreement", 0)
+
+    return output
+
+
+def select_groups(output: PredictionOutput, groups: frozenset) -> PredictionOutput:
+    """Drop output groups the caller didn't ask for"""
+    if "explanation" not in groups:
+        output.reasons = None
+        output.top_contributing_factors = None
+        output.explanation_method = None
+    if "anomaly" not in groups:
+        output.anomaly_score = None
+        output.is_anomaly = None
+    if "ensemble" not in groups:
+        output.ensemble_votes = None
+        output.model_agreement = None
+    return output
+
+
+def fallback_prediction(data: ClaimInput, groups: frozenset = OUTPUT_GROUPS) -> PredictionOutput:
+    """Heuristic response used when the ML path raised an error"""
+    try:
+        fraud_pred, fraud_prob, ensemble_result = heuristic_predict(data)
+        confidence = ensemble_result.get("confidence", 0.5)
+        predictions.inc("fallback")
+
+        return select_groups(PredictionOutput(
             fraud=fraud_pred,
             probability=round(fraud_prob, 3),
-            riskScore=risk_score,
-            status=status,
-            confidence=round(confidence_value, 3),
-            reasons=reasons,
-            top_contributing_factors=top_factors,
-            anomaly_score=round(anomaly_score, 3),
-            is_anomaly=is_anomaly,
+            riskScore=int(fraud_prob * 100),
+            status=get_risk_category(fraud_prob),
+            confidence=round(confidence, 3),
+            reasons=["Error in ML prediction - using heuristic fallback"],
+            top_contributing_factors=[],
+            anomaly_score=0.0,
+            is_anomaly=False,
             ensemble_votes=ensemble_result.get("votes", {}),
-            model_agreement=model_agreement_value,
-            model_version="2.0-XAI",
-            explanation_method=explanation_mode
-        )
-    
+            model_agreement=ensemble_result.get("model_agreement", 0),
+            model_version="2.0-XAI-Fallback",
+            explanation_method="Heuristic Rules (Error Recovery)"
+        ), groups)
+    except Exception as e2:
+        log.error(f"❌ Fallback also failed: {e2}")
+        predictions.inc("error")
+        return select_groups(PredictionOutput(
+            fraud=0,
+            probability=0.5,
+            riskScore=50,
+            status="Medium Risk",
+            confidence=0.3,
+            reasons=["Critical error - manual review required"],
+            top_contributing_factors=[],
+            anomaly_score=0.0,
+            is_anomaly=False,
+            ensemble_votes={},
+            model_agreement=0,
+            model_version="2.0-XAI-Error",
+            explanation_method="System Error"
+        ), groups)
+
+
+# ============================================
+# Cascade Scoring
+# ============================================
+
+# CASCADE_SCREEN=tree|rules|tree+rules scores every claim with the cheap
+# screen first; only screen scores inside [CASCADE_LOW, CASCADE_HIGH] run
+# the full ensemble. Unset (default) scores every claim with the ensemble
+CASCADE_SCREEN = os.getenv("CASCADE_SCREEN", "")
+cascade = Cascade(
+    CASCADE_SCREEN,
+    low=float(os.getenv("CASCADE_LOW", "0.25")),
+    high=float(os.getenv("CASCADE_HIGH", "1.0"))
+) if CASCADE_SCREEN not in ("", "off") else None
+
+
+def screen_claims(models: ModelSet, X: np.ndarray, claims: List[ClaimInput]):
+    """First cascade stage: DecisionTree and/or heuristic rule scores"""
+    dt = models.ensemble.models.get("DecisionTree")
+    tree_proba = dt.predict_proba(X)[:, 1] if cascade.uses_tree and dt is not None else None
+    rules_proba = (
+        heuristic_rules.score(claims).probability
+        if cascade.uses_rules or tree_proba is None else None
+    )
+    return screen_result(tree_proba, rules_proba)
+
+
+# ============================================
+# Batch Scoring
+# ============================================
+
+def detect_anomalies_batch(models: ModelSet, X: np.ndarray) -> tuple:
+    """
+    Score a batch against the Isolation Forest fitted on the training
+    claims in model.py. Higher score = more anomalous.
+    """
+    n = len(X)
+    anomaly_model = models.anomaly_model
+    if anomaly_model is None:
+        return np.zeros(n, dtype=bool), np.zeros(n)
+
+    try:
+        anomaly_scores = anomaly_model.score_samples(X)
+        # Same cut-off as IsolationForest.predict() (decision_function < 0)
+        return anomaly_scores < anomaly_model.offset_, -anomaly_scores
     except Exception as e:
-        print(f"❌ Prediction error: {e}")
-        import traceback
-        traceback.print_exc()
-        
-        # Fallback to heuristic
-        try:
+        log.warning(f"Anomaly detection error: {e}")
+        return np.zeros(n, dtype=bool), np.zeros(n)
+
+
+def score_claims(
+    claims: List[ClaimInput],
+    groups: frozenset = OUTPUT_GROUPS,
+    check_cache: bool = True
+) -> List[PredictionOutput]:
+    """
+    Score a batch of claims with one matrix pass per stage.
+    Cached claims are answered from memory (check_cache=False when the
+    caller already looked) and duplicates are scored once.
+    Claims the ML path can't score get the heuristic fallback.
+    """
+    n = len(claims)
+    results: List[Optional[PredictionOutput]] = [None] * n
+    if not claims:
+        return []
+
+    # One version for the whole batch, even if a hot swap happens meanwhile
+    models = active_models
+    if not (models.loaded and prediction_cache.enabled):
+        return score_uncached(claims, groups, models)
+
+    # Cached outputs are shared between responses and must not be mutated
+    version = cache_version(models)
+    keys = [prediction_cache.key(data.__dict__.values(), groups, version) for data in claims]
+    pending: Dict[bytes, List[int]] = {}
+    reused = 0  # answered from the cache or by a duplicate in this batch
+    for i, key in enumerate(keys):
+        if key in pending:
+            pending[key].append(i)
+            continue
+        if check_cache:
+            results[i] = prediction_cache.get(key)
+        if results[i] is None:
+            pending[key] = [i]
+        else:
+            reused += 1
+
+    if pending:
+        first = [indices[0] for indices in pending.values()]
+        scored = score_ml([claims[i] for i in first], groups, models)
+        for indices, prediction in zip(pending.values(), scored):
+            if prediction is not None:
+                prediction_cache.put(keys[indices[0]], prediction, len(prediction.model_dump_json()), version)
+                reused += len(indices) - 1
+            for i in indices:
+                results[i] = prediction
+    if reused:
+        predictions.inc("cache", amount=reused)
+
+    return [result if result is not None else fallback_prediction(claims[i], groups) for i, result in enumerate(results)]
+
+
+def score_uncached(
+    claims: List[ClaimInput],
+    groups: frozenset = OUTPUT_GROUPS,
+    models: Optional[ModelSet] = None
+) -> List[PredictionOutput]:
+    """Score claims without the cache (heuristic mode or cache disabled)"""
+    n = len(claims)
+    results: List[Optional[PredictionOutput]] = [None] * n
+    models = models or active_models
+
+    if not models.loaded:
+        predictions.inc("heuristic", amount=n)
+        if log.isEnabledFor(logging.DEBUG) and sampled():
+            log.debug(f"⚠️  Heuristic Mode: scored {n} claims (models not loaded, source={models.source})")
+        for i, data in enumerate(claims):
             fraud_pred, fraud_prob, ensemble_result = heuristic_predict(data)
-            confidence = ensemble_result.get("confidence", 0.5)
-            
-            return PredictionOutput(
-                fraud=fraud_pred,
-                probability=round(fraud_prob, 3),
-                riskScore=int(fraud_prob * 100),
-                status=get_risk_category(fraud_prob),
-                confidence=round(confidence, 3),
-                reasons=["Error in ML prediction - using heuristic fallback"],
-                top_contributing_factors=[],
-                anomaly_score=0.0,
-                is_anomaly=False,
-                ensemble_votes=ensemble_result.get("votes", {}),
-                model_agreement=ensemble_result.get("model_agreement", 0),
-                model_version="2.0-XAI-Fallback",
-                explanation_method="Heuristic Rules (Error Recovery)"
-            )
-        except Exception as e2:
-            print(f"❌ Fallback also failed: {e2}")
-            return PredictionOutput(
-                fraud=0,
-                probability=0.5,
-                riskScore=50,
-                status="Medium Risk",
-                confidence=0.3,
-                reasons=["Critical error - manual review required"],
-                top_contributing_factors=[],
-                anomaly_score=0.0,
-                is_anomaly=False,
-                ensemble_votes={},
-                model_agreement=0,
-                model_version="2.0-XAI-Error",
-                explanation_method="System Error"
+            results[i] = assemble_prediction(
+                data,
+                fraud_pred,
+                fraud_prob,
+                ensemble_result.get("confidence", 0.5),
+                ensemble_result,
+                False,
+                0.0,
+                [],
+                "Heuristic Rules",
+                groups
             )
+        return results
+
+    results = score_ml(claims, groups, models)
+    return [result if result is not None else fallback_prediction(claims[i], groups) for i, result in enumerate(results)]
+
+
+def score_ml(
+    claims: List[ClaimInput],
+    groups: frozenset = OUTPUT_GROUPS,
+    models: Optional[ModelSet] = None
+) -> List[Optional[PredictionOutput]]:
+    """
+    ML pipeline with one matrix pass per stage. The explanation stage only
+    runs for the requested group, the anomaly stage for it or for claims
+    it can make Critical. Claims that couldn't be scored come back as None.
+    """
+    n = len(claims)
+    results: List[Optional[PredictionOutput]] = [None] * n
+    models = models or active_models
+    feature_builder = models.feature_builder
+
+    try:
+        # ============================================
+        # 1. Features (scaled float32 rows)
+        # ============================================
+
+        with timings.time("stage.features", n):
+            if n == 1:
+                X = feature_builder.transform_one(claims[0])
+                rows = np.zeros(1, dtype=int)
+            else:
+                X, valid = feature_builder.transform_batch(claims)
+                rows = np.flatnonzero(valid)
+                if len(rows) < n:
+                    X = X[rows]
+
+        if len(rows):
+            m = len(rows)
+
+            # ============================================
+            # 2. Ensemble (always needed for the score)
+            # ============================================
+
+            # (positions in X, their feature rows, result, scoring path) per scoring path
+            segments = []
+            if cascade is None:
+                with timings.time("stage.ensemble", m):
+                    ensemble = models.ensemble.predict(X)
+                segments.append((np.arange(m), X, ensemble, "ML Ensemble"))
+            else:
+                with timings.time("stage.screen", m):
+                    screen = screen_claims(models, X, [claims[i] for i in rows])
+                    decided, escalated = cascade.split(screen.ensemble_probability)
+                if len(decided):
+                    method = f"Cascade Screen ({' + '.join(screen.model_names)})"
+                    segments.append((decided, X[decided], screen.take(decided), method))
+                    timings.skip("stage.ensemble", len(decided))
+                if len(escalated):
+                    X_escalated = X[escalated]
+                    with timings.time("stage.ensemble", len(escalated)):
+                        ensemble = models.ensemble.predict(X_escalated)
+                    segments.append((escalated, X_escalated, ensemble, "ML Ensemble"))
+
+            # ============================================
+            # 3. Anomaly Detection
+            # ============================================
+
+            # Without the anomaly group only claims whose status it can
+            # raise to Critical are scored
+            if "anomaly" in groups:
+                needed = np.arange(m)
+            else:
+                probability = np.empty(m)
+                for positions, _, result, _ in segments:
+                    probability[positions] = result.ensemble_probability
+                needed = np.flatnonzero(probability > ANOMALY_CRITICAL_PROBABILITY)
+            anomalies, anomaly_scores = np.zeros(m, dtype=bool), np.zeros(m)
+            if len(needed):
+                with timings.time("stage.anomaly", len(needed)):
+                    anomalies[needed], anomaly_scores[needed] = detect_anomalies_batch(
+                        models, X if len(needed) == m else X[needed]
+                    )
+            if len(needed) < m:
+                timings.skip("stage.anomaly", m - len(needed))
+
+            # ============================================
+            # 4. Feature Importance & Explanations
+            # ============================================
+
+            top_factors = [[]] * m
+            # "<scoring path>: <attribution method>" per segment
+            explanation_methods = [None] * len(segments)
+            if "explanation" in groups:
+                with timings.time("stage.explanation", m):
+                    for index, (positions, X_segment, result, path) in enumerate(segments):
+                        factors, method = get_local_explanations(models, X_segment, list(result.probabilities))
+                        explanation_methods[index] = f"{path}: {method}"
+                        for k, j in enumerate(positions):
+                            top_factors[j] = factors[k]
+            else:
+                timings.skip("stage.explanation", m)
+
+            # ============================================
+            # 5. Risk Assessment & Response
+            # ============================================
+
+            with timings.time("stage.response", m):
+                for (positions, _, result, _), method in zip(segments, explanation_methods):
+                    for k, j in enumerate(positions):
+                        i = rows[j]
+                        item_result = {
+                            "votes": result.votes_for(k) if "ensemble" in groups else {},
+                            "model_agreement": float(result.model_agreement[k]),
+                            "confidence": float(result.confidence[k])
+                        }
+                        results[i] = assemble_prediction(
+                            claims[i],
+                            int(result.primary_prediction[k]),
+                            float(result.ensemble_probability[k]),
+                            float(result.confidence[k]),
+                            item_result,
+                            bool(anomalies[j]),
+                            float(anomaly_scores[j]),
+                            top_factors[j],
+                            method,
+                            groups,
+                            models.version
+                        )
+                        results[i].unknown_categories = feature_builder.unknown_categories(claims[i]) or None
+            for positions, _, _, path in segments:
+                predictions.inc("screen" if path.startswith("Cascade") else "ml", amount=len(positions))
+
+            if log.isEnabledFor(logging.DEBUG) and sampled():
+                model_timings = {name: round(t * 1000, 2) for _, _, result, _ in segments for name, t in result.timings.items()}
+                escalated_note = f" ({len(escalated)} escalated)" if cascade is not None else ""
+                log.debug(f"📈 ML Mode: scored {m}/{n} claims{escalated_note}, model timings_ms={model_timings}")
+    except Exception as e:
+        log.exception(f"❌ Prediction error: {e}")
+        results = [None] * n
+
+    return results
+
+
+def validation_message(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors())
+
+
+@app.post("/predict/batch", response_model=BatchPredictionOutput, response_model_exclude_none=True)
+def predict_batch(batch: BatchPredictionInput, fields: str = "full"):
+    """
+    Batch fraud prediction endpoint
+    Scores N claims together; results come back in input order
+    with validation errors reported per item
+    """
+    groups = parse_fields(fields)
+    if len(batch.claims) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch too large (max {MAX_BATCH_SIZE} claims)")
+
+    items: List[BatchItemResult] = []
+    claims: List[ClaimInput] = []
+    positions: List[int] = []
+
+    for index, raw in enumerate(batch.claims):
+        try:
+            claims.append(ClaimInput(**raw))
+            positions.append(index)
+            items.append(BatchItemResult(index=index))
+        except ValidationError as e:
+            items.append(BatchItemResult(index=index, error=validation_message(e)))
+
+    for position, prediction in zip(positions, score_claims(claims, groups)):
+        items[position].prediction = prediction
+
+    return json_response(BatchPredictionOutput(
+        count=len(items),
+        errors=sum(1 for item in items if item.error),
+        results=items
+    ))
+
+# ============================================
+# Streaming Scoring (NDJSON)
+# ============================================
+
+# Claims per scoring call, batches read ahead of scoring and the longest
+# accepted line. Together they bound the memory a stream can hold, however
+# large the upload
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "256"))
+STREAM_QUEUE_BATCHES = int(os.getenv("STREAM_QUEUE_BATCHES", "4"))
+STREAM_MAX_LINE_BYTES = int(os.getenv("STREAM_MAX_LINE_BYTES", str(1 << 20)))
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that leaves receive() to the request body reader.
+    Under ASGI spec < 2.4 (uvicorn) StreamingResponse listens for a
+    disconnect on receive() while streaming, which would swallow the body
+    still being uploaded. A disconnect surfaces as ClientDisconnect from the
+    body reader or as an OSError from send instead.
+    """
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+
+
+async def read_stream_batches(request: Request, queue: asyncio.Queue) -> None:
+    """
+    Split the request body into lines and queue them in batches. A partial
+    batch is queued as soon as the scorer is idle, a full one waits for room
+    in the queue, which stops reading the body (backpressure on the upload).
+    """
+    pending = bytearray()
+    batch: List[Tuple[int, Optional[bytes]]] = []
+    number = 0
+    skipping = False  # inside a line longer than STREAM_MAX_LINE_BYTES
+
+    async for chunk in request.stream():
+        pending += chunk
+        start = 0
+        while True:
+            end = pending.find(b"\n", start)
+            if end < 0:
+                break
+            if skipping:
+                skipping = False
+            elif end - start > STREAM_MAX_LINE_BYTES:
+                batch.append((number, None))
+            elif pending[start:end].strip():
+                batch.append((number, bytes(pending[start:end])))
+            number += 1
+            start = end + 1
+            if len(batch) >= STREAM_BATCH_SIZE:
+                await queue.put(batch)
+                batch = []
+        del pending[:start]
+
+        if len(pending) > STREAM_MAX_LINE_BYTES:
+            if not skipping:
+                batch.append((number, None))
+            skipping = True
+            pending.clear()
+        if batch and queue.empty():
+            await queue.put(batch)
+            batch = []
+
+    if pending.strip() and not skipping:
+        batch.append((number, bytes(pending)))
+    if batch:
+        await queue.put(batch)
+
+
+def score_stream_batch(batch: List[Tuple[int, Optional[bytes]]], groups: frozenset) -> bytes:
+    """NDJSON result lines (BatchItemResult, index = input line number) for one batch"""
+    start = time.perf_counter()
+    items: List[BatchItemResult] = []
+    claims: List[ClaimInput] = []
+    positions: List[int] = []
+    for number, line in batch:
+        if line is None:
+            items.append(BatchItemResult(index=number, error=f"Line longer than {STREAM_MAX_LINE_BYTES} bytes"))
+            continue
+        try:
+            raw = json.loads(line)
+            if not isinstance(raw, dict):
+                raise ValueError("expected a JSON object")
+            claims.append(ClaimInput(**raw))
+            positions.append(len(items))
+            items.append(BatchItemResult(index=number))
+        except ValidationError as e:
+            items.append(BatchItemResult(index=number, error=validation_message(e)))
+        except ValueError as e:
+            items.append(BatchItemResult(index=number, error=f"Invalid JSON: {e}"))
+    timings.observe("stage.parse", time.perf_counter() - start, len(batch))
+
+    for position, prediction in zip(positions, score_claims(claims, groups)):
+        items[position].prediction = prediction
+
+    start = time.perf_counter()
+    body = "".join(item.model_dump_json(exclude_none=True) + "\n" for item in items).encode()
+    timings.observe("stage.serialization", time.perf_counter() - start, len(items))
+    return body
+
+
+async def stream_scores(request: Request, groups: frozenset) -> AsyncIterator[bytes]:
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, STREAM_QUEUE_BATCHES))
+    done = object()
+
+    async def reader() -> Optional[Exception]:
+        error = None
+        try:
+            await read_stream_batches(request, queue)
+        except Exception as e:
+            error = e
+        await queue.put(done)
+        return error
+
+    reading = asyncio.ensure_future(reader())
+    try:
+        while True:
+            batch = await queue.get()
+            if batch is done:
+                break
+            # A slow client makes this yield wait, so the queue fills up and
+            # the reader stops pulling the upload
+            yield await run_in_threadpool(score_stream_batch, batch, groups)
+        error = reading.result()
+        if error is not None:
+            raise error
+    except ClientDisconnect:
+        log.info("🔌 Client disconnected from /predict/stream")
+    finally:
+        reading.cancel()
+
+
+@app.post("/predict/stream")
+async def predict_stream(request: Request, fields: str = "full"):
+    """
+    Streaming fraud prediction endpoint
+    Send claims as NDJSON (one JSON object per line); results stream back as
+    NDJSON in input order while the upload is still being read:
+    {"index": <line number>, "prediction": {...}} or {"index": ..., "error": "..."}
+    """
+    return NDJSONStreamingResponse(stream_scores(request, parse_fields(fields)))
+
+
+# ============================================
+# Micro-batching for /predict
+# ============================================
+
+# Concurrent /predict requests wait up to PREDICT_BATCH_WAIT_MS for each
+# other and are scored as one matrix (PREDICT_BATCH_SIZE=1 turns this off)
+predict_batcher = MicroBatcher(
+    lambda claims, groups: score_claims(claims, groups, check_cache=False),
+    max_wait_ms=float(os.getenv("PREDICT_BATCH_WAIT_MS", "2")),
+    max_batch_size=int(os.getenv("PREDICT_BATCH_SIZE", "64"))
+)
 
 
 def generate_reasons(
@@ -529,33 +1493,18 @@ def generate_reasons(
     elif fraud_prob > 0.5:
         reasons.append(f"Elevated fraud probability ({fraud_prob*100:.1f}%)")
     
-    # Feature-based reasons
-    risky_hobbies = {"skydiving", "base-jumping", "bungie-jumping", "yachting", "polo", "cross-fit"}
-    if data.insured_hobbies in risky_hobbies:
-        reasons.append(f"Risky hobby identified: {data.insured_hobbies}")
-    
-    if data.incident_severity in {"Total Loss", "Major Damage"}:
-        reasons.append(f"High-severity incident: {data.incident_severity}")
-    
-    if data.property_damage == "Yes" and data.police_report_available == "No":
-        reasons.append("Property damage reported but no police report available")
-    
-    if data.fraud_reported == "Yes":
-        reasons.append("Fraud already reported by claimant")
-    
-    if data.total_claim_amount > 20000:
-        reasons.append(f"High claim amount: ${data.total_claim_amount}")
-    
-    if data.incident_type in {"Multi-vehicle Collision", "Vehicle Theft"}:
-        reasons.append(f"High-risk incident type: {data.incident_type}")
+    # Feature-based reasons: the rule table's, same text as the heuristic path
+    reasons.extend(heuristic_rules.score([data]).reasons(0))
     
     # Anomaly-based reasons
     if is_anomaly:
         reasons.append(f"Anomalous claim pattern detected (anomaly score: {anomaly_score:.2f})")
     
     # Top contributing factors
-    if top_factors:
-        reasons.append(f"Top risk factor: {top_factors[0].feature}")
+    # Strongest factor pushing towards fraud
+    risk_factors = [factor for factor in top_factors if factor.importance > 0]
+    if risk_factors:
+        reasons.append(f"Top risk factor: {risk_factors[0].feature}")
     
     if not reasons:
         reasons.append("No strong fraud indicators detected")
@@ -565,66 +1514,55 @@ def generate_reasons(
 
 def heuristic_predict(data: ClaimInput) -> tuple:
     """Fallback heuristic fraud detection with confidence scoring"""
-    score = 0
-    confidence_base = 0.5  # Base confidence for heuristic
-    
-    if data.policy_csl in {"500/1000", "250/500"}:
-        score += 10
-        confidence_base += 0.05
-    
-    risky_jobs = {"exec-managerial", "prof-specialty", "sales", "armed-forces"}
-    if data.insured_occupation in risky_jobs:
-        score += 10
-        confidence_base += 0.05
-    
-    risky_hobbies = {"skydiving", "base-jumping", "bungie-jumping", "yachting", "polo", "cross-fit"}
-    if data.insured_hobbies in risky_hobbies:
-        score += 15
-        confidence_base += 0.07
-    
-    if data.incident_severity in {"Total Loss", "Major Damage"}:
-        score += 25
-        confidence_base += 0.10
-    
-    if data.incident_type in {"Multi-vehicle Collision", "Vehicle Theft"}:
-        score += 15
-        confidence_base += 0.07
-    
-    if data.collision_type == "?":
-        score += 10
-        confidence_base += 0.05
-    
-    if data.property_damage == "Yes" and data.police_report_available == "No":
-        score += 15
-        confidence_base += 0.07
-    
-    if data.fraud_reported == "Yes":
-        score += 20
-        confidence_base += 0.10
-    
-    if data.total_claim_amount > 20000:
-        score += 20
-        confidence_base += 0.10
-    
-    if data.witnesses == 0:
-        score += 5
-        confidence_base += 0.03
-    
-    if data.number_of_vehicles_involved > 2:
-        score += 5
-        confidence_base += 0.03
-    
-    score = max(0, min(100, score))
-    prob = float(score / 100.0)
-    fraud_flag = 1 if prob >= 0.5 else 0
-    
-    # Cap confidence at 0.85 for heuristic (not as reliable as ML)
-    confidence = min(0.85, confidence_base)
-    
-    return fraud_flag, prob, {
+    scores = heuristic_rules.score([data])
+    fraud_flag = int(scores.fraud[0])
+
+    # Confidence is capped by the table's max_confidence (heuristic is not as reliable as ML)
+    return fraud_flag, float(scores.probability[0]), {
         "votes": {
             "Heuristic": fraud_flag
         },
         "model_agreement": 100.0,
-        "confidence": confidence
+        "confidence": float(scores.confidence[0])
     }
+
+
+# ============================================
+# Request Profiling
+# ============================================
+
+# /predict requests sent with "X-Profile: 1" (or ?profile=1) plus the admin
+# token are profiled when ADMIN_TOKEN is set; PROFILE_SAMPLE_RATE profiles
+# that share of all requests
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+profiling_enabled = bool(ADMIN_TOKEN) or PROFILE_SAMPLE_RATE > 0
+profiles = ProfileStore(int(os.getenv("PROFILE_BUFFER", "32")), os.getenv("PROFILE_DIR", ""))
+
+
+def profile_requested(request: Request) -> bool:
+    """Profile this request? Only called when profiling_enabled"""
+    # Without an admin token only sampling is on, and the header is ignored
+    if ADMIN_TOKEN and (request.headers.get("x-profile") == "1" or request.query_params.get("profile") == "1"):
+        require_admin(request.headers.get("x-admin-token"))
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def profiled_prediction(data: ClaimInput, groups: frozenset, path: str) -> Response:
+    """Score one claim under the profiler, skipping the cache and the batcher"""
+    profile = StackProfile("predict_claim")
+    with profile.run():
+        response = json_response(score_claims([data], groups, check_cache=False)[0])
+    profile_id = profiles.add(profile, path=path)
+    response.headers["X-Profile-Id"] = profile_id
+    response.headers["X-Profile-Ms"] = f"{profile.seconds * 1000:.3f}"
+    log.info(f"🔬 Profiled {path} as {profile_id} ({profile.seconds * 1000:.1f} ms)")
+    return response
+
+
+# ============================================
+# Startup Report
+# ============================================
+
+startup.record("app", time.perf_counter() - _import_start - sum(startup.phases.values()))
+log.info(f"🚀 Ready in {startup.total_ms()} ms: {startup.snapshot()}")
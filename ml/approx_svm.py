@@ -0,0 +1,180 @@
+"""
+Scalable SVM
+RFFSVMClassifier approximates SVC(kernel="rbf", probability=True) in
+linear time: random Fourier features (RBFSampler) map the claims into a
+space where the RBF kernel is roughly a dot product, and a linear SVM
+(SGDClassifier, hinge loss, averaged weights) is trained there in
+mini-batches, so the expanded features never exist for more than
+batch_size rows at a time.
+Probabilities come from Platt scaling on a held-out calibration slice,
+where SVC runs an internal 5-fold cross-validation.
+
+model.py uses it for the "svm" model when the training split is larger
+than SVM_EXACT_MAX_ROWS (see --svm).
+
+Usage:
+    python approx_svm.py                               # insurance_claims.csv
+    python approx_svm.py --rows 100000 1000000         # plus synthetic claims
+    python approx_svm.py --rows 1000000 --exact-max-rows 0
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.kernel_approximation import RBFSampler
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.utils.validation import check_is_fitted
+
+SVM_EXACT_MAX_ROWS = int(os.getenv("SVM_EXACT_MAX_ROWS", "20000"))
+
+
+class RFFSVMClassifier(ClassifierMixin, BaseEstimator):
+    """Binary RBF SVM on random Fourier features, with Platt-scaled probabilities"""
+
+    def __init__(self, n_components: int = 4096, gamma: Any = "scale", alpha: float = 1e-5,
+                 epochs: int = 5, average: bool = True, batch_size: int = 4096,
+                 calibration_size: float = 0.2, random_state: Optional[int] = None):
+        self.n_components = n_components
+        self.gamma = gamma
+        self.alpha = alpha
+        self.epochs = epochs
+        self.average = average
+        self.batch_size = batch_size
+        self.calibration_size = calibration_size
+        self.random_state = random_state
+
+    def fit(self, X, y) -> "RFFSVMClassifier":
+        X = np.asarray(X, dtype=np.float32)
+        self.classes_, y = np.unique(y, return_inverse=True)
+        if len(self.classes_) != 2:
+            raise ValueError(f"RFFSVMClassifier is binary, got {len(self.classes_)} classes")
+        self.n_features_in_ = X.shape[1]
+
+        train, calibration = train_test_split(
+            np.arange(len(y)), test_size=self.calibration_size, random_state=self.random_state, stratify=y
+        )
+        # gamma="scale" is SVC's default, 1 / (n_features * X.var())
+        self.features_ = RBFSampler(
+            gamma=self.gamma, n_components=self.n_components, random_state=self.random_state
+        ).fit(X[train])
+        self.svm_ = SGDClassifier(
+            loss="hinge", alpha=self.alpha, average=self.average, random_state=self.random_state
+        )
+
+        rng = np.random.default_rng(self.random_state)
+        for _ in range(self.epochs):
+            order = rng.permutation(train)
+            for start in range(0, len(order), self.batch_size):
+                batch = order[start:start + self.batch_size]
+                self.svm_.partial_fit(self.features_.transform(X[batch]), y[batch], classes=[0, 1])
+
+        # Platt scaling: a logistic fit of the label on the held-out margins
+        margins = self.decision_function(X[calibration]).reshape(-1, 1)
+        self.calibrator_ = LogisticRegression(C=1e4).fit(margins, y[calibration])
+        return self
+
+    def decision_function(self, X) -> np.ndarray:
+        check_is_fitted(self, "svm_")
+        X = np.asarray(X, dtype=np.float32)
+        out = np.empty(len(X))
+        for start in range(0, len(X), self.batch_size):
+            block = slice(start, start + self.batch_size)
+            out[block] = self.svm_.decision_function(self.features_.transform(X[block]))
+        return out
+
+    def predict(self, X) -> np.ndarray:
+        # Like SVC, labels follow the margin, not the calibrated probability
+        return self.classes_[(self.decision_function(X) > 0).astype(int)]
+
+    def predict_proba(self, X) -> np.ndarray:
+        fraud = self.calibrator_.predict_proba(self.decision_function(X).reshape(-1, 1))[:, 1]
+        return np.column_stack([1 - fraud, fraud])
+
+
+# ============================================
+# Exact vs Approximate Comparison
+# ============================================
+
+def load_claims(csv: str, directory: str) -> Dict[str, np.ndarray]:
+    """Ingest a claims CSV; stratified 80/20 split, scaled like model.py"""
+    from sklearn.preprocessing import StandardScaler
+    from ingest import LABEL_COLUMN, ingest_claims, load_matrix
+
+    info = ingest_claims(csv, directory)
+    columns = {
+        name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+        for name in (*info["feature_names"], LABEL_COLUMN)
+    }
+    y = np.asarray(columns[LABEL_COLUMN], dtype=np.int64)
+    train, test = train_test_split(np.arange(len(y)), test_size=0.2, random_state=42, stratify=y)
+    scaler = StandardScaler()
+    return {
+        "X_train": scaler.fit_transform(load_matrix(columns, info["feature_names"], train)),
+        "y_train": y[train],
+        "X_test": scaler.transform(load_matrix(columns, info["feature_names"], test)),
+        "y_test": y[test]
+    }
+
+
+def synthetic_csv(rows: int, path: str) -> None:
+    import pandas as pd
+    from synthetic import ClaimSynthesizer, write_chunks
+
+    synthesizer = ClaimSynthesizer(pd.read_csv("insurance_claims.csv", keep_default_na=False))
+    for _ in write_chunks(synthesizer.chunks(rows, 50_000, None, 0.0, False, 42), path, "csv"):
+        pass
+
+
+def compare(name: str, data: Dict[str, np.ndarray], exact_max_rows: int) -> None:
+    from sklearn.metrics import roc_auc_score
+    from sklearn.svm import SVC
+
+    rows = len(data["y_train"])
+    print(f"\n📊 {name}: {rows:,} train / {len(data['y_test']):,} test claims")
+    models = {"SVC(probability=True)": SVC(probability=True), "RFFSVMClassifier": RFFSVMClassifier(random_state=42)}
+    for label, model in models.items():
+        if isinstance(model, SVC) and rows > exact_max_rows:
+            print(f"   {label:<24} skipped ({rows:,} rows > --exact-max-rows {exact_max_rows:,})")
+            continue
+        start = time.perf_counter()
+        model.fit(data["X_train"], data["y_train"])
+        fit_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        proba = model.predict_proba(data["X_test"])[:, 1]
+        predict_seconds = time.perf_counter() - start
+        auc = roc_auc_score(data["y_test"], proba)
+        print(f"   {label:<24} fit {fit_seconds:>8.2f}s   predict {predict_seconds:>6.2f}s   ROC-AUC {auc:.3f}")
+
+
+if __name__ == "__main__":
+    import warnings
+    warnings.filterwarnings("ignore")
+
+    parser = argparse.ArgumentParser(description="Compare exact SVC with RFFSVMClassifier")
+    parser.add_argument("--csv", default="insurance_claims.csv")
+    parser.add_argument("--rows", type=int, nargs="*", default=[], help="also compare on synthetic claims of these sizes")
+    parser.add_argument("--exact-max-rows", type=int, default=60000, help="skip exact SVC above this many train rows")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="approx_svm-")
+    try:
+        datasets = [(args.csv, args.csv)]
+        for rows in args.rows:
+            path = os.path.join(workdir, f"synthetic-{rows}.csv")
+            print(f"🧪 Generating {rows:,} synthetic claims...")
+            synthetic_csv(rows, path)
+            datasets.append((f"synthetic {rows:,}", path))
+
+        for name, csv in datasets:
+            directory = tempfile.mkdtemp(dir=workdir)
+            compare(name, load_claims(csv, directory), args.exact_max_rows)
+            shutil.rmtree(directory)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,118 @@
+"""
+Dynamic micro-batching for concurrent single-claim requests
+Requests wait in an asyncio queue for at most max_wait_ms, or until
+max_batch_size have arrived. They are then scored together as one matrix
+on the default threadpool, and each caller's future is resolved with its
+own result. One batch is scored at a time. Requests that arrive meanwhile
+queue up and form the next batch, so batches grow with the load.
+"""
+
+import asyncio
+import time
+from typing import Any, Callable, Hashable, List, Optional
+
+from metrics import Histogram
+
+# Batch sizes are powers of two, queue waits in milliseconds
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+QUEUE_WAIT_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100, 250)
+
+
+class _Pending:
+    __slots__ = ("item", "key", "future", "enqueued")
+
+    def __init__(self, item: Any, key: Hashable, future: asyncio.Future):
+        self.item = item
+        self.key = key
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Collects submit() calls into batches for score_fn(items, key).
+    Only items with the same key (e.g. the requested output groups)
+    share a call.
+    """
+
+    def __init__(
+        self,
+        score_fn: Callable[[List[Any], Hashable], List[Any]],
+        max_wait_ms: float = 2.0,
+        max_batch_size: int = 64
+    ):
+        self.score_fn = score_fn
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_BUCKETS)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run(self._queue))
+        return self._queue
+
+    async def submit(self, item: Any, key: Hashable = None) -> Any:
+        """Queue one item and wait for its result"""
+        queue = self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        queue.put_nowait(_Pending(item, key, future))
+        return await future
+
+    async def _collect(self, queue: asyncio.Queue) -> List[_Pending]:
+        batch = [await queue.get()]
+        deadline = batch[0].enqueued + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect(queue)
+            dispatched = time.perf_counter()
+            self.batch_sizes.observe(len(batch))
+            for pending in batch:
+                self.queue_wait_ms.observe((dispatched - pending.enqueued) * 1000)
+
+            groups = {}
+            for pending in batch:
+                groups.setdefault(pending.key, []).append(pending)
+
+            for key, members in groups.items():
+                try:
+                    results = await loop.run_in_executor(None, self.score_fn, [p.item for p in members], key)
+                except Exception as e:
+                    for pending in members:
+                        if not pending.future.done():
+                            pending.future.set_exception(e)
+                    continue
+                for pending, result in zip(members, results):
+                    # The caller may have gone away (cancelled request)
+                    if not pending.future.done():
+                        pending.future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+            "max_batch_size": self.max_batch_size,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot()
+        }
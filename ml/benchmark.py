@@ -0,0 +1,357 @@
+"""
+Benchmark suite for the ML service
+Two parts, both run in-process on claims from insurance_claims.csv
+(repeated as needed to fill a batch):
+
+    micro   time each scoring stage of app_explainable.py at batch sizes
+            1 / 16 / 256 / 4096: feature build, scaler, each ensemble
+            member, anomaly, explanations, the heuristic rules (claim
+            by claim and as one batch) and score_claims end to end. It
+            also times the handlers of app.py and backend/ml-api/app.py.
+    load    drive /predict of each app through httpx's ASGI transport
+            (no sockets) at fixed concurrency. Reports throughput,
+            p50 / p95 / p99 latency and process memory.
+
+Results are written as JSON together with the commit and host they ran on.
+compare prints the change between two result files.
+The prediction cache is off unless --cache is given, because repeated
+claims would otherwise hit it.
+
+Usage:
+    python benchmark.py micro -o before.json
+    python benchmark.py load --app explainable --concurrency 1,16,64
+    python benchmark.py all -o after.json
+    python benchmark.py compare before.json after.json
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_FILES = {
+    "explainable": os.path.join(HERE, "app_explainable.py"),
+    "app": os.path.join(HERE, "app.py"),
+    "backend": os.path.join(HERE, "..", "backend", "ml-api", "app.py")
+}
+BATCH_SIZES = (1, 16, 256, 4096)
+
+
+# ============================================
+# Setup
+# ============================================
+
+def load_records(path: str) -> List[Dict[str, Any]]:
+    """Claims as /predict request bodies"""
+    import pandas as pd
+
+    df = pd.read_csv(path, keep_default_na=False).drop(columns=["_c39"], errors="ignore")
+    df = df.rename(columns={"capital-gains": "capital_gains", "capital-loss": "capital_loss"})
+    df["fraud_reported"] = ""
+    return df.to_dict("records")
+
+
+def cycle_to(records: List[Any], n: int) -> List[Any]:
+    return list(itertools.islice(itertools.cycle(records), n))
+
+
+def load_app(name: str) -> Any:
+    """Import one of the API modules by file (two of them are called app.py)"""
+    if name == "explainable":
+        import app_explainable
+        return app_explainable
+    spec = importlib.util.spec_from_file_location(f"benchmark_{name}", APP_FILES[name])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def environment() -> Dict[str, Any]:
+    """What the numbers depend on, so runs from different commits can be compared"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    versions = {}
+    for package in ("numpy", "sklearn", "xgboost", "fastapi", "pydantic"):
+        module = sys.modules.get(package)
+        versions[package] = getattr(module, "__version__", None) if module else None
+
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "versions": versions,
+        "settings": {
+            key: os.environ[key]
+            for key in ("PREDICTION_CACHE_SIZE", "PREDICT_BATCH_SIZE", "PREDICT_BATCH_WAIT_MS",
+                        "CASCADE_SCREEN", "OMP_NUM_THREADS", "MODEL_BUNDLE", "MODEL_REGISTRY")
+            if key in os.environ
+        }
+    }
+
+
+def memory() -> Dict[str, float]:
+    from metrics import process_memory
+
+    try:
+        usage = process_memory()
+    except OSError:
+        usage = {}
+    usage["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return usage
+
+
+# ============================================
+# Micro-benchmarks
+# ============================================
+
+def time_call(fn: Callable, rows: int, budget: float, setup: Optional[Callable] = None,
+              min_runs: int = 3, max_runs: int = 1000) -> Dict[str, Any]:
+    """
+    Time fn (or fn(setup()), with setup untimed) until budget seconds are
+    used, after one untimed warm-up call
+    """
+    fn(setup()) if setup else fn()
+    samples = []
+    deadline = time.perf_counter() + budget
+    while len(samples) < max_runs and (len(samples) < min_runs or time.perf_counter() < deadline):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        fn(arg) if setup else fn()
+        samples.append(time.perf_counter() - start)
+
+    samples = np.array(samples) * 1000
+    median = float(np.median(samples))
+    return {
+        "runs": len(samples),
+        "min_ms": round(float(samples.min()), 4),
+        "median_ms": round(median, 4),
+        "p95_ms": round(float(np.percentile(samples, 95)), 4),
+        "per_row_us": round(median * 1000 / rows, 3)
+    }
+
+
+def micro_stages(api: Any, apps: Dict[str, Any], records: List[Dict], n: int) -> Dict[str, tuple]:
+    """stage name -> (fn, setup) for a batch of n claims"""
+    models = api.active_models
+    claims = [api.ClaimInput(**record) for record in cycle_to(records, n)]
+    stages = {}
+
+    if models.loaded:
+        builder = models.feature_builder
+        X = builder.transform_batch(claims)[0].copy()
+        raw = np.zeros((n, builder.n_features))
+        for i, claim in enumerate(claims):
+            builder.write_row(claim, raw[i])
+        scaled = np.empty(raw.shape, dtype=np.float32)
+
+        if n == 1:
+            stages["features"] = (lambda: builder.transform_one(claims[0]), None)
+        else:
+            stages["features"] = (lambda: builder.transform_batch(claims), None)
+        stages["scaler"] = (lambda scratch: builder.scale(scratch, scaled), raw.copy)
+
+        members = []
+        for name, estimator in models.ensemble.models.items():
+            if estimator is not None:
+                members.append(name)
+                stages[f"model.{name}"] = (lambda estimator=estimator: estimator.predict_proba(X), None)
+        stages["ensemble"] = (lambda: models.ensemble.predict(X), None)
+        if models.anomaly_model is not None:
+            stages["anomaly"] = (lambda: api.detect_anomalies_batch(models, X), None)
+        if models.explainer is not None:
+            stages["explanations"] = (lambda: models.explainer.top_factors(X, 5, members), None)
+
+    stages["heuristic"] = (lambda: [api.heuristic_predict(claim) for claim in claims], None)
+    stages["rules.batch"] = (lambda: api.heuristic_rules.score(claims), None)
+    stages["score_claims"] = (lambda: api.score_claims(claims, check_cache=False), None)
+
+    for name, module in apps.items():
+        app_claims = [module.ClaimInput(**record) for record in cycle_to(records, n)]
+        stages[f"{name}.predict_claim"] = (
+            lambda module=module, app_claims=app_claims: [module.predict_claim(claim) for claim in app_claims], None
+        )
+    return stages
+
+
+def run_micro(args: argparse.Namespace, records: List[Dict]) -> List[Dict[str, Any]]:
+    api = load_app("explainable")
+    api.warm_up_lazy_models()
+    apps = {name: load_app(name) for name in ("app", "backend")}
+
+    results = []
+    for n in args.sizes:
+        for stage, (fn, setup) in micro_stages(api, apps, records, n).items():
+            result = {"stage": stage, "batch_size": n, **time_call(fn, n, args.budget, setup)}
+            results.append(result)
+            print(f"{stage:<26} {n:>5}  {result['median_ms']:>10.3f} ms  {result['per_row_us']:>10.2f} µs/row"
+                  f"  ({result['runs']} runs)")
+    return results
+
+
+# ============================================
+# Load generator
+# ============================================
+
+async def drive(app: Any, path: str, payloads: List[Dict], concurrency: int, requests: int) -> Dict[str, Any]:
+    """Send requests from `concurrency` clients that each wait for their response"""
+    import httpx
+
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    counter = itertools.count()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+        async def client_loop() -> None:
+            while True:
+                i = next(counter)
+                if i >= requests:
+                    return
+                start = time.perf_counter()
+                response = await client.post(path, json=payloads[i % len(payloads)])
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        # Warm-up: lazy imports, first-call allocations, the batcher task
+        for payload in payloads[:concurrency]:
+            await client.post(path, json=payload)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(latencies_ms.max()), 3),
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())}
+    }
+
+
+def run_load(args: argparse.Namespace, records: List[Dict]) -> List[Dict[str, Any]]:
+    results = []
+    for name in args.app:
+        module = load_app(name)
+        if name == "explainable":
+            module.warm_up_lazy_models()
+        path = f"/predict?fields={args.fields}" if name == "explainable" and args.fields else "/predict"
+        for concurrency in args.concurrency:
+            memory_before = memory()
+            result = asyncio.run(drive(module.app, path, records, concurrency, args.requests))
+            result = {"app": name, "path": path, **result, "memory_before": memory_before, "memory_after": memory()}
+            results.append(result)
+            print(f"{name:<12} c={concurrency:<4} {result['throughput_rps']:>8.1f} req/s  "
+                  f"p50 {result['p50_ms']:>7.2f}  p95 {result['p95_ms']:>7.2f}  p99 {result['p99_ms']:>7.2f} ms  "
+                  f"rss {result['memory_after'].get('rss_mb', '?')} MB  errors {result['errors']}")
+    return results
+
+
+# ============================================
+# Comparison
+# ============================================
+
+def compare(old_path: str, new_path: str) -> None:
+    """Print the change in median stage time and load-test results between two runs"""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{old_path} ({old['environment']['commit']}) -> {new_path} ({new['environment']['commit']})")
+
+    def change(before: float, after: float) -> str:
+        return f"{(after / before - 1) * 100:+6.1f}%" if before else "     -"
+
+    old_micro = {(r["stage"], r["batch_size"]): r for r in old.get("micro", [])}
+    for r in new.get("micro", []):
+        before = old_micro.get((r["stage"], r["batch_size"]))
+        if before:
+            print(f"{r['stage']:<26} {r['batch_size']:>5}  {before['median_ms']:>10.3f} -> {r['median_ms']:>10.3f} ms  "
+                  f"{change(before['median_ms'], r['median_ms'])}")
+
+    old_load = {(r["app"], r["concurrency"]): r for r in old.get("load", [])}
+    for r in new.get("load", []):
+        before = old_load.get((r["app"], r["concurrency"]))
+        if before:
+            print(f"{r['app']:<12} c={r['concurrency']:<4} "
+                  f"{before['throughput_rps']:>8.1f} -> {r['throughput_rps']:>8.1f} req/s "
+                  f"{change(before['throughput_rps'], r['throughput_rps'])}  "
+                  f"p99 {before['p99_ms']:>7.2f} -> {r['p99_ms']:>7.2f} ms {change(before['p99_ms'], r['p99_ms'])}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks and in-process load tests for the ML APIs")
+    parser.add_argument("mode", choices=("micro", "load", "all", "compare"))
+    parser.add_argument("files", nargs="*", help="compare: the two result files")
+    parser.add_argument("--csv", default=os.path.join(HERE, "insurance_claims.csv"))
+    parser.add_argument("-o", "--output", help="write results as JSON")
+    parser.add_argument("--sizes", default=",".join(map(str, BATCH_SIZES)), help="micro: batch sizes")
+    parser.add_argument("--budget", type=float, default=0.5, help="micro: seconds per stage and batch size")
+    parser.add_argument("--app", default="explainable,app,backend", help="load: apps to drive")
+    parser.add_argument("--concurrency", default="1,16,64", help="load: concurrent clients")
+    parser.add_argument("--requests", type=int, default=1000, help="load: requests per concurrency level")
+    parser.add_argument("--fields", default="", help="load: ?fields= for app_explainable")
+    parser.add_argument("--cache", action="store_true", help="keep the prediction cache on")
+    args = parser.parse_args()
+
+    args.sizes = [int(size) for size in args.sizes.split(",")]
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+    args.app = [name.strip() for name in args.app.split(",")]
+    for name in args.app:
+        if name not in APP_FILES:
+            parser.error(f"unknown app '{name}' (expected: {', '.join(APP_FILES)})")
+    if args.mode == "compare" and len(args.files) != 2:
+        parser.error("compare needs two result files")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.mode == "compare":
+        compare(*args.files)
+        sys.exit(0)
+
+    # The API reads these at import time; model files are found relative
+    # to the working directory like when serving
+    os.environ["LAZY_WARMUP"] = "0"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if not args.cache:
+        os.environ["PREDICTION_CACHE_SIZE"] = "0"
+    sys.path.insert(0, HERE)
+
+    records = load_records(args.csv)
+    results: Dict[str, Any] = {}
+    if args.mode in ("micro", "all"):
+        results["micro"] = run_micro(args, records)
+    if args.mode in ("load", "all"):
+        results["load"] = run_load(args, records)
+    results = {"environment": environment(), **results}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {args.output}")
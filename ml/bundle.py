@@ -0,0 +1,240 @@
+"""
+Versioned, memory-mappable model bundle
+model.py writes every artifact the API needs into one file. The API maps
+that file into memory instead of unpickling six files. Tree arrays become
+read-only views of the page cache, so workers on one host share them and
+nothing is copied at startup.
+
+Layout (little-endian):
+    8 bytes    magic b"CWBUNDLE"
+    8 bytes    header length
+    header     JSON: format, version, created, meta, arrays, blobs
+    payload    arrays and blobs, each starting on a 64-byte boundary
+
+'version' is a content hash of the metadata and payload. The API uses it
+as the model version, so any change to the artifacts changes the id.
+Only the numerical model parts are stored as arrays. The raw XGBoost
+model (for TreeSHAP) and the IsolationForest are opaque blobs, loaded
+lazily because deserialising them imports xgboost / sklearn.
+
+Usage:
+    python bundle.py                    # pack the *.pkl artifacts into model_bundle.cwb
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import struct
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from compiled_trees import CompiledBooster, CompiledForest, compile_trees, compile_xgboost
+from encoding import CategoryTable
+from lazy import LazyModel
+
+BUNDLE_FORMAT = 1
+BUNDLE_PATH = "model_bundle.cwb"
+MAGIC = b"CWBUNDLE"
+ALIGN = 64
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def write_bundle(path: str, arrays: Dict[str, np.ndarray], blobs: Dict[str, bytes], meta: Dict[str, Any]) -> str:
+    """Write a bundle atomically and return its version"""
+    payload = []  # (offset, bytes)
+    array_index, blob_index = {}, {}
+    offset = 0
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(json.dumps(meta, sort_keys=True).encode())
+
+    for name in sorted(arrays):
+        array = np.asarray(arrays[name], order="C")
+        data = array.tobytes()
+        offset = _aligned(offset)
+        array_index[name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        digest.update(f"{name}|{array.dtype.str}|{array.shape}".encode())
+        digest.update(data)
+        payload.append((offset, data))
+        offset += len(data)
+
+    for name in sorted(blobs):
+        data = bytes(blobs[name])
+        offset = _aligned(offset)
+        blob_index[name] = {"offset": offset, "length": len(data)}
+        digest.update(name.encode())
+        digest.update(data)
+        payload.append((offset, data))
+        offset += len(data)
+
+    header = json.dumps({
+        "format": BUNDLE_FORMAT,
+        "version": digest.hexdigest(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "meta": meta,
+        "arrays": array_index,
+        "blobs": blob_index
+    }).encode()
+    payload_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for array_offset, data in payload:
+            f.seek(payload_start + array_offset)
+            f.write(data)
+    os.replace(tmp_path, path)
+    return digest.hexdigest()
+
+
+class Bundle:
+    """Read-only, memory-mapped view of a bundle file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a model bundle")
+            (header_length,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_length))
+            if header["format"] > BUNDLE_FORMAT:
+                raise ValueError(f"Bundle format {header['format']} is newer than supported ({BUNDLE_FORMAT})")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.format = header["format"]
+        self.version = header["version"]
+        self.created = header["created"]
+        self.meta = header["meta"]
+        self._arrays = header["arrays"]
+        self._blobs = header["blobs"]
+        self._payload_start = _aligned(len(MAGIC) + 8 + header_length)
+
+    def array(self, name: str) -> np.ndarray:
+        """Zero-copy view into the mapped file"""
+        entry = self._arrays[name]
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"], dtype=np.int64))
+        return np.frombuffer(
+            self._map, dtype=dtype, count=count, offset=self._payload_start + entry["offset"]
+        ).reshape(tuple(entry["shape"]))
+
+    def arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        """All arrays named '<prefix>/<key>', keyed by <key>"""
+        start = f"{prefix}/"
+        return {name[len(start):]: self.array(name) for name in self._arrays if name.startswith(start)}
+
+    def blob(self, name: str) -> bytes:
+        entry = self._blobs[name]
+        start = self._payload_start + entry["offset"]
+        return self._map[start:start + entry["length"]]
+
+    def has_blob(self, name: str) -> bool:
+        return name in self._blobs
+
+
+class ScalerParams:
+    """The StandardScaler attributes FeatureBuilder needs"""
+
+    def __init__(self, mean: np.ndarray, scale: np.ndarray):
+        self.mean_ = mean
+        self.scale_ = scale
+        self.n_features_in_ = len(mean)
+
+
+class ModelArtifacts:
+    """Everything the API loads from a bundle"""
+
+    def __init__(self, bundle: Bundle):
+        self.bundle = bundle
+        self.version = bundle.version
+        self.feature_names = list(bundle.meta["feature_names"])
+        self.scaler = ScalerParams(bundle.array("scaler/mean"), bundle.array("scaler/scale"))
+        self.category_tables = {column: CategoryTable(classes) for column, classes in bundle.meta["encoders"].items()}
+        self.feature_importances = bundle.array("feature_importances")
+
+        self.rf_compiled = CompiledForest.from_arrays(bundle.arrays("RandomForest"))
+        self.dt_compiled = CompiledForest.from_arrays(bundle.arrays("DecisionTree"))
+        self.xgb_compiled = CompiledBooster.from_arrays(bundle.arrays("XGBoost"))
+
+        self.xgb_model = LazyModel("xgboost", self._load_xgboost)
+        self.anomaly_model = (
+            LazyModel("anomaly_model", lambda: pickle.loads(bundle.blob("anomaly_model.pkl")))
+            if bundle.has_blob("anomaly_model.pkl") else None
+        )
+
+    def _load_xgboost(self) -> Any:
+        from xgboost import XGBClassifier
+        xgb_model = XGBClassifier()
+        xgb_model.load_model(bytearray(self.bundle.blob("XGBoost/model.ubj")))
+        return xgb_model
+
+
+def save_model_bundle(
+    path: str,
+    rf: Any,
+    dt: Any,
+    xgb: Any,
+    scaler: Any,
+    feature_names: list,
+    encoders: Dict[str, Any],
+    anomaly_model: Optional[Any] = None
+) -> str:
+    """Compile the fitted models and write them as one bundle"""
+    arrays = {
+        "scaler/mean": np.asarray(scaler.mean_, dtype=np.float64),
+        "scaler/scale": np.asarray(scaler.scale_, dtype=np.float64),
+        "feature_importances": np.asarray(rf.feature_importances_, dtype=np.float64)
+    }
+    for prefix, compiled in (
+        ("RandomForest", compile_trees(rf)),
+        ("DecisionTree", compile_trees(dt)),
+        ("XGBoost", compile_xgboost(xgb))
+    ):
+        for key, array in compiled.to_arrays().items():
+            arrays[f"{prefix}/{key}"] = array
+
+    blobs = {"XGBoost/model.ubj": bytes(xgb.get_booster().save_raw("ubj"))}
+    if anomaly_model is not None:
+        blobs["anomaly_model.pkl"] = pickle.dumps(anomaly_model)
+
+    meta = {
+        "feature_names": [str(name) for name in feature_names],
+        "encoders": {column: [str(c) for c in encoder.classes_] for column, encoder in encoders.items()}
+    }
+    return write_bundle(path, arrays, blobs, meta)
+
+
+def load_model_bundle(path: str = BUNDLE_PATH) -> ModelArtifacts:
+    return ModelArtifacts(Bundle(path))
+
+
+if __name__ == "__main__":
+    import time
+
+    def load(name: str) -> Any:
+        return pickle.load(open(name, "rb"))
+
+    version = save_model_bundle(
+        BUNDLE_PATH,
+        rf=load("fraud_model.pkl"),
+        dt=load("dt_model.pkl"),
+        xgb=load("xgb_model.pkl"),
+        scaler=load("scaler.pkl"),
+        feature_names=load("feature_names.pkl"),
+        encoders=load("encoders.pkl"),
+        anomaly_model=load("anomaly_model.pkl") if os.path.exists("anomaly_model.pkl") else None
+    )
+    size_mb = os.path.getsize(BUNDLE_PATH) / 1e6
+    print(f"✅ {BUNDLE_PATH} written ({size_mb:.1f} MB, version {version})")
+
+    start = time.perf_counter()
+    artifacts = load_model_bundle(BUNDLE_PATH)
+    print(f"   opened in {(time.perf_counter() - start) * 1000:.1f} ms")
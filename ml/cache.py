@@ -0,0 +1,135 @@
+"""
+Content-addressed prediction cache
+Identical claims scored by the same models with the same output fields get
+the same response, so retries, re-runs and duplicate uploads are answered
+from memory instead of re-running the ensemble and explanations.
+
+Keys are a BLAKE2b hash of the validated claim (fields in schema order,
+values already coerced by pydantic, so "1000" and 1000.0 hash the same),
+the model version and the requested output groups. The model version is
+the registry version id, or a content hash of the loaded artifacts.
+Entries from any other version are dropped as soon as the version changes.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+
+def artifact_fingerprint(paths: Iterable[str]) -> str:
+    """Short content hash over the artifact files that exist"""
+    digest = hashlib.blake2b(digest_size=8)
+    for path in sorted(paths):
+        if not os.path.exists(path):
+            continue
+        digest.update(path.encode())
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU with a TTL, bounded by entry count and approximate
+    bytes. max_entries=0 disables caching.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 << 20, ttl_seconds: float = 600.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.version = ""
+
+        self._lock = threading.Lock()
+        # key -> (expires_at, size_bytes, value)
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def key(self, values: Iterable[Any], groups: Iterable[str] = (), version: Optional[str] = None) -> bytes:
+        """Cache key for one claim's field values (default: the current version)"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr(tuple(values)).encode())
+        digest.update(f"|{self.version if version is None else version}|{','.join(sorted(groups))}".encode())
+        return digest.digest()
+
+    def get(self, key: bytes) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] < now:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key: bytes, value: Any, size_bytes: int, version: Optional[str] = None) -> None:
+        """Store a result; results scored by a version that is no longer current are dropped"""
+        if not self.enabled or size_bytes > self.max_bytes:
+            return
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, size_bytes, value)
+            self._bytes += size_bytes
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: bytes) -> None:
+        _, size_bytes, _ = self._entries.pop(key)
+        self._bytes -= size_bytes
+
+    def set_version(self, version: str) -> None:
+        """Switch model version, dropping every entry scored by the old one"""
+        with self._lock:
+            if version != self.version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._bytes = 0
+                self.version = version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "model_version": self.version,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations
+            }
@@ -0,0 +1,199 @@
+"""
+Cascade scoring
+A cheap screen scores every claim first. Claims whose screen score falls
+outside the uncertainty band [low, high] are decided by the screen alone.
+Only claims inside the band go through the full RF + XGBoost + DT
+ensemble and TreeSHAP explanations.
+
+Screens:
+    tree          DecisionTree probability (one compiled tree)
+    rules         heuristic rule score (claimwatch-rules)
+    tree+rules    mean of the two (default)
+
+The shipped DecisionTree is unpruned, so its probability is always 0 or
+1. On its own it decides every claim and there is no band. Averaging it
+with the rule score gives a graded score whose low end is reliably
+low risk.
+
+Usage:
+    python cascade.py                                   # sweep screens / bands on insurance_claims.csv
+    python cascade.py --screen tree+rules --low 0.25    # one configuration
+"""
+
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from ensemble import EnsembleResult
+
+SCREENS = ("tree", "rules", "tree+rules")
+
+
+def screen_result(tree_proba: Optional[np.ndarray], rules_proba: Optional[np.ndarray]) -> EnsembleResult:
+    """EnsembleResult for the screen members, scored like the full ensemble"""
+    probabilities = {}
+    if tree_proba is not None:
+        probabilities["DecisionTree"] = tree_proba
+    if rules_proba is not None:
+        probabilities["Heuristic"] = rules_proba
+
+    labels = {name: (proba >= 0.5).astype(int) for name, proba in probabilities.items()}
+    score = np.vstack(list(probabilities.values())).mean(axis=0)
+    prediction = (score >= 0.5).astype(int)
+    votes = np.vstack(list(labels.values()))
+
+    return EnsembleResult(
+        model_names=list(probabilities),
+        probabilities=probabilities,
+        labels=labels,
+        ensemble_prediction=prediction,
+        ensemble_probability=score,
+        model_agreement=np.round((votes == prediction).mean(axis=0) * 100, 2),
+        primary_prediction=prediction,
+        confidence=np.maximum(score, 1.0 - score),
+        timings={}
+    )
+
+
+class Cascade:
+    """Screen configuration plus per-stage counters"""
+
+    def __init__(self, screen: str = "tree+rules", low: float = 0.25, high: float = 1.0):
+        if screen not in SCREENS:
+            raise ValueError(f"Unknown cascade screen '{screen}' (expected one of: {', '.join(SCREENS)})")
+        if not low <= high:
+            raise ValueError(f"Cascade band is empty: low={low} > high={high}")
+        self.screen = screen
+        self.low = low
+        self.high = high
+
+        self._lock = threading.Lock()
+        self.decided_low = 0
+        self.decided_high = 0
+        self.escalated = 0
+
+    @property
+    def uses_tree(self) -> bool:
+        return "tree" in self.screen
+
+    @property
+    def uses_rules(self) -> bool:
+        return "rules" in self.screen
+
+    def split(self, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(decided, escalated) row indices; scores inside [low, high] escalate"""
+        below = scores < self.low
+        above = scores > self.high
+        decided = below | above
+        with self._lock:
+            self.decided_low += int(below.sum())
+            self.decided_high += int(above.sum())
+            self.escalated += int(len(scores) - decided.sum())
+        return np.flatnonzero(decided), np.flatnonzero(~decided)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.decided_low + self.decided_high + self.escalated
+            return {
+                "enabled": True,
+                "screen": self.screen,
+                "band": [self.low, self.high],
+                "claims": total,
+                "decided_low": self.decided_low,
+                "decided_high": self.decided_high,
+                "escalated": self.escalated,
+                "screen_hit_rate": round((self.decided_low + self.decided_high) / total, 4) if total else 0.0
+            }
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import time
+
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Measure cascade scoring against full ensemble scoring")
+    parser.add_argument("csv", nargs="?", default="insurance_claims.csv")
+    parser.add_argument("--screen", choices=SCREENS)
+    parser.add_argument("--low", type=float, default=0.25)
+    parser.add_argument("--high", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ["LAZY_WARMUP"] = "0"
+    os.environ["PREDICTION_CACHE_SIZE"] = "0"
+    os.environ.pop("CASCADE_SCREEN", None)
+    import app_explainable as api
+
+    api.warm_up_lazy_models()
+    df = pd.read_csv(args.csv, keep_default_na=False).drop(columns=["_c39"], errors="ignore")
+    labels = (df.pop("fraud_reported") == "Y").astype(int).to_numpy()
+    records = df.rename(columns={"capital-gains": "capital_gains", "capital-loss": "capital_loss"}).to_dict("records")
+    claims = [api.ClaimInput(**record, fraud_reported="") for record in records]
+
+    def run(cascade: Optional[Cascade], chunk: int = 50) -> tuple:
+        """
+        Responses scored one claim at a time (like /predict), plus seconds
+        per chunk of claims scored singly and as one batch
+        """
+        api.cascade = cascade
+        single, single_s, batch_s = [], [], []
+        for offset in range(0, len(claims), chunk):
+            part = claims[offset:offset + chunk]
+            start = time.perf_counter()
+            single.extend(api.score_ml([claim])[0] for claim in part)
+            single_s.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            api.score_ml(part)
+            batch_s.append(time.perf_counter() - start)
+        return single, np.array(single_s), np.array(batch_s)
+
+    if args.screen:
+        configs = [(args.screen, args.low, args.high)]
+    else:
+        configs = [("tree", 0.5, 0.5)] + [
+            (screen, low, high)
+            for screen in ("rules", "tree+rules")
+            for low in (0.2, 0.25, 0.3)
+            for high in (1.0, 0.9)
+        ]
+
+    rows = []
+    full = run(None)[0]
+    full_fraud = np.array([p.fraud for p in full])
+    full_prob = np.array([p.probability for p in full])
+
+    for screen, low, high in configs:
+        # Alternate full / cascade runs and keep the fastest run of every
+        # chunk, so load spikes on the host don't land on one side
+        cascade = Cascade(screen, low, high)
+        best = np.full((4, -(-len(claims) // 50)), np.inf)
+        for _ in range(args.repeat):
+            _, full_single_s, full_batch_s = run(None)
+            scored, single_s, batch_s = run(cascade)
+            best = np.minimum(best, [full_single_s, full_batch_s, single_s, batch_s])
+        best = best.sum(axis=1) * 1000 / len(claims)
+
+        fraud = np.array([p.fraud for p in scored])
+        prob = np.array([p.probability for p in scored])
+        stats = cascade.stats()
+        rows.append((
+            f"{screen} [{low}, {high}]",
+            stats["decided_low"] / stats["claims"] * 100,
+            stats["decided_high"] / stats["claims"] * 100,
+            stats["escalated"] / stats["claims"] * 100,
+            (fraud == full_fraud).mean() * 100,
+            ((fraud == labels).mean() - (full_fraud == labels).mean()) * 100,
+            np.abs(prob - full_prob).mean(),
+            best[2], (1 - best[2] / best[0]) * 100,
+            best[3], (1 - best[3] / best[1]) * 100
+        ))
+
+    print(f"{len(claims)} claims from {args.csv}, full ensemble accuracy {(full_fraud == labels).mean() * 100:.1f}%")
+    print(f"{'cascade':<24} {'low%':>6} {'high%':>6} {'esc%':>6} {'agree%':>7} {'Δacc':>6} {'|Δp|':>6} "
+          f"{'single_ms':>9} {'saved%':>7} {'batch_ms':>9} {'saved%':>7}")
+    for row in rows:
+        print(f"{row[0]:<24} {row[1]:>6.1f} {row[2]:>6.1f} {row[3]:>6.1f} {row[4]:>7.1f} {row[5]:>+6.1f} {row[6]:>6.3f} "
+              f"{row[7]:>9.2f} {row[8]:>7.1f} {row[9]:>9.3f} {row[10]:>7.1f}")
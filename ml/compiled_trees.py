@@ -0,0 +1,321 @@
+"""
+Compiled tree inference
+Packs fitted sklearn RandomForest / DecisionTree classifiers and
+XGBoost binary:logistic boosters into flat NumPy arrays and walks every
+tree for a whole batch in lockstep, without per-call validation, the
+per-estimator Python loop, or importing sklearn / xgboost at all.
+
+Probabilities match sklearn's predict_proba bit for bit: inputs are cast
+to float32 like sklearn does, leaf values are normalised the same way and
+per-tree probabilities are accumulated in estimator order. Boosted trees
+accumulate float32 margins in tree order like xgboost (margins are
+identical, probabilities within 1 ulp); inputs must not contain NaN
+(xgboost's missing-value branches are not compiled). xgboost's own
+multi-threaded predictor wins beyond ~16 rows, see SmallBatchRouter.
+
+Usage:
+    python compiled_trees.py            # compile fraud_model.pkl / dt_model.pkl / xgb_model.pkl and check parity
+    python -m pytest tests/test_compiled_trees.py
+"""
+
+import json
+import pickle
+import time
+from typing import Any, Dict
+
+import numpy as np
+
+
+class CompiledForest:
+    """A tree ensemble as packed node arrays (a single tree is a forest of one)"""
+
+    def __init__(self, feature, threshold, children, value, roots, max_depth, classes):
+        self.feature = feature        # int64  (n_nodes,)    split feature, 0 for leaves
+        self.threshold = threshold    # float64 (n_nodes,)   go left if x <= threshold
+        self.children = children      # int64  (n_nodes, 2)  absolute [left, right]; leaves point at themselves
+        self.value = value            # float64 (n_nodes, n_classes) normalised class probabilities
+        self.roots = roots            # int64  (n_trees,)
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node index reached by every (tree, row) pair, shape (n_trees, n_rows)"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+
+        node = np.repeat(self.roots, n_rows)
+        row_offset = np.tile(np.arange(n_rows) * n_features, self.n_trees)
+
+        # Leaves are self-loops, so every path can just take max_depth steps
+        for _ in range(self.max_depth):
+            go_right = flat_X[row_offset + self.feature[node]] > self.threshold[node]
+            node = self.children[node, go_right.view(np.int8)]
+
+        return node.reshape(self.n_trees, n_rows)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        leaves = self.apply(X)
+        # Sequential reduction over axis 0 == sklearn's tree-by-tree accumulation
+        proba = np.add.reduce(self.value[leaves], axis=0)
+        if self.n_trees > 1:
+            proba /= self.n_trees
+        return proba
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_.take(self.predict_proba(X).argmax(axis=1))
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "children": self.children,
+            "value": self.value,
+            "roots": self.roots,
+            "max_depth": np.asarray(self.max_depth),
+            "classes": np.asarray(self.classes_)
+        }
+
+    @classmethod
+    def from_arrays(cls, data: Dict[str, np.ndarray]) -> "CompiledForest":
+        return cls(
+            data["feature"],
+            data["threshold"],
+            data["children"],
+            data["value"],
+            data["roots"],
+            data["max_depth"],
+            data["classes"]
+        )
+
+    def save(self, path: str) -> None:
+        np.savez(path, **self.to_arrays())
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledForest":
+        return cls.from_arrays(np.load(path))
+
+
+class CompiledBooster(CompiledForest):
+    """
+    Gradient-boosted trees for binary:logistic. value holds float32 leaf
+    margins, P(fraud) = sigmoid(base_margin + sum of leaves).
+    """
+
+    def __init__(self, feature, threshold, children, value, roots, max_depth, classes, base_margin):
+        super().__init__(feature, threshold, children, value, roots, max_depth, classes)
+        self.base_margin = np.float32(base_margin)
+
+    def predict_margin(self, X: np.ndarray) -> np.ndarray:
+        leaves = self.apply(X)
+        margins = np.empty((self.n_trees + 1, leaves.shape[1]), dtype=np.float32)
+        margins[0] = self.base_margin
+        margins[1:] = self.value[leaves]
+        # Row-by-row float32 accumulation == xgboost's tree-by-tree sum
+        return np.add.reduce(margins, axis=0)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        margin = self.predict_margin(X).astype(np.float64)
+        positive = (1.0 / (1.0 + np.exp(-margin))).astype(np.float32)
+        return np.column_stack([np.float32(1.0) - positive, positive])
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        arrays = super().to_arrays()
+        arrays["base_margin"] = np.asarray(self.base_margin)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, data: Dict[str, np.ndarray]) -> "CompiledBooster":
+        return cls(
+            data["feature"],
+            data["threshold"],
+            data["children"],
+            data["value"],
+            data["roots"],
+            data["max_depth"],
+            data["classes"],
+            data["base_margin"]
+        )
+
+
+class SmallBatchRouter:
+    """
+    Compiled trees for small batches, the native model for larger ones.
+    native may be a lazy.LazyModel; until it has loaded, every batch uses
+    the compiled trees.
+    """
+
+    def __init__(self, compiled: CompiledForest, native: Any, max_compiled_rows: int = 16):
+        self.compiled = compiled
+        self.native = native
+        self.max_compiled_rows = max_compiled_rows
+        self.classes_ = compiled.classes_
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        if len(X) > self.max_compiled_rows and self.native is not None and getattr(self.native, "loaded", True):
+            return self.native.predict_proba(X)
+        return self.compiled.predict_proba(X)
+
+
+def compile_trees(estimator: Any) -> CompiledForest:
+    """Compile a fitted RandomForestClassifier or DecisionTreeClassifier"""
+    trees = getattr(estimator, "estimators_", [estimator])
+
+    features, thresholds, children, values, roots = [], [], [], [], []
+    offset = 0
+    max_depth = 0
+
+    for tree_model in trees:
+        tree = tree_model.tree_
+        n_nodes = tree.node_count
+        node_ids = np.arange(n_nodes)
+        is_leaf = tree.children_left == -1
+
+        feature = np.where(is_leaf, 0, tree.feature).astype(np.int64)
+        left = np.where(is_leaf, node_ids, tree.children_left) + offset
+        right = np.where(is_leaf, node_ids, tree.children_right) + offset
+
+        # Same normalisation as DecisionTreeClassifier.predict_proba
+        value = tree.value[:, 0, :].astype(np.float64)
+        normalizer = value.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        value = value / normalizer
+
+        features.append(feature)
+        thresholds.append(tree.threshold.astype(np.float64))
+        children.append(np.column_stack([left, right]).astype(np.int64))
+        values.append(value)
+        roots.append(offset)
+        max_depth = max(max_depth, tree.max_depth)
+        offset += n_nodes
+
+    return CompiledForest(
+        np.concatenate(features),
+        np.concatenate(thresholds),
+        np.concatenate(children),
+        np.concatenate(values),
+        np.asarray(roots, dtype=np.int64),
+        max_depth,
+        np.asarray(estimator.classes_)
+    )
+
+
+def compile_xgboost(xgb_model: Any) -> CompiledBooster:
+    """Compile a fitted binary:logistic XGBClassifier (numerical splits only)"""
+    learner = json.loads(xgb_model.get_booster().save_raw("json"))["learner"]
+    objective = learner["objective"]["name"]
+    if objective != "binary:logistic":
+        raise ValueError(f"Unsupported XGBoost objective: {objective}")
+
+    base_score = float(str(learner["learner_model_param"]["base_score"]).strip("[]"))
+    base_margin = np.log(base_score / (1.0 - base_score))
+
+    features, thresholds, children, values, roots = [], [], [], [], []
+    offset = 0
+    max_depth = 0
+
+    for tree in learner["gradient_booster"]["model"]["trees"]:
+        if any(tree["split_type"]):
+            raise ValueError("Categorical XGBoost splits are not supported")
+        left = np.asarray(tree["left_children"], dtype=np.int64)
+        right = np.asarray(tree["right_children"], dtype=np.int64)
+        conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+        n_nodes = len(left)
+        node_ids = np.arange(n_nodes)
+        is_leaf = left == -1
+
+        # xgboost goes left if x < condition; for float32 x that is the
+        # same as x <= the next float32 below the condition
+        threshold = np.nextafter(conditions, np.float32(-np.inf))
+
+        depth = np.zeros(n_nodes, dtype=np.int64)
+        for node in range(n_nodes):  # parents always come before children
+            if not is_leaf[node]:
+                depth[left[node]] = depth[right[node]] = depth[node] + 1
+
+        features.append(np.where(is_leaf, 0, tree["split_indices"]).astype(np.int64))
+        thresholds.append(np.where(is_leaf, np.float32(0.0), threshold).astype(np.float32))
+        children.append(np.column_stack([
+            np.where(is_leaf, node_ids, left) + offset,
+            np.where(is_leaf, node_ids, right) + offset
+        ]).astype(np.int64))
+        values.append(np.where(is_leaf, conditions, np.float32(0.0)).astype(np.float32))
+        roots.append(offset)
+        max_depth = max(max_depth, int(depth.max()))
+        offset += n_nodes
+
+    return CompiledBooster(
+        np.concatenate(features),
+        np.concatenate(thresholds),
+        np.concatenate(children),
+        np.concatenate(values),
+        np.asarray(roots, dtype=np.int64),
+        max_depth,
+        np.asarray(xgb_model.classes_),
+        base_margin
+    )
+
+
+def check_parity(estimator: Any, compiled: CompiledForest, X: np.ndarray) -> dict:
+    """Compare compiled probabilities and latency against sklearn"""
+    expected = estimator.predict_proba(X)
+    actual = compiled.predict_proba(X)
+
+    def best_of(fn, repeat=20):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        return best * 1000
+
+    row = X[:1]
+    return {
+        "rows": len(X),
+        "bit_identical": bool(np.array_equal(expected, actual)),
+        "max_abs_diff": float(np.abs(expected - actual).max()),
+        "sklearn_single_ms": round(best_of(lambda: estimator.predict_proba(row)), 3),
+        "compiled_single_ms": round(best_of(lambda: compiled.predict_proba(row)), 3),
+        "sklearn_batch_ms": round(best_of(lambda: estimator.predict_proba(X), 5), 3),
+        "compiled_batch_ms": round(best_of(lambda: compiled.predict_proba(X), 5), 3)
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import tempfile
+    import warnings
+    warnings.filterwarnings("ignore")
+
+    parser = argparse.ArgumentParser(description="Compile the tree models and check parity with sklearn / xgboost")
+    parser.add_argument("-o", "--output", default=None, help="directory for the .compiled.npz files (default: a temp directory)")
+    args = parser.parse_args()
+    output = args.output or tempfile.mkdtemp(prefix="compiled_trees-")
+    os.makedirs(output, exist_ok=True)
+
+    scaler = pickle.load(open("scaler.pkl", "rb"))
+
+    # Real claims when the training data is around, random rows otherwise
+    try:
+        from ingest import ingest_claims, load_matrix
+        feature_names = pickle.load(open("feature_names.pkl", "rb"))
+        columns_dir = tempfile.mkdtemp(prefix="claims_columns-")
+        ingest_claims("insurance_claims.csv", columns_dir)
+        columns = {name: np.load(os.path.join(columns_dir, f"{name}.npy")) for name in feature_names}
+        X = scaler.transform(load_matrix(columns, feature_names))
+    except Exception as e:
+        print(f"⚠️  Using random rows for parity check ({e})")
+        X = np.random.default_rng(42).normal(size=(1000, scaler.n_features_in_))
+
+    for name in ("fraud_model", "dt_model", "xgb_model"):
+        estimator = pickle.load(open(f"{name}.pkl", "rb"))
+        compiled = compile_xgboost(estimator) if name == "xgb_model" else compile_trees(estimator)
+        path = os.path.join(output, f"{name}.compiled.npz")
+        compiled.save(path)
+        print(f"✅ {name}: {compiled.n_trees} trees, {len(compiled.feature)} nodes -> {path}")
+        print(f"   {check_parity(estimator, compiled, X)}")
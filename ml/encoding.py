@@ -0,0 +1,52 @@
+"""
+Precompiled categorical encoding
+Turns the LabelEncoders saved in encoders.pkl into lookup tables once at
+startup. Values never seen during training map to UNKNOWN_CODE instead of
+raising like LabelEncoder.transform does.
+
+UNKNOWN_CODE sorts below every real code and the tree splits sit between
+training codes, so an unseen value scores exactly like the column's code 0
+(the first of LabelEncoder.classes_). The API reports those columns per
+claim in unknown_categories so callers can tell the score used a fallback.
+"""
+
+from typing import Any, Dict, Iterable
+
+import numpy as np
+
+# Code for categories that weren't in the training data (scores like code 0)
+UNKNOWN_CODE = -1
+
+
+class CategoryTable:
+    """Value -> integer code lookup for one categorical column"""
+
+    def __init__(self, classes: Iterable[Any]):
+        # Codes are positions in LabelEncoder.classes_
+        labels = [str(c) for c in classes]
+        self.lookup = {value: code for code, value in enumerate(labels)}
+
+        # Sorted copy + original codes for the vectorised search
+        order = np.argsort(np.asarray(labels, dtype=str), kind="stable")
+        self.classes = np.asarray(labels, dtype=str)[order]
+        self.codes = order.astype(np.int32)
+
+    def __len__(self) -> int:
+        return len(self.classes)
+
+    def encode(self, value: Any) -> int:
+        return self.lookup.get(value if isinstance(value, str) else str(value), UNKNOWN_CODE)
+
+    def encode_column(self, values: Iterable[Any]) -> np.ndarray:
+        """Encode a whole column with one sorted search"""
+        values = np.asarray(values, dtype=str)
+        if len(self.classes) == 0:
+            return np.full(len(values), UNKNOWN_CODE, dtype=np.int32)
+        positions = np.searchsorted(self.classes, values)
+        positions = np.minimum(positions, len(self.classes) - 1)
+        return np.where(self.classes[positions] == values, self.codes[positions], UNKNOWN_CODE).astype(np.int32)
+
+
+def compile_encoders(encoders: Dict[str, Any]) -> Dict[str, CategoryTable]:
+    """Compile {column: LabelEncoder} into {column: CategoryTable}"""
+    return {column: CategoryTable(encoder.classes_) for column, encoder in encoders.items()}
@@ -0,0 +1,108 @@
+"""
+Single-pass ensemble inference
+Every model's predict_proba runs exactly once per batch; labels, votes,
+agreement, ensemble probability and confidence are all derived from
+those arrays.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+import numpy as np
+
+from logs import get_logger
+from metrics import timings
+
+log = get_logger("ensemble")
+
+
+@dataclass
+class EnsembleResult:
+    model_names: List[str]                  # every configured member, loaded or not
+    probabilities: Dict[str, np.ndarray]    # P(fraud) per member that ran
+    labels: Dict[str, np.ndarray]           # predicted class per member that ran
+    ensemble_prediction: np.ndarray         # majority vote
+    ensemble_probability: np.ndarray        # mean P(fraud) over members
+    model_agreement: np.ndarray             # % of members agreeing with the majority
+    primary_prediction: np.ndarray          # label of the primary model
+    confidence: np.ndarray                  # max class probability of the primary model
+    timings: Dict[str, float]               # seconds spent per member
+
+    def __len__(self) -> int:
+        return len(self.ensemble_probability)
+
+    def votes_for(self, i: int) -> Dict[str, int]:
+        """Per-model votes for row i (0 for members that didn't run)"""
+        return {
+            name: int(self.labels[name][i]) if name in self.labels else 0
+            for name in self.model_names
+        }
+
+    def take(self, rows: np.ndarray) -> "EnsembleResult":
+        """Result for a subset of rows"""
+        return EnsembleResult(
+            model_names=self.model_names,
+            probabilities={name: p[rows] for name, p in self.probabilities.items()},
+            labels={name: l[rows] for name, l in self.labels.items()},
+            ensemble_prediction=self.ensemble_prediction[rows],
+            ensemble_probability=self.ensemble_probability[rows],
+            model_agreement=self.model_agreement[rows],
+            primary_prediction=self.primary_prediction[rows],
+            confidence=self.confidence[rows],
+            timings=self.timings
+        )
+
+
+class EnsembleEngine:
+    """Evaluates a fixed set of classifiers once per batch"""
+
+    def __init__(self, models: Dict[str, Any], primary: str = "RandomForest"):
+        self.models = models
+        self.primary = primary
+
+    def predict(self, X: np.ndarray) -> EnsembleResult:
+        probabilities = {}
+        labels = {}
+        model_timings = {}
+        primary_proba = None
+
+        for name, estimator in self.models.items():
+            if estimator is None:
+                continue
+            start = time.perf_counter()
+            try:
+                proba = estimator.predict_proba(X)
+            except Exception as e:
+                log.warning(f"⚠️  {name} error: {e}")
+                continue
+            finally:
+                elapsed = time.perf_counter() - start
+                model_timings[name] = elapsed
+                timings.observe(f"model.{name}", elapsed, len(X))
+
+            # Same rule as predict(): the class with the highest probability
+            classes = getattr(estimator, "classes_", np.arange(proba.shape[1]))
+            labels[name] = np.asarray(classes).take(proba.argmax(axis=1)).astype(int)
+            probabilities[name] = proba[:, 1]
+            if name == self.primary:
+                primary_proba = proba
+
+        if primary_proba is None:
+            raise RuntimeError(f"Primary model {self.primary} produced no prediction")
+
+        votes = np.vstack(list(labels.values()))
+        majority = (votes.sum(axis=0) > len(votes) / 2).astype(int)
+        agreement = np.round((votes == majority).mean(axis=0) * 100, 2)
+
+        return EnsembleResult(
+            model_names=list(self.models),
+            probabilities=probabilities,
+            labels=labels,
+            ensemble_prediction=majority,
+            ensemble_probability=np.vstack(list(probabilities.values())).mean(axis=0),
+            model_agreement=agreement,
+            primary_prediction=labels[self.primary],
+            confidence=primary_proba.max(axis=1),
+            timings=model_timings
+        )
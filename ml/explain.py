@@ -0,0 +1,210 @@
+"""
+Per-claim local explanations for the tree ensemble
+Attributes each claim's fraud probability to its features, batched
+across claims:
+
+  * RandomForest / DecisionTree: Saabas path contributions over the
+    compiled node arrays. The change in the node's fraud probability
+    along each split is credited to the split feature. Per-node deltas
+    are precomputed at load time, so a batch costs one lockstep tree walk.
+  * XGBoost: exact TreeSHAP from xgboost's native pred_contribs, rescaled
+    from log-odds into probability space.
+
+Member contributions are averaged the same way the ensemble averages
+probabilities, so for every claim
+    base_value + sum(contributions) == ensemble probability
+
+Latency budget (300-tree RF + 300-tree XGB + DT, 38 features):
+    1 claim     < 2 ms    (shap.TreeExplainer on the RF alone: ~20 ms)
+    256 claims  < 80 ms
+Check against this machine with 'python explain.py', which also
+compares the attributions with the shap reference implementation;
+tests/test_explain.py asserts that agreement.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from compiled_trees import CompiledBooster, CompiledForest
+
+
+class PathContributions:
+    """Saabas-style feature contributions over a CompiledForest"""
+
+    method = "path contributions"
+
+    def __init__(self, forest: CompiledForest, class_index: int = 1):
+        self.forest = forest
+        node_value = forest.value[:, class_index]
+        # Change in P(class) when leaving each node to the [left, right] child
+        self.deltas = node_value[forest.children] - node_value[:, np.newaxis]
+        self.base_value = float(node_value[forest.roots].mean())
+
+    def explain(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(base_value per row, contributions of shape (n_rows, n_features))"""
+        forest = self.forest
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+
+        node = np.repeat(forest.roots, n_rows)
+        row_offset = np.tile(np.arange(n_rows) * n_features, forest.n_trees)
+        contributions = np.zeros(n_rows * n_features)
+
+        for _ in range(forest.max_depth):
+            slot = row_offset + forest.feature[node]
+            go_right = (flat_X[slot] > forest.threshold[node]).view(np.int8)
+            # Leaves are self-loops with zero delta, so finished paths add nothing
+            contributions += np.bincount(slot, weights=self.deltas[node, go_right], minlength=n_rows * n_features)
+            node = forest.children[node, go_right]
+
+        contributions /= forest.n_trees
+        return np.full(n_rows, self.base_value), contributions.reshape(n_rows, n_features)
+
+
+class XGBoostContributions:
+    """
+    Exact TreeSHAP from xgboost, mapped into probability space.
+    xgb_model may be a lazy.LazyModel; it is loaded on the first explain().
+    """
+
+    method = "TreeSHAP"
+
+    def __init__(self, xgb_model: Any):
+        self.xgb_model = xgb_model
+
+    def explain(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        import xgboost
+
+        phi = self.xgb_model.get_booster().predict(xgboost.DMatrix(np.asarray(X, dtype=np.float32)), pred_contribs=True)
+        bias_margin = phi[:, -1].astype(np.float64)
+        margin_contributions = phi[:, :-1].astype(np.float64)
+        margin = bias_margin + margin_contributions.sum(axis=1)
+
+        probability = 1.0 / (1.0 + np.exp(-margin))
+        base_probability = 1.0 / (1.0 + np.exp(-bias_margin))
+
+        # Rescale so contributions sum to p - p(bias); use the slope when the margin didn't move
+        moved = np.abs(margin - bias_margin) > 1e-12
+        scale = np.where(
+            moved,
+            (probability - base_probability) / np.where(moved, margin - bias_margin, 1.0),
+            probability * (1.0 - probability)
+        )
+        return base_probability, margin_contributions * scale[:, np.newaxis]
+
+
+class LocalExplainer:
+    """Per-claim contributions to the ensemble fraud probability"""
+
+    def __init__(self, feature_names: List[str], members: Dict[str, Any]):
+        self.feature_names = list(feature_names)
+        self.members = {}
+        for name, member in members.items():
+            if member is None:
+                continue
+            if isinstance(member, (PathContributions, XGBoostContributions)):
+                self.members[name] = member
+            elif isinstance(member, CompiledForest) and not isinstance(member, CompiledBooster):
+                self.members[name] = PathContributions(member)
+            elif hasattr(member, "get_booster"):
+                self.members[name] = XGBoostContributions(member)
+
+    def explain(self, X: np.ndarray, members: Optional[List[str]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Mean (base_value, contributions) over the given (default: all) members"""
+        names = [name for name in (members or self.members) if name in self.members]
+        if not names:
+            raise ValueError("No explainable ensemble members")
+
+        base = np.zeros(len(X))
+        contributions = np.zeros((len(X), len(self.feature_names)))
+        for name in names:
+            member_base, member_contributions = self.members[name].explain(X)
+            base += member_base
+            contributions += member_contributions
+        return base / len(names), contributions / len(names)
+
+    def describe(self, members: Optional[List[str]] = None) -> str:
+        """
+        Attribution method per member as explain() would use them, e.g.
+        "path contributions (RandomForest, DecisionTree) + TreeSHAP (XGBoost)"
+        """
+        methods: Dict[str, List[str]] = {}
+        for name in (members or self.members):
+            if name in self.members:
+                methods.setdefault(self.members[name].method, []).append(name)
+        return " + ".join(f"{method} ({', '.join(names)})" for method, names in methods.items())
+
+    def top_factors(self, X: np.ndarray, top_n: int = 5, members: Optional[List[str]] = None) -> List[List[Tuple[str, float]]]:
+        """Top-n (feature, contribution) pairs per row, largest |contribution| first"""
+        _, contributions = self.explain(X, members)
+        order = np.argsort(-np.abs(contributions), axis=1, kind="stable")[:, :top_n]
+        return [
+            [(self.feature_names[j], float(contributions[i, j])) for j in order[i]]
+            for i in range(len(X))
+        ]
+
+
+if __name__ == "__main__":
+    import pickle
+    import time
+    import warnings
+    warnings.filterwarnings("ignore")
+
+    import shap
+    import xgboost
+    from compiled_trees import compile_trees
+
+    feature_names = pickle.load(open("feature_names.pkl", "rb"))
+    rf = pickle.load(open("fraud_model.pkl", "rb"))
+    xgb = pickle.load(open("xgb_model.pkl", "rb"))
+    dt = pickle.load(open("dt_model.pkl", "rb"))
+
+    X = np.random.default_rng(42).normal(size=(256, len(feature_names))).astype(np.float32)
+
+    def best_of(fn, repeat=10):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        return round(best * 1000, 3)
+
+    def agreement(ours, reference, top_n=5):
+        ours_top = np.argsort(-np.abs(ours), axis=1)[:, :top_n]
+        ref_top = np.argsort(-np.abs(reference), axis=1)[:, :top_n]
+        overlap = np.mean([len(set(a) & set(b)) / top_n for a, b in zip(ours_top, ref_top)])
+        ranks = lambda a: np.argsort(np.argsort(-np.abs(a), axis=1), axis=1)
+        spearman = np.mean([np.corrcoef(a, b)[0, 1] for a, b in zip(ranks(ours), ranks(reference))])
+        return {
+            "top5_overlap": round(float(overlap), 3),
+            "rank_spearman": round(float(spearman), 3),
+            "sign_agreement": round(float(np.mean(np.sign(ours) == np.sign(reference))), 3)
+        }
+
+    rf_compiled = compile_trees(rf)
+    explainer = LocalExplainer(feature_names, {
+        "RandomForest": rf_compiled,
+        "XGBoost": xgb,
+        "DecisionTree": compile_trees(dt)
+    })
+
+    # RandomForest: Saabas vs shap's path-dependent TreeSHAP (probability space)
+    base, ours = explainer.explain(X, ["RandomForest"])
+    reference = np.asarray(shap.TreeExplainer(rf).shap_values(X))
+    reference = reference[..., 1] if reference.ndim == 3 else reference[1]
+    print("RandomForest vs shap:", agreement(ours, reference),
+          "additivity_err:", float(np.abs(base + ours.sum(1) - rf_compiled.predict_proba(X)[:, 1]).max()))
+
+    # XGBoost: native TreeSHAP vs shap, both in log-odds, then the probability mapping
+    phi = xgb.get_booster().predict(xgboost.DMatrix(X), pred_contribs=True)[:, :-1]
+    reference = shap.TreeExplainer(xgb).shap_values(X)
+    base, ours = explainer.explain(X, ["XGBoost"])
+    print("XGBoost vs shap: max_abs_diff(log-odds):", float(np.abs(phi - reference).max()),
+          agreement(ours, reference),
+          "additivity_err:", float(np.abs(base + ours.sum(1) - xgb.predict_proba(X)[:, 1]).max()))
+
+    print("Latency ms (full ensemble):",
+          {"1 claim": best_of(lambda: explainer.explain(X[:1])), "256 claims": best_of(lambda: explainer.explain(X))},
+          "shap RF 1 claim:", best_of(lambda: shap.TreeExplainer(rf).shap_values(X[:1]), 3))
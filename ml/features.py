@@ -0,0 +1,262 @@
+"""
+Feature assembly without pandas
+Writes claims straight into preallocated rows laid out in
+feature_names.pkl order and applies the StandardScaler as a fused
+multiply-add into float32 model input.
+
+Raw values stay float64 until after scaling: rounding them to float32
+first (e.g. policy_annual_premium) moves the scaled value by an ulp, which
+is enough to flip XGBoost splits that sit exactly on training values.
+Scaling in float64 and casting matches scaler.transform() exactly.
+Categorical columns are encoded with encoding.CategoryTable lookups.
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from encoding import UNKNOWN_CODE
+from metrics import timings
+
+# Model features whose ClaimInput field is spelled differently
+FIELD_ALIASES = {
+    "capital-gains": "capital_gains",
+    "capital-loss": "capital_loss",
+}
+
+# Model features derived from the two date strings
+DATE_FEATURES = ("policy_bind_year", "incident_year", "incident_month")
+
+
+class FeatureBuilder:
+    """Builds scaled model inputs for one claim or a batch of claims"""
+
+    def __init__(self, feature_names: List[str], scaler: Any = None, encoders: Optional[Dict[str, Any]] = None):
+        self.feature_names = list(feature_names)
+        self.n_features = len(self.feature_names)
+        self.encoders = encoders or {}
+
+        if scaler is not None and getattr(scaler, "n_features_in_", self.n_features) != self.n_features:
+            raise ValueError(f"Scaler expects {scaler.n_features_in_} features, got {self.n_features}")
+
+        # x_scaled = x * scale_mul + scale_add  ==  (x - mean_) / scale_
+        if scaler is not None:
+            self.scale_mul = 1.0 / np.asarray(scaler.scale_, dtype=np.float64)
+            self.scale_add = -np.asarray(scaler.mean_, dtype=np.float64) * self.scale_mul
+        else:
+            self.scale_mul = None
+            self.scale_add = None
+
+        # (column, encoder, ClaimInput field) triples, resolved once
+        self._columns = []
+        self._date_columns = {}
+        self._location_column = None
+        for column, feature in enumerate(self.feature_names):
+            if feature in DATE_FEATURES:
+                self._date_columns[feature] = column
+            elif feature == "incident_location":
+                self._location_column = column
+            else:
+                self._columns.append((column, self.encoders.get(feature), FIELD_ALIASES.get(feature, feature)))
+
+        self._local = threading.local()
+
+    def _row_buffers(self) -> tuple:
+        """Per-thread raw/scaled (1, n_features) buffers reused across single-claim calls"""
+        buffers = getattr(self._local, "rows", None)
+        if buffers is None:
+            buffers = (
+                np.empty((1, self.n_features), dtype=np.float64),
+                np.empty((1, self.n_features), dtype=np.float32)
+            )
+            self._local.rows = buffers
+        return buffers
+
+    def write_row(self, claim: Any, out: np.ndarray) -> None:
+        """Write one claim's unscaled features into out (a 1-D float64 view)"""
+        values = claim.__dict__
+
+        for column, encoder, field in self._columns:
+            value = values[field]
+            out[column] = encoder.encode(value) if encoder is not None else float(value)
+
+        if self._location_column is not None:
+            location = values["incident_location"] or f"{values['incident_city']} Area"
+            encoder = self.encoders.get("incident_location")
+            out[self._location_column] = encoder.encode(location) if encoder is not None else float(location)
+
+        date_values = parse_dates(values)
+        for feature, column in self._date_columns.items():
+            out[column] = date_values[feature]
+
+    def unknown_categories(self, claim: Any) -> List[str]:
+        """Categorical features whose value wasn't seen in training, in feature order"""
+        values = claim.__dict__
+        unknown = [
+            column for column, encoder, field in self._columns
+            if encoder is not None and encoder.encode(values[field]) == UNKNOWN_CODE
+        ]
+        encoder = self.encoders.get("incident_location")
+        if self._location_column is not None and encoder is not None:
+            location = values["incident_location"] or f"{values['incident_city']} Area"
+            if encoder.encode(location) == UNKNOWN_CODE:
+                unknown.append(self._location_column)
+        return [self.feature_names[column] for column in sorted(unknown)]
+
+    def scale(self, raw: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Scale float64 raw values into float32 out (raw is used as scratch), timed as stage.scaling"""
+        start = time.perf_counter()
+        if out is None:
+            out = np.empty(raw.shape, dtype=np.float32)
+        if self.scale_mul is not None:
+            np.multiply(raw, self.scale_mul, out=raw)
+            np.add(raw, self.scale_add, out=out, casting="same_kind")
+        else:
+            out[...] = raw
+        timings.observe("stage.scaling", time.perf_counter() - start, len(raw))
+        return out
+
+    def transform_one(self, claim: Any) -> np.ndarray:
+        """
+        Scaled (1, n_features) float32 matrix for a single claim.
+        Returns a per-thread buffer that the next call overwrites.
+        """
+        raw, out = self._row_buffers()
+        self.write_row(claim, raw[0])
+        return self.scale(raw, out)
+
+    def transform_batch(self, claims: List[Any]) -> tuple:
+        """
+        Scaled float32 matrix for a batch plus a mask of rows that built
+        cleanly. Works column by column; rows that failed (bad date, unencodable
+        value) are left zeroed.
+        """
+        n = len(claims)
+        rows = [claim.__dict__ for claim in claims]
+        X = np.zeros((n, self.n_features), dtype=np.float64)
+        valid = np.ones(n, dtype=bool)
+
+        try:
+            for column, encoder, field in self._columns:
+                values = [row[field] for row in rows]
+                X[:, column] = encoder.encode_column(values) if encoder is not None else values
+
+            if self._location_column is not None:
+                locations = [row["incident_location"] or f"{row['incident_city']} Area" for row in rows]
+                encoder = self.encoders.get("incident_location")
+                X[:, self._location_column] = encoder.encode_column(locations) if encoder is not None else locations
+        except (ValueError, TypeError):
+            # Some column won't convert, find the offending rows one by one
+            return self._transform_rows(claims)
+
+        for i, row in enumerate(rows):
+            try:
+                date_values = parse_dates(row)
+            except (ValueError, TypeError):
+                X[i] = 0.0
+                valid[i] = False
+                continue
+            for feature, column in self._date_columns.items():
+                X[i, column] = date_values[feature]
+
+        return self.scale(X), valid
+
+    def transform_frame(self, frame: Any) -> tuple:
+        """
+        Scaled float32 matrix plus valid-row mask for a DataFrame of claims,
+        with insurance_claims.csv or ClaimInput column names. One vectorized
+        pass per column; rows with a missing or non-numeric number or a bad
+        date are left zeroed.
+        """
+        n = len(frame)
+        names = set(frame.columns)
+        X = np.zeros((n, self.n_features), dtype=np.float64)
+        valid = np.ones(n, dtype=bool)
+
+        def column(field: str, feature: str) -> np.ndarray:
+            return frame[field if field in names else feature].to_numpy()
+
+        for column_index, encoder, field in self._columns:
+            values = column(field, self.feature_names[column_index])
+            if encoder is not None:
+                X[:, column_index] = encoder.encode_column(values)
+            else:
+                X[:, column_index], ok = _to_float(values)
+                valid &= ok
+
+        if self._location_column is not None:
+            locations = column("incident_location", "incident_location").astype(object)
+            missing = np.array([not isinstance(value, str) or not value for value in locations])
+            if missing.any():
+                cities = column("incident_city", "incident_city")[missing]
+                locations[missing] = [f"{city} Area" for city in cities]
+            encoder = self.encoders.get("incident_location")
+            X[:, self._location_column] = encoder.encode_column(locations) if encoder is not None else _to_float(locations)[0]
+
+        if self._date_columns:
+            policy_bind, bind_ok = _to_dates(column("policy_bind_date", "policy_bind_date"))
+            incident, incident_ok = _to_dates(column("incident_date", "incident_date"))
+            valid &= bind_ok & incident_ok
+            date_values = {
+                "policy_bind_year": policy_bind.astype("datetime64[Y]").astype(np.int64) + 1970,
+                "incident_year": incident.astype("datetime64[Y]").astype(np.int64) + 1970,
+                "incident_month": incident.astype("datetime64[M]").astype(np.int64) % 12 + 1,
+            }
+            for feature, column_index in self._date_columns.items():
+                X[:, column_index] = date_values[feature]
+
+        X[~valid] = 0.0
+        return self.scale(X), valid
+
+    def _transform_rows(self, claims: List[Any]) -> tuple:
+        X = np.zeros((len(claims), self.n_features), dtype=np.float64)
+        valid = np.ones(len(claims), dtype=bool)
+        for i, claim in enumerate(claims):
+            try:
+                self.write_row(claim, X[i])
+            except (ValueError, TypeError, KeyError):
+                X[i] = 0.0
+                valid[i] = False
+        return self.scale(X), valid
+
+
+def _to_float(values: np.ndarray) -> tuple:
+    """float64 column plus a mask of entries that converted (NaN counts as missing)"""
+    try:
+        out = np.asarray(values, dtype=np.float64)
+    except (ValueError, TypeError):
+        out = np.empty(len(values), dtype=np.float64)
+        for i, value in enumerate(values):
+            try:
+                out[i] = float(value)
+            except (ValueError, TypeError):
+                out[i] = np.nan
+    return out, ~np.isnan(out)
+
+
+def _to_dates(values: np.ndarray) -> tuple:
+    """datetime64[D] column plus a mask of entries that parsed like parse_dates()"""
+    try:
+        out = np.asarray(values, dtype="datetime64[D]")
+    except (ValueError, TypeError):
+        out = np.empty(len(values), dtype="datetime64[D]")
+        for i, value in enumerate(values):
+            try:
+                out[i] = np.datetime64(datetime.fromisoformat(value).date())
+            except (ValueError, TypeError):
+                out[i] = np.datetime64("NaT")
+    return out, ~np.isnat(out)
+
+
+def parse_dates(values: Dict[str, Any]) -> Dict[str, int]:
+    """Date-derived features, parsing each date string once"""
+    policy_bind = datetime.fromisoformat(values["policy_bind_date"])
+    incident = datetime.fromisoformat(values["incident_date"])
+    return {
+        "policy_bind_year": policy_bind.year,
+        "incident_year": incident.year,
+        "incident_month": incident.month,
+    }
@@ -0,0 +1,54 @@
+"""
+Deferred model loading
+Wraps a loader so heavy libraries (xgboost pulls in sklearn, scipy and
+pandas) are only imported when a model is first used, or by a background
+warm-up after the API is already serving.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+class LazyModel:
+    """Proxy that calls loader() on first attribute access"""
+
+    def __init__(self, name: str, loader: Callable[[], Any]):
+        self.name = name
+        self._loader = loader
+        self._model = None
+        self._lock = threading.Lock()
+        self.load_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def get(self) -> Any:
+        if self._model is None:
+            with self._lock:
+                if self.error is not None:
+                    raise RuntimeError(f"{self.name} failed to load: {self.error}")
+                if self._model is None:
+                    start = time.perf_counter()
+                    try:
+                        self._model = self._loader()
+                    except Exception as e:
+                        self.error = str(e)
+                        raise
+                    finally:
+                        self.load_seconds = time.perf_counter() - start
+        return self._model
+
+    def __getattr__(self, attr: str) -> Any:
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
+
+    def status(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "load_ms": round(self.load_seconds * 1000, 1) if self.load_seconds is not None else None,
+            "error": self.error
+        }
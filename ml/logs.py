@@ -0,0 +1,63 @@
+"""
+Leveled logging for the ML API
+Request threads only put records on a queue. A background listener thread
+formats them and writes to stdout, so a slow terminal or log pipe never
+stalls scoring.
+
+LOG_LEVEL sets the level (default INFO). Per-request lines are DEBUG, so
+they cost one level check unless enabled. LOG_SAMPLE_RATE keeps only that
+fraction of them (default 1.0, all).
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+
+_root = logging.getLogger("claimwatch")
+_handler = None
+_listener = None
+
+
+def _start_listener() -> None:
+    global _listener
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(message)s"))
+    _handler.queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(_handler.queue, stream)
+    _listener.start()
+
+
+def _stop_listener() -> None:
+    if _listener is not None:
+        _listener.stop()
+
+
+def _configure() -> None:
+    global _handler
+    _handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    _root.addHandler(_handler)
+    _root.setLevel(LOG_LEVEL)
+    _root.propagate = False
+    _start_listener()
+    atexit.register(_stop_listener)
+    # The listener thread doesn't survive fork(): pre-forked workers
+    # (serve.py) start their own
+    os.register_at_fork(after_in_child=_start_listener)
+
+
+def get_logger(name: str) -> logging.Logger:
+    if _handler is None:
+        _configure()
+    return _root.getChild(name)
+
+
+def sampled() -> bool:
+    """True for the LOG_SAMPLE_RATE share of calls"""
+    return LOG_SAMPLE_RATE >= 1.0 or random.random() < LOG_SAMPLE_RATE
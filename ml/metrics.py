@@ -0,0 +1,264 @@
+"""
+Lightweight in-process timing and memory statistics for the ML API,
+plus Prometheus text exposition for GET /metrics
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Sequence, Tuple
+
+# Latency histogram upper bounds in seconds, shared by every timed stage
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+
+class TimingStats:
+    """
+    Running count / total / max and a LATENCY_BUCKETS histogram of
+    durations, keyed by stage name. Stages that were skipped are counted
+    too, so the time they would have cost can be estimated from the
+    per-row mean.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> [calls, rows, total_seconds, max_seconds, skipped_rows, bucket_counts]
+        self._stats: Dict[str, list] = {}
+
+    def _entry(self, key: str) -> list:
+        entry = self._stats.get(key)
+        if entry is None:
+            entry = self._stats[key] = [0, 0, 0.0, 0.0, 0, [0] * (len(LATENCY_BUCKETS) + 1)]
+        return entry
+
+    def observe(self, key: str, seconds: float, rows: int = 1) -> None:
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            entry = self._entry(key)
+            entry[0] += 1
+            entry[1] += rows
+            entry[2] += seconds
+            if seconds > entry[3]:
+                entry[3] = seconds
+            entry[5][bucket] += 1
+
+    def skip(self, key: str, rows: int = 1) -> None:
+        with self._lock:
+            self._entry(key)[4] += rows
+
+    @contextmanager
+    def time(self, key: str, rows: int = 1):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(key, time.perf_counter() - start, rows)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            items = [(key, list(entry)) for key, entry in self._stats.items()]
+
+        result = {}
+        for key, (calls, rows, total, peak, skipped, _) in sorted(items):
+            per_row = total / rows if rows else 0.0
+            result[key] = {
+                "count": calls,
+                "rows": rows,
+                "total_ms": round(total * 1000, 3),
+                "mean_ms": round(total * 1000 / calls, 3) if calls else 0.0,
+                "per_row_us": round(per_row * 1e6, 3),
+                "max_ms": round(peak * 1000, 3),
+                "skipped_rows": skipped,
+                "est_saved_ms": round(skipped * per_row * 1000, 3)
+            }
+        return result
+
+    def series(self) -> Dict[str, Tuple[List[int], float, int]]:
+        """key -> (bucket counts, total seconds, skipped rows)"""
+        with self._lock:
+            return {key: (list(entry[5]), entry[2], entry[4]) for key, entry in self._stats.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+class Histogram:
+    """Bucketed distribution of observed values (bucket = smallest upper bound >= value)"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self._lock = threading.Lock()
+        self.buckets = sorted(buckets)
+        self.reset()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += value
+            if value > self._max:
+                self._max = value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation"""
+        with self._lock:
+            counts, total, peak = list(self._counts), self._count, self._max
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if seen >= rank and count:
+                return self.buckets[index] if index < len(self.buckets) else peak
+        return peak
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            counts, total, value_sum, peak = list(self._counts), self._count, self._sum, self._max
+        bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+        return {
+            "count": total,
+            "mean": round(value_sum / total, 3) if total else 0.0,
+            "max": round(peak, 3),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip(bounds, counts))
+        }
+
+    def totals(self) -> Tuple[List[int], float]:
+        """(per-bucket counts, sum of observed values)"""
+        with self._lock:
+            return list(self._counts), self._sum
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = [0] * (len(self.buckets) + 1)
+            self._count = 0
+            self._sum = 0.0
+            self._max = 0.0
+
+
+class Counter:
+    """Monotonic counts per combination of label values"""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def snapshot(self) -> Dict[tuple, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def expose(self) -> List[str]:
+        return metric_family(self.name, "counter", self.help_text, [
+            ("", dict(zip(self.labels, values)), count) for values, count in sorted(self.snapshot().items())
+        ])
+
+
+class PhaseTimer:
+    """Wall time of named one-off phases (e.g. startup), in the order they ran"""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def snapshot(self) -> Dict[str, float]:
+        return {name: round(seconds * 1000, 1) for name, seconds in self.phases.items()}
+
+    def total_ms(self) -> float:
+        return round(sum(self.phases.values()) * 1000, 1)
+
+
+def process_memory(pid: str = "self") -> Dict[str, float]:
+    """
+    RSS, PSS and shared / private resident memory (MB) of a process, from
+    /proc/<pid>/smaps_rollup (Linux). PSS splits shared pages between the
+    processes that map them, so summing it over workers gives the real total.
+    """
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+
+    def mb(*keys: str) -> float:
+        return round(sum(fields.get(key, 0) for key in keys) / 1024, 1)
+
+    return {
+        "rss_mb": mb("Rss"),
+        "pss_mb": mb("Pss"),
+        "shared_mb": mb("Shared_Clean", "Shared_Dirty"),
+        "private_mb": mb("Private_Clean", "Private_Dirty")
+    }
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def metric_family(name: str, kind: str, help_text: str, samples: List[tuple]) -> List[str]:
+    """Text exposition lines for one metric from (suffix, labels, value) samples"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for suffix, labels, value in samples:
+        lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+    return lines
+
+
+def histogram_samples(
+    labels: Dict[str, Any],
+    bounds: Sequence[float],
+    counts: Sequence[int],
+    total: float,
+    scale: float = 1.0
+) -> List[tuple]:
+    """_bucket / _sum / _count samples from per-bucket (non-cumulative) counts"""
+    samples = []
+    cumulative = 0
+    for bound, count in zip(list(bounds) + [math.inf], counts):
+        cumulative += count
+        samples.append(("_bucket", {**labels, "le": _format_value(bound * scale)}, cumulative))
+    samples.append(("_sum", labels, total * scale))
+    samples.append(("_count", labels, cumulative))
+    return samples
+
+
+# Shared by every module in the API process
+timings = TimingStats()
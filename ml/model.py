@@ -160,204 +160,555 @@
 
 # print("✅ All Models, Scaler, Feature Names, and Feature Importance saved successfully!")
 
+"""
+Training pipeline
+Each stage is cached on disk under TRAIN_CACHE (default train_cache/).
+It is keyed by a hash of everything it depends on:
+
+    prepare    stream the claims CSV into a columnar cache (ingest.py)
+               key: CSV contents, PIPELINE_VERSION, library versions
+    split      stratified split, SMOTE on the train part (smote.py), scaling
+               key: prepare key, SPLIT settings
+    model-*    one entry per model in MODELS
+               key: split key, estimator, hyperparameters
+    evaluate   test-split report (always runs)
+    artifacts  pickles, model bundle, registry publish (always runs;
+               --activate also makes it the active version)
+
+Models missing from the cache train concurrently in worker processes.
+The --cores budget (default: all cores) is split between them: each
+worker gets cores // workers threads for n_jobs, BLAS and OpenMP, so
+fits never oversubscribe the machine. Changing one model's
+hyperparameters (--set, or MODELS below) retrains only that model. Wall
+time and peak RSS of every stage are printed and appended to
+<cache>/runs.jsonl.
+
+Usage:
+    python model.py
+    python model.py --set rf.n_estimators=500      # retrains rf only
+    python model.py --cores 4 --force              # ignore cached stages
+    python model.py --csv synthetic_claims.csv --chunk-size 200000
+    python model.py --svm rff                      # approximate SVM (approx_svm.py)
+    python model.py --activate                     # serve the new version right away
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime
+from multiprocessing import get_all_start_methods, get_context
+from typing import Any, Dict, List, Optional
+
 import numpy as np
 import pandas as pd
-import warnings
 warnings.filterwarnings("ignore")
 
+import sklearn
+import xgboost
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, roc_auc_score
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.ensemble import RandomForestClassifier, IsolationForest
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.svm import SVC
 from xgboost import XGBClassifier
-from imblearn.over_sampling import SMOTE
-import pickle
-
-# ============================================
-# 1. Load Dataset
-# ============================================
-
-df = pd.read_csv("insurance_claims.csv")
-
-# ============================================
-# 2. Data Cleaning
-# ============================================
-
-# Drop useless columns
-df.drop(columns=['policy_number', '_c39'], inplace=True, errors='ignore')
-
-# Replace '?' with NaN
-df.replace('?', np.nan, inplace=True)
-
-# Drop missing rows
-df.dropna(inplace=True)
-
-# Convert Dates
-df['policy_bind_date'] = pd.to_datetime(df['policy_bind_date'])
-df['incident_date'] = pd.to_datetime(df['incident_date'])
-
-df['policy_bind_year'] = df['policy_bind_date'].dt.year
-df['incident_year'] = df['incident_date'].dt.year
-df['incident_month'] = df['incident_date'].dt.month
-
-df.drop(columns=['policy_bind_date', 'incident_date'], inplace=True)
-
-# ============================================
-# 3. Encode Target
-# ============================================
-
-df['fraud_reported'] = df['fraud_reported'].map({'Y':1, 'N':0})
-
-# ============================================
-# 4. Encode Categorical Features
-# ============================================
-
-encoders = {}
-
-for col in df.select_dtypes(include='object').columns:
-    le = LabelEncoder()
-    df[col] = le.fit_transform(df[col])
-    encoders[col] = le
-
-# Save encoders (IMPORTANT)
-pickle.dump(encoders, open("encoders.pkl", "wb"))
-
-# ============================================
-# 5. Split Data
-# ============================================
-
-X = df.drop('fraud_reported', axis=1)
-y = df['fraud_reported']
-
-feature_names = list(X.columns)
-
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y,
-    test_size=0.2,
-    random_state=42,
-    stratify=y
-)
-
-# ============================================
-# 6. SMOTE ONLY ON TRAIN DATA
-# ============================================
-
-smote = SMOTE(random_state=42)
-X_train, y_train = smote.fit_resample(X_train, y_train)
-
-# ============================================
-# 7. Scaling
-# ============================================
-
-scaler = StandardScaler()
-
-X_train = scaler.fit_transform(X_train)
-X_test = scaler.transform(X_test)
-
-# Save scaler
-pickle.dump(scaler, open("scaler.pkl", "wb"))
-
-# ============================================
-# 8. Train Models
-# ============================================
-
-dt = DecisionTreeClassifier(random_state=42)
-dt.fit(X_train, y_train)
-
-rf = RandomForestClassifier(n_estimators=300, random_state=42)
-rf.fit(X_train, y_train)
+from threadpoolctl import threadpool_limits
+
+from approx_svm import SVM_EXACT_MAX_ROWS, RFFSVMClassifier
+from bundle import BUNDLE_PATH, save_model_bundle
+from ingest import INGEST_CHUNK_SIZE, LABEL_COLUMN, ingest_claims, load_matrix
+from registry import ModelRegistry
+from smote import ChunkedSMOTE
+
+TRAIN_CACHE = os.getenv("TRAIN_CACHE", "train_cache")
+
+# Bump when prepare() / split() change what they produce
+PIPELINE_VERSION = 3
+VERSIONS = {
+    "numpy": np.__version__,
+    "pandas": pd.__version__,
+    "sklearn": sklearn.__version__,
+    "xgboost": xgboost.__version__
+}
 
-xgb = XGBClassifier(
-    use_label_encoder=False,
-    eval_metric='logloss',
-    n_estimators=300
-)
-xgb.fit(X_train, y_train)
+SPLIT = {"test_size": 0.2, "random_state": 42, "smote_random_state": 42}
 
-svm = SVC(probability=True)
-svm.fit(X_train, y_train)
+# Rows per block when scaling full-size matrices into the cache
+SCALE_BLOCK_ROWS = 262144
 
 # ============================================
-# 9. Evaluate Models
+# Models
 # ============================================
 
-models = {
-    "Decision Tree": dt,
-    "Random Forest": rf,
-    "XGBoost": xgb,
-    "SVM": svm
+# --svm choices for the "svm" model. The exact SVC is quadratic in rows (plus
+# a 5-fold calibration); "auto" switches to the linear-time RBF approximation
+# above SVM_EXACT_MAX_ROWS training rows
+SVM_MODELS = {
+    "exact": (SVC, {"probability": True}),
+    "rff": (RFFSVMClassifier, {"random_state": 42})
 }
 
-for name, model in models.items():
-
-    pred = model.predict(X_test)
-
-    print("\n=============================")
-    print("Model:", name)
+# name -> (estimator, hyperparameters, training data), slowest first so
+# long fits start early. Training data:
+#   train   SMOTE-resampled train split, scaled
+#   full    every claim, no SMOTE, its own scaler (final RF)
+#   all     every claim, scaled exactly like API inputs (anomaly detector)
+MODELS = {
+    "rf": (RandomForestClassifier, {"n_estimators": 300, "random_state": 42}, "train"),
+    "rf_final": (RandomForestClassifier, {"n_estimators": 300, "random_state": 42}, "full"),
+    "xgb": (XGBClassifier, {"use_label_encoder": False, "eval_metric": "logloss", "n_estimators": 300}, "train"),
+    "svm": (*SVM_MODELS["exact"], "train"),
+    "anomaly": (IsolationForest, {"contamination": 0.1, "random_state": 42}, "all"),
+    "dt": (DecisionTreeClassifier, {"random_state": 42}, "train")
+}
 
-    print("Accuracy:",
-          round(accuracy_score(y_test, pred),3))
+# Training data -> (X, y) arrays of the split stage
+DATA = {"train": ("X_train", "y_train"), "full": ("X_full", "y"), "all": ("X_all", None)}
 
-    print("ROC-AUC:",
-          round(roc_auc_score(y_test, pred),3))
+# Estimators that take n_jobs; the rest fit on one thread
+THREADED = (RandomForestClassifier, IsolationForest, XGBClassifier)
 
-    print(confusion_matrix(y_test, pred))
+# Models in the test-split report
+EVALUATED = {"dt": "Decision Tree", "rf": "Random Forest", "xgb": "XGBoost", "svm": "SVM"}
 
-    print(classification_report(y_test, pred))
 
 # ============================================
-# 10. Risk Scores (Explainable AI)
+# Stage Cache
 # ============================================
 
-risk_scores = rf.predict_proba(X_test)[:,1]
+def digest(*parts: Any) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(json.dumps(part, sort_keys=True, default=str).encode())
+    return h.hexdigest()[:16]
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()[:16]
+
+
+class StageCache:
+    """
+    Stage outputs under <directory>/<stage>-<key>/: arrays as .npy (loaded
+    memory-mapped), everything else in objects.pkl. An entry is written to
+    a temporary directory and renamed into place, so an interrupted run
+    never leaves a half-written entry behind.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path(self, stage: str, key: str) -> str:
+        return os.path.join(self.directory, f"{stage}-{key}")
+
+    @contextmanager
+    def entry(self, stage: str, key: str):
+        """Directory to write a new entry into, renamed into place on success"""
+        path = self.path(stage, key)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        try:
+            yield tmp
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        # --force rebuilds over an existing entry
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+
+    def load(self, stage: str, key: str) -> Optional[Dict[str, Any]]:
+        path = self.path(stage, key)
+        if not os.path.isdir(path):
+            return None
+        outputs = {}
+        for name in os.listdir(path):
+            if name.endswith(".npy"):
+                outputs[name[:-4]] = np.load(os.path.join(path, name), mmap_mode="r")
+        with open(os.path.join(path, "objects.pkl"), "rb") as f:
+            outputs.update(pickle.load(f))
+        return outputs
+
+    @staticmethod
+    def write(directory: str, outputs: Dict[str, Any]) -> None:
+        """Arrays as .npy, everything else in objects.pkl"""
+        objects = {}
+        for name, value in outputs.items():
+            if isinstance(value, np.ndarray):
+                np.save(os.path.join(directory, f"{name}.npy"), value)
+            else:
+                objects[name] = value
+        with open(os.path.join(directory, "objects.pkl"), "wb") as f:
+            pickle.dump(objects, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def save(self, stage: str, key: str, outputs: Dict[str, Any]) -> None:
+        with self.entry(stage, key) as directory:
+            self.write(directory, outputs)
 
-print("\nSample Risk Scores:")
-print(risk_scores[:10])
 
 # ============================================
-# 11. Train Final Model on FULL DATA
-# (NO SMOTE HERE - Important Fix)
+# Stage Timing
 # ============================================
 
-scaler_final = StandardScaler()
-X_scaled = scaler_final.fit_transform(X)
+def reset_peak_rss() -> None:
+    """Restart this process's peak-RSS counter (VmHWM, Linux)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> float:
+    """Peak RSS since the last reset_peak_rss() (process lifetime where it can't be reset)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    import resource
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class StageLog:
+    """Wall time, peak RSS and cache hit of every stage in this run"""
+
+    def __init__(self):
+        self.rows: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        row = {"stage": name, "cached": False}
+        reset_peak_rss()
+        start = time.perf_counter()
+        try:
+            yield row
+        finally:
+            row["seconds"] = round(time.perf_counter() - start, 3)
+            row["peak_rss_mb"] = peak_rss_mb()
+            self.rows.append(row)
+
+    def print(self) -> None:
+        print(f"\n📊 {'stage':<18} {'cached':>6} {'seconds':>9} {'peak RSS':>12}")
+        for row in self.rows:
+            peak = f"{row['peak_rss_mb']:.1f} MB" if row.get("peak_rss_mb") is not None else "-"
+            print(f"   {row['stage']:<18} {'yes' if row['cached'] else 'no':>6} {row['seconds']:>9.2f} {peak:>12}")
+
+    def save(self, path: str, **info: Any) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a") as f:
+            f.write(json.dumps({"time": datetime.now().isoformat(timespec="seconds"), **info, "stages": self.rows}) + "\n")
 
-rf_final = RandomForestClassifier(
-    n_estimators=300,
-    random_state=42
-)
-
-rf_final.fit(X_scaled, y)
-
-print("\nModel Retrained on Full Dataset")
 
 # ============================================
-# 12. Save Models
+# Stages
 # ============================================
 
-pickle.dump(rf_final, open("fraud_model.pkl","wb"))
-pickle.dump(xgb, open("xgb_model.pkl","wb"))
-pickle.dump(dt, open("dt_model.pkl","wb"))
+def prepare(csv_path: str, directory: str, chunk_size: int) -> Dict[str, Any]:
+    """Stream, clean and label-encode the claims into per-feature columns"""
+    return ingest_claims(csv_path, directory, chunk_size)
+
+
+def scale_into(directory: str, name: str, prepared: Dict[str, Any], scaler: StandardScaler) -> None:
+    """Write scaler.transform(every claim) to <directory>/<name>.npy, block by block"""
+    feature_names = prepared["feature_names"]
+    rows = prepared["rows"]
+    out = np.lib.format.open_memmap(
+        os.path.join(directory, f"{name}.npy"), mode="w+", dtype=np.float32, shape=(rows, len(feature_names))
+    )
+    for start in range(0, rows, SCALE_BLOCK_ROWS):
+        block = slice(start, start + SCALE_BLOCK_ROWS)
+        out[block] = scaler.transform(load_matrix(prepared, feature_names, block))
+    out.flush()
+
+
+def split(prepared: Dict[str, Any], directory: str, cores: int) -> Dict[str, Any]:
+    """Train / test split, SMOTE on the train part only, scaling"""
+    feature_names = prepared["feature_names"]
+    y = np.asarray(prepared[LABEL_COLUMN], dtype=np.int64)
+    train, test = train_test_split(
+        np.arange(len(y)),
+        test_size=SPLIT["test_size"],
+        random_state=SPLIT["random_state"],
+        stratify=y
+    )
+    # Same samples as imblearn's SMOTE up to a few thousand fraud claims, an
+    # approximate neighbour search beyond
+    smote = ChunkedSMOTE(random_state=SPLIT["smote_random_state"], n_jobs=cores)
+    X_train, y_train = smote.fit_resample(load_matrix(prepared, feature_names, train), y[train])
+
+    # Synthetic claims keep integer columns (codes, counts, amounts) whole,
+    # like SMOTE on the old integer-typed DataFrame did
+    integer = [j for j, name in enumerate(feature_names) if prepared[name].dtype.kind == "i"]
+    X_train[:, integer] = np.trunc(X_train[:, integer])
+
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(X_train)
+
+    # Every claim: the final model's data (no SMOTE, its own scaler, fitted
+    # during ingestion) and the anomaly detector's, straight to the cache
+    scale_into(directory, "X_full", prepared, prepared["full_scaler"])
+    scale_into(directory, "X_all", prepared, scaler)
+
+    return {
+        "X_train": X_train,
+        "y_train": y_train,
+        "X_test": scaler.transform(load_matrix(prepared, feature_names, test)),
+        "y_test": y[test],
+        "y": y,
+        "scaler": scaler
+    }
+
+
+def fit_model(name: str, estimator: type, params: Dict[str, Any], data: str,
+              cache_dir: str, split_key: str, key: str, threads: int) -> Dict[str, Any]:
+    """Fit one model (in a worker process) and store it in the stage cache"""
+    reset_peak_rss()
+    start = time.perf_counter()
+    cache = StageCache(cache_dir)
+    inputs = cache.load("split", split_key)
+    X_name, y_name = DATA[data]
+
+    threaded = issubclass(estimator, THREADED)
+    model = estimator(**params)
+    if threaded:
+        model.set_params(n_jobs=threads)
+    with threadpool_limits(limits=threads):
+        if y_name is None:
+            model.fit(inputs[X_name])
+        else:
+            model.fit(inputs[X_name], inputs[y_name])
+    if threaded:
+        # The saved model doesn't depend on the thread budget it was fitted with
+        model.set_params(n_jobs=params.get("n_jobs"))
+
+    cache.save(f"model-{name}", key, {"model": model})
+    return {"seconds": round(time.perf_counter() - start, 3), "peak_rss_mb": peak_rss_mb(), "threads": threads}
+
+
+def train_models(models: Dict[str, tuple], cache: StageCache, split_key: str,
+                 cores: int, force: bool, log: StageLog) -> Dict[str, Any]:
+    """Load cached models; fit the rest concurrently within the core budget"""
+    keys = {
+        name: digest(split_key, name, f"{estimator.__module__}.{estimator.__qualname__}", params, VERSIONS)
+        for name, (estimator, params, _) in models.items()
+    }
+    fitted, todo = {}, []
+    for name in models:
+        entry = None if force else cache.load(f"model-{name}", keys[name])
+        if entry is None:
+            todo.append(name)
+        else:
+            fitted[name] = entry["model"]
+            log.rows.append({"stage": f"model-{name}", "cached": True, "seconds": 0.0, "peak_rss_mb": None})
+    if not todo:
+        return fitted
+
+    workers = min(cores, len(todo))
+    threads = max(1, cores // workers)
+    print(f"🏋️ Training {', '.join(todo)}: {workers} worker(s) x {threads} thread(s)")
+
+    def done(name: str, stats: Dict[str, Any]) -> None:
+        # Always hand back the cached copy so cold and warm runs bundle identical bytes
+        fitted[name] = cache.load(f"model-{name}", keys[name])["model"]
+        log.rows.append({"stage": f"model-{name}", "cached": False, **stats})
+        print(f"   ✅ {name}: {stats['seconds']:.2f}s, peak RSS {stats['peak_rss_mb']:.1f} MB")
+
+    with log.stage("train"):
+        if workers == 1:
+            # One core: a worker pool only adds start-up cost
+            for name in todo:
+                done(name, fit_model(name, *models[name], cache.directory, split_key, keys[name], threads))
+            return fitted
+
+        context = get_context("forkserver" if "forkserver" in get_all_start_methods() else "spawn")
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            futures = {
+                pool.submit(fit_model, name, *models[name], cache.directory, split_key, keys[name], threads): name
+                for name in todo
+            }
+            for future in as_completed(futures):
+                done(futures[future], future.result())
+    return fitted
+
+
+def evaluate(fitted: Dict[str, Any], data: Dict[str, Any]) -> None:
+    """Test-split report for every evaluated model"""
+    X_test, y_test = data["X_test"], data["y_test"]
+    for name, label in EVALUATED.items():
+        model = fitted[name]
+        pred = model.predict(X_test)
+
+        print("\n=============================")
+        print("Model:", label)
+
+        print("Accuracy:",
+              round(accuracy_score(y_test, pred), 3))
+
+        print("ROC-AUC:",
+              round(roc_auc_score(y_test, pred), 3))
+
+        print(confusion_matrix(y_test, pred))
+
+        print(classification_report(y_test, pred))
+
+    # Risk Scores (Explainable AI)
+    risk_scores = fitted["rf"].predict_proba(X_test)[:, 1]
+
+    print("\nSample Risk Scores:")
+    print(risk_scores[:10])
+
+
+def save_artifacts(fitted: Dict[str, Any], data: Dict[str, Any], prepared: Dict[str, Any],
+                   activate: bool = False) -> str:
+    """API artifacts: pickles, the model bundle and a registry version"""
+    def dump(obj: Any, path: str) -> None:
+        with open(path, "wb") as f:
+            pickle.dump(obj, f)
+
+    rf_final = fitted["rf_final"]
+    feature_names = prepared["feature_names"]
+
+    dump(prepared["encoders"], "encoders.pkl")
+    dump(data["scaler"], "scaler.pkl")
+    dump(rf_final, "fraud_model.pkl")
+    dump(fitted["xgb"], "xgb_model.pkl")
+    dump(fitted["dt"], "dt_model.pkl")
+    dump(feature_names, "feature_names.pkl")
+
+    # Feature Importance (Explainable AI)
+    dump(dict(zip(feature_names, rf_final.feature_importances_)), "feature_importance.pkl")
+
+    # Anomaly detector, fitted on the real claims scaled exactly like API
+    # inputs, so scores have a reference
+    dump(fitted["anomaly"], "anomaly_model.pkl")
+
+    # Model bundle: everything above in one memory-mappable file, loaded by
+    # the API at startup
+    bundle_version = save_model_bundle(
+        BUNDLE_PATH,
+        rf=rf_final,
+        dt=fitted["dt"],
+        xgb=fitted["xgb"],
+        scaler=data["scaler"],
+        feature_names=feature_names,
+        encoders=prepared["encoders"],
+        anomaly_model=fitted["anomaly"]
+    )
+    print(f"\nModel bundle saved: {BUNDLE_PATH} (version {bundle_version})")
+
+    # Publish; only an activated version is picked up by running APIs
+    # watching the registry (activate later with registry.py)
+    registry = ModelRegistry()
+    registry_version = registry.publish(BUNDLE_PATH, activate=activate)
+    if activate:
+        print(f"Model registry version: {registry_version} (active)")
+    else:
+        print(f"Model registry version: {registry_version} (not active: python registry.py activate {registry_version})")
+    return registry_version
 
-# ============================================
-# 13. Save Feature Names
-# ============================================
-
-pickle.dump(feature_names,
-            open("feature_names.pkl","wb"))
 
 # ============================================
-# 14. Feature Importance
-# (Explainable AI)
+# Main
 # ============================================
 
-feature_importance = dict(
-    zip(feature_names,
-        rf_final.feature_importances_)
-)
-
-pickle.dump(feature_importance,
-            open("feature_importance.pkl","wb"))
-
+def parse_overrides(parser: argparse.ArgumentParser, items: List[str]) -> Dict[str, Dict[str, Any]]:
+    """--set rf.n_estimators=500 -> {"rf": {"n_estimators": 500}}"""
+    overrides: Dict[str, Dict[str, Any]] = {}
+    for item in items:
+        target, _, value = item.partition("=")
+        name, _, param = target.partition(".")
+        if name not in MODELS or not param or not value:
+            parser.error(f"--set {item}: expected MODEL.PARAM=VALUE with MODEL one of {', '.join(MODELS)}")
+        try:
+            value = json.loads(value)
+        except ValueError:
+            pass  # bare strings: --set svm.kernel=linear
+        overrides.setdefault(name, {})[param] = value
+    return overrides
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Train the fraud models and publish a model bundle")
+    parser.add_argument("--csv", default="insurance_claims.csv")
+    parser.add_argument("--cache-dir", default=TRAIN_CACHE)
+    parser.add_argument("--chunk-size", type=int, default=INGEST_CHUNK_SIZE, help="rows per chunk while ingesting the CSV")
+    parser.add_argument("--cores", type=int, default=os.cpu_count() or 1, help="CPU budget shared by concurrent fits")
+    parser.add_argument("--set", action="append", default=[], metavar="MODEL.PARAM=VALUE",
+                        help="override a hyperparameter (value parsed as JSON)")
+    parser.add_argument("--svm", choices=["auto", *SVM_MODELS], default="auto",
+                        help=f"exact SVC or RFFSVMClassifier (auto: exact up to {SVM_EXACT_MAX_ROWS:,} training rows)")
+    parser.add_argument("--force", action="store_true", help="rebuild every stage, ignoring cached results")
+    parser.add_argument("--activate", action="store_true", help="make the published version the active one")
+    args = parser.parse_args()
+
+    overrides = parse_overrides(parser, args.set)
+    cache = StageCache(args.cache_dir)
+    log = StageLog()
+    start = time.perf_counter()
+
+    def cached(stage: str, key: str, build) -> Dict[str, Any]:
+        # build(directory) may write large arrays into the entry itself
+        # and returns the rest; outputs are always read back from the cache
+        with log.stage(stage) as row:
+            outputs = None if args.force else cache.load(stage, key)
+            row["cached"] = outputs is not None
+            if outputs is None:
+                with cache.entry(stage, key) as directory:
+                    StageCache.write(directory, build(directory))
+                outputs = cache.load(stage, key)
+        return outputs
+
+    prepare_key = digest(PIPELINE_VERSION, VERSIONS, file_digest(args.csv))
+    prepared = cached("prepare", prepare_key, lambda directory: prepare(args.csv, directory, args.chunk_size))
+
+    split_key = digest(prepare_key, SPLIT)
+    data = cached("split", split_key, lambda directory: split(prepared, directory, args.cores))
+
+    svm = args.svm
+    if svm == "auto":
+        svm = "exact" if len(data["y_train"]) <= SVM_EXACT_MAX_ROWS else "rff"
+    print(f"🧮 svm: {SVM_MODELS[svm][0].__name__} ({len(data['y_train']):,} training rows)")
+    models = {
+        name: (estimator, {**params, **overrides.get(name, {})}, data_name)
+        for name, (estimator, params, data_name) in {**MODELS, "svm": (*SVM_MODELS[svm], "train")}.items()
+    }
+    fitted = train_models(models, cache, split_key, args.cores, args.force, log)
+
+    with log.stage("evaluate"):
+        evaluate(fitted, data)
+
+    with log.stage("artifacts"):
+        registry_version = save_artifacts(fitted, data, prepared, args.activate)
+
+    log.print()
+    total = time.perf_counter() - start
+    print(f"   {'total':<18} {'':>6} {total:>9.2f}")
+    log.save(
+        os.path.join(args.cache_dir, "runs.jsonl"),
+        csv=args.csv,
+        cores=args.cores,
+        overrides=overrides,
+        svm=svm,
+        train_rows=len(data["y_train"]),
+        registry_version=registry_version,
+        activated=args.activate,
+        total_seconds=round(total, 3)
+    )
+
+
+if __name__ == "__main__":
+    main()
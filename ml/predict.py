@@ -1,18 +1,49 @@
-import pickle
+"""
+Offline batch scoring
+Streams a claims file (CSV, Parquet or NDJSON, columns as in
+insurance_claims.csv) in fixed-size chunks. It scores every chunk with the
+same models and ensemble as /predict in app_explainable.py, and appends
+the results to the output as each chunk finishes. Memory stays flat
+whatever the file size.
+
+Every output row carries row_id (position in the input) and, when
+present, policy_number. It has fraud / probability / riskScore / status /
+model_agreement, the anomaly flag and score when an anomaly model is
+loaded, and top_factors with --explain. Rows whose input can't be turned
+into features get an error instead of a score. The cascade screen is not
+used: every row gets the full ensemble.
+
+With --workers N, chunks are scored by N forked processes that share the
+loaded models; results are still written in input order. After every
+chunk, <output>.checkpoint records how far the run got. --resume drops
+anything written after it and continues from there.
+
+Usage:
+    python predict.py                                        # score the sample claim below
+    python predict.py claims.csv -o scored.csv
+    python predict.py claims.parquet -o scored.ndjson --workers 4 --explain
+    python predict.py claims.csv -o scored.csv --resume      # continue an interrupted run
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
 import pandas as pd
-from datetime import datetime
 
-# ===============================
-# Load Model Files
-# ===============================
+FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson", ".parquet": "parquet"}
+ID_COLUMN = "policy_number"
+# Parquet output chunks, numbered in input order
+PART_FILE = re.compile(r"part-(\d+)\.parquet")
 
-model = pickle.load(open("fraud_model.pkl","rb"))
-scaler = pickle.load(open("scaler.pkl","rb"))
-encoders = pickle.load(open("encoders.pkl","rb"))
-
-features = scaler.feature_names_in_
-
-print("Model expects", len(features), "features")
+# app_explainable, imported by load_models() once the environment is set
+api: Any = None
 
 
 # ===============================
@@ -35,6 +66,7 @@ sample_input = {
 "authorities_contacted":"Police",
 "incident_state":"OH",
 "incident_city":"Columbus",
+"incident_location":"",
 
 "property_damage":"YES",
 "police_report_available":"YES",
@@ -65,63 +97,270 @@ sample_input = {
 
 "auto_year":2015,
 
-"policy_bind_year":2014,
-"incident_year":2015,
-"incident_month":2
+"policy_bind_date":"2014-03-01",
+"incident_date":"2015-02-10"
 }
 
 
 # ===============================
-# Create Default Feature Dict
-# ===============================
-
-input_dict = {feature:0 for feature in features}
-
-input_dict.update(sample_input)
-
-
-# ===============================
-# Convert to DataFrame
-# ===============================
-
-df = pd.DataFrame([input_dict])
-
-df = df[features]
-
-
-# ===============================
-# Encode Categorical Features
+# Load Model Files
 # ===============================
 
-for col in encoders:
-
-    if col in df.columns:
+def load_models() -> None:
+    """Load the active model version the way the API does (bundle, registry or .pkl files)"""
+    global api
+    os.environ["LAZY_WARMUP"] = "0"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    import app_explainable
+    api = app_explainable
 
-        df[col] = encoders[col].transform(df[col])
+    if not api.active_models.loaded:
+        raise SystemExit("❌ Models not found (run model.py first)")
+    api.warm_up_lazy_models()
+    print(f"✅ Model version {api.active_models.version} ({api.active_models.source})")
 
 
 # ===============================
-# Scale
+# Score
 # ===============================
 
-scaled_data = scaler.transform(df)
+def score_chunk(chunk: pd.DataFrame, first_row: int, explain: bool = False) -> pd.DataFrame:
+    """Scores for one chunk of claims, one vectorized pass per stage"""
+    models = api.active_models
+    n = len(chunk)
+    X, valid = models.feature_builder.transform_frame(chunk)
+    rows = np.flatnonzero(valid)
+
+    out = pd.DataFrame({"row_id": np.arange(first_row, first_row + n)})
+    if ID_COLUMN in chunk.columns:
+        out[ID_COLUMN] = chunk[ID_COLUMN].to_numpy()
+
+    fraud = np.zeros(n, dtype=np.int64)
+    probability = np.full(n, np.nan)
+    risk_score = np.zeros(n, dtype=np.int64)
+    agreement = np.full(n, np.nan)
+    status = np.full(n, "", dtype=object)
+    error = np.where(valid, "", "invalid input")
+    anomaly, anomaly_score, factors = None, None, None
+
+    if len(rows):
+        X = X[rows]
+        result = models.ensemble.predict(X)
+        prob = result.ensemble_probability
+        fraud[rows] = result.primary_prediction
+        probability[rows] = np.round(prob, 3)
+        risk_score[rows] = (prob * 100).astype(np.int64)
+        agreement[rows] = result.model_agreement
+
+        is_anomaly = np.zeros(len(rows), dtype=bool)
+        if models.anomaly_model is not None:
+            is_anomaly, scores = api.detect_anomalies_batch(models, X)
+            anomaly = np.zeros(n, dtype=bool)
+            anomaly_score = np.full(n, np.nan)
+            anomaly[rows] = is_anomaly
+            anomaly_score[rows] = np.round(scores, 4)
+        # Same status as the API's responses
+        status[rows] = [api.claim_status(p, a) for p, a in zip(prob, is_anomaly)]
+
+        if explain and models.explainer is not None:
+            factors = np.full(n, "", dtype=object)
+            factors[rows] = [
+                "; ".join(f"{feature}:{contribution:+.4f}" for feature, contribution in row)
+                for row in models.explainer.top_factors(X, 5, list(result.probabilities))
+            ]
+
+    # Nullable integers, so rows without a score stay empty instead of 0 / NaN floats
+    out["fraud"] = pd.Series(fraud, dtype="Int64").mask(~valid)
+    out["probability"] = probability
+    out["riskScore"] = pd.Series(risk_score, dtype="Int64").mask(~valid)
+    out["status"] = status
+    out["model_agreement"] = agreement
+    if anomaly is not None:
+        out["is_anomaly"] = pd.Series(anomaly, dtype="boolean").mask(~valid)
+        out["anomaly_score"] = anomaly_score
+    if explain:
+        out["top_factors"] = factors if factors is not None else ""
+    out["error"] = error
+    return out
+
+
+def scored_chunks(chunks: Iterator[pd.DataFrame], first_row: int, workers: int, explain: bool) -> Iterator[tuple]:
+    """(input rows, scores) per chunk in input order, at most 2 chunks per worker in flight"""
+    if workers <= 1:
+        for chunk in chunks:
+            yield len(chunk), score_chunk(chunk, first_row, explain)
+            first_row += len(chunk)
+        return
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Forked workers inherit the loaded models copy-on-write
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork")) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((len(chunk), pool.submit(score_chunk, chunk, first_row, explain)))
+            first_row += len(chunk)
+            if len(pending) >= 2 * workers:
+                rows, future = pending.popleft()
+                yield rows, future.result()
+        while pending:
+            rows, future = pending.popleft()
+            yield rows, future.result()
 
 
 # ===============================
-# Predict
+# Input / Output
 # ===============================
 
-prediction = model.predict(scaled_data)[0]
-
-probability = model.predict_proba(scaled_data)[0][1]
-
-riskScore = int(probability*100)
+def file_format(path: str, fmt: Optional[str]) -> str:
+    fmt = fmt or FORMATS.get(os.path.splitext(path.rstrip("/"))[1].lower())
+    if fmt is None:
+        raise SystemExit(f"❌ Can't tell the format of {path}, pass --format / --output-format")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise SystemExit("❌ Parquet needs pyarrow (pip install pyarrow)")
+    return fmt
+
+
+def read_chunks(path: str, fmt: str, chunk_size: int, skip_rows: int = 0) -> Iterator[pd.DataFrame]:
+    """The input in chunks of chunk_size rows, starting after skip_rows"""
+    if fmt == "csv":
+        # keep_default_na=False: "None" (authorities_contacted) is a category, not a missing value
+        yield from pd.read_csv(
+            path, chunksize=chunk_size, keep_default_na=False,
+            skiprows=range(1, skip_rows + 1) if skip_rows else None
+        )
+        return
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        batches = (batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size))
+    else:
+        batches = pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False)
+
+    for chunk in batches:
+        if skip_rows >= len(chunk):
+            skip_rows -= len(chunk)
+            continue
+        yield chunk.iloc[skip_rows:] if skip_rows else chunk
+        skip_rows = 0
+
+
+class ResultWriter:
+    """Appends scored chunks to a CSV / NDJSON file or to part files in a Parquet directory"""
+
+    def __init__(self, path: str, fmt: str, resume_from: Optional[Dict] = None):
+        self.path = path
+        self.fmt = fmt
+        self.parts = resume_from["parts"] if resume_from else 0
+
+        if fmt == "parquet":
+            os.makedirs(path, exist_ok=True)
+            for name in os.listdir(path):
+                match = PART_FILE.fullmatch(name)
+                if match and int(match.group(1)) >= self.parts:
+                    os.remove(os.path.join(path, name))
+            self.file = None
+        elif resume_from:
+            self.file = open(path, "r+", newline="")
+            self.file.truncate(resume_from["bytes"])
+            self.file.seek(resume_from["bytes"])
+        else:
+            self.file = open(path, "w", newline="")
+
+    def write(self, scores: pd.DataFrame) -> int:
+        """Write one chunk; returns the output position to checkpoint"""
+        if self.fmt == "parquet":
+            scores.to_parquet(os.path.join(self.path, f"part-{self.parts:05d}.parquet"), index=False)
+        elif self.fmt == "csv":
+            scores.to_csv(self.file, header=self.file.tell() == 0, index=False)
+        else:
+            self.file.write(scores.to_json(orient="records", lines=True))
+        self.parts += 1
+        if self.file is None:
+            return 0
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+
+
+def save_checkpoint(path: str, state: Dict) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def score_file(args: argparse.Namespace) -> None:
+    in_fmt = file_format(args.input, args.format)
+    out_fmt = file_format(args.output, args.output_format)
+    checkpoint_path = f"{args.output.rstrip('/')}.checkpoint"
+
+    state = {"input": os.path.abspath(args.input), "explain": args.explain, "rows": 0, "parts": 0, "bytes": 0}
+    resume_from = None
+    if args.resume and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            resume_from = json.load(f)
+        if resume_from["input"] != state["input"] or resume_from["explain"] != args.explain:
+            raise SystemExit(f"❌ {checkpoint_path} belongs to a different run ({resume_from['input']})")
+        state.update(resume_from)
+        print(f"↩️  Resuming after {state['rows']:,} rows")
+
+    writer = ResultWriter(args.output, out_fmt, resume_from)
+    chunks = read_chunks(args.input, in_fmt, args.chunk_size, state["rows"])
+    start = time.perf_counter()
+    scored = 0
+    try:
+        for rows, scores in scored_chunks(chunks, state["rows"], args.workers, args.explain):
+            state["bytes"] = writer.write(scores)
+            state["rows"] += rows
+            state["parts"] = writer.parts
+            save_checkpoint(checkpoint_path, state)
+            scored += rows
+            elapsed = time.perf_counter() - start
+            print(f"  {state['rows']:,} rows scored ({scored / elapsed:,.0f} rows/s)", end="\r", flush=True)
+    finally:
+        writer.close()
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    elapsed = time.perf_counter() - start
+    print(f"\n✅ Scored {scored:,} rows into {args.output} in {elapsed:.1f}s ({scored / max(elapsed, 1e-9):,.0f} rows/s)")
 
 
 # ===============================
 # Output
 # ===============================
 
-print("\nPrediction:", prediction)
-print("Probability:", round(probability,3))
-print("Risk Score:", riskScore)
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a claims file offline with the API's models")
+    parser.add_argument("input", nargs="?", help="claims CSV / Parquet / NDJSON (default: score the sample claim)")
+    parser.add_argument("-o", "--output", help="scores CSV / NDJSON file, or Parquet directory")
+    parser.add_argument("--format", choices=sorted(set(FORMATS.values())), help="input format (default: from the extension)")
+    parser.add_argument("--output-format", choices=sorted(set(FORMATS.values())))
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--explain", action="store_true", help="add the top 5 contributing features per row")
+    parser.add_argument("--resume", action="store_true", help="continue from <output>.checkpoint")
+    args = parser.parse_args()
+
+    if args.input and not args.output:
+        parser.error("an input file needs --output")
+    load_models()
+
+    if args.input:
+        score_file(args)
+        sys.exit(0)
+
+    result = score_chunk(pd.DataFrame([sample_input]), 0, explain=True).iloc[0]
+    print("\nPrediction:", result["fraud"])
+    print("Probability:", result["probability"])
+    print("Risk Score:", result["riskScore"])
+    print("Top factors:", result["top_factors"])
@@ -0,0 +1,130 @@
+"""
+On-demand request profiling
+A deterministic profiler (sys.setprofile) follows one request's thread.
+It records wall time per call stack, including C calls such as numpy and
+xgboost, and writes it in the collapsed-stack format that flamegraph.pl,
+speedscope and inferno read:
+
+    predict_claim;score_claims (app_explainable.py:1001);score_ml (...) 1830
+
+Each line is a stack plus its self time in microseconds. Profiles go into a
+bounded ring buffer and optionally into <PROFILE_DIR>/<id>.folded.
+Profiling slows the profiled request several times over. Other requests
+and threads are never traced.
+"""
+
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+
+def _frame_label(frame: Any) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _c_label(function: Any) -> str:
+    module = getattr(function, "__module__", None) or type(getattr(function, "__self__", None)).__name__
+    return f"{module}.{getattr(function, '__qualname__', repr(function))}"
+
+
+class StackProfile:
+    """Self time per call stack for the thread that runs it"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.stacks: Dict[str, float] = defaultdict(float)
+        self.seconds = 0.0
+        self._labels: List[str] = [root]
+        self._frames: List[list] = []  # [start, child_seconds]
+
+    def _callback(self, frame: Any, event: str, arg: Any) -> None:
+        now = time.perf_counter()
+        if event == "call" or event == "c_call":
+            self._labels.append(_frame_label(frame) if event == "call" else _c_label(arg))
+            self._frames.append([now, 0.0])
+        elif self._frames:
+            # return / c_return / c_exception; returns from frames entered
+            # before profiling started find an empty stack and are ignored
+            start, child = self._frames.pop()
+            elapsed = now - start
+            self.stacks[";".join(self._labels)] += elapsed - child
+            self._labels.pop()
+            if self._frames:
+                self._frames[-1][1] += elapsed
+
+    @contextmanager
+    def run(self) -> Iterator["StackProfile"]:
+        start = time.perf_counter()
+        sys.setprofile(self._callback)
+        try:
+            yield self
+        finally:
+            sys.setprofile(None)
+            self.seconds = time.perf_counter() - start
+            traced = sum(self.stacks.values())
+            self.stacks[self.root] += max(0.0, self.seconds - traced)
+
+    def collapsed(self) -> str:
+        """flamegraph.pl input: '<stack> <self microseconds>' per line"""
+        return "\n".join(
+            f"{stack} {round(seconds * 1e6)}"
+            for stack, seconds in sorted(self.stacks.items()) if seconds >= 0.5e-6
+        ) + "\n"
+
+    def top(self, n: int = 10) -> List[Dict[str, Any]]:
+        """Functions with the most self time"""
+        by_function: Dict[str, float] = defaultdict(float)
+        for stack, seconds in self.stacks.items():
+            by_function[stack.rsplit(";", 1)[-1]] += seconds
+        ranked = sorted(by_function.items(), key=lambda item: -item[1])[:n]
+        return [{"function": function, "self_ms": round(seconds * 1000, 3)} for function, seconds in ranked]
+
+
+class ProfileStore:
+    """The most recent profiles, oldest dropped first"""
+
+    def __init__(self, max_profiles: int = 32, directory: str = ""):
+        self.max_profiles = max_profiles
+        self.directory = directory
+        self._profiles: deque = deque(maxlen=max(1, max_profiles))
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, profile: StackProfile, **info: Any) -> str:
+        profile_id = f"{os.getpid()}-{next(self._ids)}"
+        entry = {
+            "id": profile_id,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "duration_ms": round(profile.seconds * 1000, 3),
+            **info,
+            "profile": profile
+        }
+        with self._lock:
+            self._profiles.append(entry)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, f"{profile_id}.folded"), "w") as f:
+                f.write(profile.collapsed())
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[StackProfile]:
+        with self._lock:
+            for entry in self._profiles:
+                if entry["id"] == profile_id:
+                    return entry["profile"]
+        return None
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        """Newest first, without the stacks"""
+        with self._lock:
+            entries = list(self._profiles)
+        return [
+            {**{key: value for key, value in entry.items() if key != "profile"}, "top": entry["profile"].top(5)}
+            for entry in reversed(entries)
+        ]
@@ -0,0 +1,147 @@
+"""
+On-disk model registry
+Every published model bundle gets its own version directory. A CURRENT
+file names the version the API should serve:
+
+    model_registry/
+        versions/<version>/model_bundle.cwb
+        versions/<version>/manifest.json
+        CURRENT      active version id
+        HISTORY      activated versions, one per line, oldest first
+
+CURRENT and HISTORY are replaced atomically, so API workers polling them
+see either the old or the new version. Version ids sort by publish time
+and end with the bundle's content hash: 20261018-044512-827add5d.
+Re-publishing identical content returns the existing version.
+
+Usage:
+    python registry.py publish [model_bundle.cwb] [--activate]
+    python registry.py list
+    python registry.py activate <version>
+    python registry.py rollback
+"""
+
+import json
+import os
+import shutil
+import time
+from typing import Dict, List, Optional
+
+from bundle import BUNDLE_PATH, Bundle
+
+REGISTRY_PATH = "model_registry"
+
+
+def _write_atomic(path: str, text: str) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class ModelRegistry:
+    """Versioned model bundles plus the active-version pointer"""
+
+    def __init__(self, root: str = REGISTRY_PATH):
+        self.root = root
+        self.versions_dir = os.path.join(root, "versions")
+
+    def bundle_path(self, version: str) -> str:
+        return os.path.join(self.versions_dir, version, BUNDLE_PATH)
+
+    def versions(self) -> List[str]:
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(v for v in os.listdir(self.versions_dir) if os.path.exists(self.bundle_path(v)))
+
+    def manifest(self, version: str) -> Dict:
+        with open(os.path.join(self.versions_dir, version, "manifest.json")) as f:
+            return json.load(f)
+
+    def current(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, "CURRENT")) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def history(self) -> List[str]:
+        try:
+            with open(os.path.join(self.root, "HISTORY")) as f:
+                return [line.strip() for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def publish(self, bundle_path: str = BUNDLE_PATH, activate: bool = False) -> str:
+        """Copy a bundle into the registry and return its version id"""
+        bundle = Bundle(bundle_path)
+        for version in self.versions():
+            if version.endswith(f"-{bundle.version[:8]}") and self.manifest(version)["bundle_version"] == bundle.version:
+                break
+        else:
+            version = f"{time.strftime('%Y%m%d-%H%M%S')}-{bundle.version[:8]}"
+            version_dir = os.path.join(self.versions_dir, version)
+            os.makedirs(version_dir, exist_ok=True)
+            shutil.copyfile(bundle_path, f"{self.bundle_path(version)}.tmp")
+            os.replace(f"{self.bundle_path(version)}.tmp", self.bundle_path(version))
+            _write_atomic(os.path.join(version_dir, "manifest.json"), json.dumps({
+                "version": version,
+                "bundle_version": bundle.version,
+                "bundle_created": bundle.created,
+                "published": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "source": os.path.abspath(bundle_path)
+            }, indent=2))
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version: str) -> None:
+        if version not in self.versions():
+            raise KeyError(f"Unknown model version: {version}")
+        history = self.history()
+        if not history or history[-1] != version:
+            history.append(version)
+        os.makedirs(self.root, exist_ok=True)
+        _write_atomic(os.path.join(self.root, "HISTORY"), "\n".join(history) + "\n")
+        _write_atomic(os.path.join(self.root, "CURRENT"), version + "\n")
+
+    def rollback(self) -> str:
+        """Re-activate the version that was active before the current one"""
+        history = self.history()
+        if len(history) < 2:
+            raise ValueError("No earlier version to roll back to")
+        history.pop()
+        _write_atomic(os.path.join(self.root, "HISTORY"), "\n".join(history) + "\n")
+        _write_atomic(os.path.join(self.root, "CURRENT"), history[-1] + "\n")
+        return history[-1]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the local model registry")
+    parser.add_argument("--root", default=os.getenv("MODEL_REGISTRY", REGISTRY_PATH))
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish = commands.add_parser("publish")
+    publish.add_argument("bundle", nargs="?", default=BUNDLE_PATH)
+    publish.add_argument("--activate", action="store_true")
+    commands.add_parser("list")
+    activate = commands.add_parser("activate")
+    activate.add_argument("version")
+    commands.add_parser("rollback")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.root)
+    if args.command == "publish":
+        version = registry.publish(args.bundle, args.activate)
+        print(f"✅ Published {version}" + (" (active)" if args.activate else ""))
+    elif args.command == "list":
+        current = registry.current()
+        for version in registry.versions():
+            print(f"{'*' if version == current else ' '} {version}")
+    elif args.command == "activate":
+        registry.activate(args.version)
+        print(f"✅ Active version: {args.version}")
+    elif args.command == "rollback":
+        print(f"✅ Rolled back to {registry.rollback()}")
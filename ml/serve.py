@@ -0,0 +1,145 @@
+"""
+Pre-fork multi-worker server for the explainable ML API
+Imports app_explainable once in the parent, so models, compiled trees and
+encoders are loaded a single time. The deferred xgboost / IsolationForest
+models are loaded too. Everything is then moved out of GC tracking
+(gc.freeze) so garbage collections in the workers don't write to those
+pages. N uvicorn workers are forked on one shared listening socket, and the
+model memory stays copy-on-write shared between them.
+
+Workers that die are re-forked from the parent, without reloading
+anything. The parent logs every worker's RSS / PSS / shared / private
+memory. Sum of PSS is what the node really pays.
+
+Usage:
+    python serve.py --workers 4 --port 8000
+    python serve.py --workers 4 --report-interval 60    # memory report every minute
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+from metrics import process_memory
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve the ML API with pre-forked workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--report-interval", type=float, default=0,
+                        help="Seconds between memory reports (0 = once after startup)")
+    parser.add_argument("--log-level", default="warning")
+    return parser.parse_args()
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def spawn_worker(app, sock: socket.socket, log_level: str) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+
+    # Child: uvicorn installs its own SIGINT / SIGTERM handlers
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    import uvicorn
+    try:
+        uvicorn.Server(uvicorn.Config(app, log_level=log_level, access_log=False)).run(sockets=[sock])
+    finally:
+        os._exit(0)
+
+
+def memory_report(parent_pid: int, workers: list) -> None:
+    rows = []
+    for label, pid in [("parent", parent_pid)] + [(f"worker {i}", pid) for i, pid in enumerate(workers)]:
+        try:
+            rows.append((label, pid, process_memory(str(pid))))
+        except OSError:
+            continue
+    if not rows:
+        return
+
+    print(f"{'process':<10} {'pid':>7} {'rss_mb':>8} {'pss_mb':>8} {'shared_mb':>10} {'private_mb':>11}")
+    for label, pid, mem in rows:
+        print(f"{label:<10} {pid:>7} {mem['rss_mb']:>8} {mem['pss_mb']:>8} {mem['shared_mb']:>10} {mem['private_mb']:>11}")
+
+    rss_total = sum(mem["rss_mb"] for _, _, mem in rows)
+    pss_total = sum(mem["pss_mb"] for _, _, mem in rows)
+    print(f"📊 {len(workers)} workers: sum RSS {rss_total:.1f} MB, actual (sum PSS) {pss_total:.1f} MB, "
+          f"shared {rss_total - pss_total:.1f} MB saved by copy-on-write")
+
+
+def main() -> None:
+    args = parse_args()
+
+    # The parent loads the deferred models itself: a background thread
+    # wouldn't survive fork() and each worker would load its own copy
+    os.environ["LAZY_WARMUP"] = "0"
+    start = time.perf_counter()
+    import app_explainable
+    app_explainable.warm_up_lazy_models()
+
+    # Everything allocated so far is long-lived model state
+    gc.collect()
+    gc.freeze()
+    print(f"✅ Models loaded once in parent {os.getpid()} ({(time.perf_counter() - start) * 1000:.0f} ms), "
+          f"{gc.get_freeze_count()} objects frozen")
+
+    sock = bind_socket(args.host, args.port)
+    workers = [spawn_worker(app_explainable.app, sock, args.log_level) for _ in range(args.workers)]
+    print(f"🚀 Serving on http://{args.host}:{args.port} with {len(workers)} workers: {workers}")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    next_report = time.monotonic() + 5
+    while not stopping:
+        time.sleep(0.5)
+
+        # Re-fork workers that exited
+        for i, pid in enumerate(workers):
+            done, status = os.waitpid(pid, os.WNOHANG)
+            if done and not stopping:
+                print(f"⚠️  Worker {pid} exited ({status}), restarting")
+                workers[i] = spawn_worker(app_explainable.app, sock, args.log_level)
+
+        if next_report is not None and time.monotonic() >= next_report:
+            memory_report(os.getpid(), workers)
+            next_report = time.monotonic() + args.report_interval if args.report_interval > 0 else None
+
+    print("🛑 Stopping workers")
+    for pid in workers:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in workers:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    sock.close()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+Chunked SMOTE
+ChunkedSMOTE is a drop-in for imblearn's SMOTE (k_neighbors=5, default
+sampling strategy) on large training sets. Its nearest-neighbour search is
+the part that grows:
+
+- blocked: distances come from one BLAS product per block of query rows,
+  and no block holds more than block_bytes of distances and indices
+- approximate above n_probe * cell_size rows of a class: k-means splits
+  the class into cells of about cell_size rows, and each cell's rows only
+  search the n_probe cells with the nearest centroids, so the cost per
+  row stays flat as the class grows
+- parallel: with n_jobs > 1, the cells of a class with at least
+  parallel_min_rows rows go to worker processes that read the class
+  through a memory-mapped file. Exact searches and smaller classes run
+  in-process, where they take less time than starting the pool.
+
+Synthetic samples are drawn exactly like imblearn's (same random stream,
+same interpolation). Wherever the search is exact, which is every class up
+to n_probe * cell_size rows, the output matches imblearn's.
+
+Usage:
+    python smote.py                              # compare with imblearn on insurance_claims.csv
+    python smote.py --rows 10000 100000 1000000  # time / memory / recall on synthetic claims
+"""
+
+import argparse
+import os
+import resource
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_all_start_methods, get_context
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.utils import check_random_state
+
+# Below this many rows in a class the neighbour search runs in-process:
+# starting worker processes costs seconds, the search ~70 us per row
+SMOTE_PARALLEL_MIN_ROWS = int(os.getenv("SMOTE_PARALLEL_MIN_ROWS", "50000"))
+
+# ============================================
+# Neighbour Search
+# ============================================
+
+def _search(X: np.ndarray, queries: np.ndarray, candidates: np.ndarray, k: int, block_bytes: int) -> np.ndarray:
+    """
+    The k nearest candidates (indices into X) of every query row, self
+    excluded. candidates is sorted and contains every query.
+    """
+    C = np.asarray(X[candidates], dtype=np.float64)
+    C_norms = np.einsum("ij,ij->i", C, C)
+    # |q - c|^2 = |q|^2 - 2 q.c + |c|^2; |q|^2 doesn't change a row's ranking
+    C_scaled = np.ascontiguousarray(-2 * C.T)
+    # Per row: a float64 distance and an int64 argpartition index per candidate
+    rows = max(1, block_bytes // (16 * len(candidates)))
+    out = np.empty((len(queries), k), dtype=np.int64)
+    for start in range(0, len(queries), rows):
+        q = queries[start:start + rows]
+        D = np.asarray(X[q], dtype=np.float64) @ C_scaled
+        D += C_norms
+        # The row itself comes first, like kneighbors(X)[:, 0], and is dropped
+        D[np.arange(len(q)), np.searchsorted(candidates, q)] = -np.inf
+        nearest = np.argpartition(D, k, axis=1)[:, :k + 1]
+        order = np.take_along_axis(D, nearest, axis=1).argsort(axis=1, kind="stable")
+        out[start:start + len(q)] = candidates[np.take_along_axis(nearest, order, axis=1)[:, 1:]]
+    return out
+
+
+def _search_file(path: str, queries: np.ndarray, candidates: np.ndarray, k: int, block_bytes: int) -> np.ndarray:
+    """_search in a worker process, on the class memory-mapped from path"""
+    return _search(np.load(path, mmap_mode="r"), queries, candidates, k, block_bytes)
+
+
+# ============================================
+# ChunkedSMOTE
+# ============================================
+
+class ChunkedSMOTE:
+    """SMOTE with a blocked, optionally approximate, multiprocess neighbour search"""
+
+    def __init__(self, k_neighbors: int = 5, random_state: Any = None, cell_size: int = 512,
+                 n_probe: int = 8, block_bytes: int = 32 << 20, n_jobs: int = 1,
+                 parallel_min_rows: int = SMOTE_PARALLEL_MIN_ROWS):
+        self.k_neighbors = k_neighbors
+        self.random_state = random_state
+        self.cell_size = cell_size
+        self.n_probe = n_probe
+        self.block_bytes = block_bytes
+        self.n_jobs = n_jobs
+        self.parallel_min_rows = parallel_min_rows
+
+    def tasks(self, X: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """(query rows, candidate rows) pairs that cover the class"""
+        n = len(X)
+        n_cells = -(-n // self.cell_size)
+        if n_cells <= self.n_probe:
+            # Exact: every row searches the whole class (in blocks, see _search)
+            everything = np.arange(n)
+            return [(everything, everything)]
+
+        rng = np.random.default_rng(self.random_state)
+        sample = np.sort(rng.choice(n, size=min(n, n_cells * 64), replace=False))
+        kmeans = KMeans(n_clusters=n_cells, n_init=1, max_iter=20, random_state=self.random_state)
+        kmeans.fit(np.asarray(X[sample], dtype=np.float64))
+        block = max(1, self.block_bytes // (8 * (X.shape[1] + n_cells)))
+        labels = np.concatenate([
+            kmeans.predict(np.asarray(X[start:start + block], dtype=np.float64))
+            for start in range(0, n, block)
+        ])
+        members = [np.flatnonzero(labels == cell) for cell in range(n_cells)]
+
+        centroids = kmeans.cluster_centers_
+        squared = np.einsum("ij,ij->i", centroids, centroids)
+        between = squared[:, None] - 2 * centroids @ centroids.T + squared
+        tasks = []
+        for cell in range(n_cells):
+            if len(members[cell]) == 0:
+                continue
+            probed, found = [], 0
+            # n_probe nearest cells (its own first), more if they hold too few rows
+            for other in np.argsort(between[cell], kind="stable"):
+                probed.append(members[other])
+                found += len(members[other])
+                if len(probed) >= self.n_probe and found > self.k_neighbors:
+                    break
+            tasks.append((members[cell], np.sort(np.concatenate(probed))))
+        return tasks
+
+    def neighbors(self, X: np.ndarray) -> np.ndarray:
+        """(rows, k_neighbors) indices of each row's nearest other rows"""
+        k = self.k_neighbors
+        if len(X) <= k:
+            raise ValueError(f"Expected n_neighbors <= n_samples_fit, but n_neighbors = {k + 1}, "
+                             f"n_samples_fit = {len(X)}")
+        tasks = self.tasks(X)
+        out = np.empty((len(X), k), dtype=np.int64)
+        if self.n_jobs <= 1 or len(tasks) == 1 or len(X) < self.parallel_min_rows:
+            for queries, candidates in tasks:
+                out[queries] = _search(X, queries, candidates, k, self.block_bytes)
+            return out
+
+        context = get_context("forkserver" if "forkserver" in get_all_start_methods() else "spawn")
+        directory = tempfile.mkdtemp(prefix="smote-")
+        try:
+            path = os.path.join(directory, "class.npy")
+            np.save(path, X)
+            with ProcessPoolExecutor(self.n_jobs, mp_context=context) as pool:
+                futures = {
+                    pool.submit(_search_file, path, queries, candidates, k, self.block_bytes): queries
+                    for queries, candidates in tasks
+                }
+                for future in as_completed(futures):
+                    out[futures[future]] = future.result()
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        return out
+
+    def fit_resample(self, X: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Every class oversampled to the majority count; originals first, like imblearn"""
+        X, y = np.asarray(X), np.asarray(y)
+        classes, counts = np.unique(y, return_counts=True)
+        target = counts.max()
+        majority = classes[np.argmax(counts)]
+
+        X_out = np.empty((len(classes) * target, X.shape[1]), dtype=X.dtype)
+        y_out = np.empty(len(X_out), dtype=y.dtype)
+        X_out[:len(X)], y_out[:len(y)] = X, y
+        filled = len(X)
+        for klass, count in zip(classes, counts):
+            n_samples = target - count
+            if klass == majority or n_samples == 0:
+                continue
+            X_class = X[y == klass]
+            neighbors = self.neighbors(X_class)
+            # Resolved per class like imblearn: an int seed restarts the same
+            # stream for every class, a RandomState (or None) carries on
+            random_state = check_random_state(self.random_state)
+            self._make_samples(X_class, neighbors, n_samples, X_out[filled:filled + n_samples], random_state)
+            y_out[filled:filled + n_samples] = klass
+            filled += n_samples
+        return X_out[:filled], y_out[:filled]
+
+    def _make_samples(self, X: np.ndarray, neighbors: np.ndarray, n_samples: int, out: np.ndarray,
+                      random_state: np.random.RandomState) -> None:
+        # Same random draws and arithmetic as imblearn's BaseSMOTE._make_samples
+        samples = random_state.randint(low=0, high=neighbors.size, size=n_samples)
+        steps = random_state.uniform(size=n_samples)[:, np.newaxis]
+        rows = np.floor_divide(samples, neighbors.shape[1])
+        cols = np.mod(samples, neighbors.shape[1])
+
+        block = max(1, self.block_bytes // (8 * X.shape[1]))
+        for start in range(0, n_samples, block):
+            end = start + block
+            base = X[rows[start:end]]
+            diffs = X[neighbors[rows[start:end], cols[start:end]]] - base
+            out[start:end] = (base + steps[start:end] * diffs).astype(X.dtype)
+
+
+# ============================================
+# Benchmark
+# ============================================
+
+def load_training_claims(csv: str, directory: str, rows: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Unscaled feature matrix and labels, as model.py's split oversamples them"""
+    from ingest import LABEL_COLUMN, feature_layout, ingest_claims, load_matrix, source_columns
+
+    if not os.path.exists(os.path.join(directory, f"{LABEL_COLUMN}.npy")):
+        ingest_claims(csv, directory)
+    feature_names = list(feature_layout(source_columns(csv)))
+    columns = {
+        name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+        for name in (*feature_names, LABEL_COLUMN)
+    }
+    block = slice(0, rows)
+    return load_matrix(columns, feature_names, block), np.asarray(columns[LABEL_COLUMN][block], dtype=np.int64)
+
+
+def _timed_run(method: str, csv: str, directory: str, rows: int, n_jobs: int) -> Dict[str, Any]:
+    """One oversampling run in a fresh process, so peak RSS is its own"""
+    import warnings
+    warnings.filterwarnings("ignore")
+    X, y = load_training_claims(csv, directory, rows)
+    if method == "imblearn":
+        from imblearn.over_sampling import SMOTE
+        sampler = SMOTE(random_state=42)
+    else:
+        sampler = ChunkedSMOTE(random_state=42, n_jobs=n_jobs)
+    start = time.perf_counter()
+    X_res, y_res = sampler.fit_resample(X, y)
+    seconds = time.perf_counter() - start
+    synthetic = X_res[len(X):].astype(np.float64)
+    return {
+        "seconds": seconds,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "rows": len(X_res),
+        "mean": synthetic.mean(axis=0),
+        "std": synthetic.std(axis=0)
+    }
+
+
+def recall(X: np.ndarray, y: np.ndarray, queries: int = 2000) -> float:
+    """Share of the exact k nearest neighbours that the approximate search finds"""
+    classes, counts = np.unique(y, return_counts=True)
+    X_class = X[y == classes[np.argmin(counts)]]
+    approximate = ChunkedSMOTE(random_state=42).neighbors(X_class)
+    sample = np.sort(np.random.default_rng(0).choice(len(X_class), size=min(queries, len(X_class)), replace=False))
+    exact = _search(X_class, sample, np.arange(len(X_class)), approximate.shape[1], 32 << 20)
+    hits = [len(np.intersect1d(a, b)) for a, b in zip(approximate[sample], exact)]
+    return sum(hits) / exact.size
+
+
+if __name__ == "__main__":
+    import warnings
+    warnings.filterwarnings("ignore")
+
+    parser = argparse.ArgumentParser(description="Compare ChunkedSMOTE with imblearn's SMOTE")
+    parser.add_argument("--csv", default="insurance_claims.csv")
+    parser.add_argument("--rows", type=int, nargs="*", default=[], help="benchmark on this many synthetic training rows")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="worker processes for ChunkedSMOTE")
+    parser.add_argument("--imblearn-max-rows", type=int, default=1_000_000, help="skip imblearn above this many rows")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="smote-bench-")
+    try:
+        from imblearn.over_sampling import SMOTE
+
+        directory = os.path.join(workdir, "csv")
+        os.makedirs(directory)
+        X, y = load_training_claims(args.csv, directory)
+        a = SMOTE(random_state=42).fit_resample(X, y)
+        b = ChunkedSMOTE(random_state=42).fit_resample(X, y)
+        same = np.array_equal(a[0], b[0]) and np.array_equal(a[1], b[1])
+        print(f"{'✅' if same else '❌'} {args.csv}: {len(X):,} rows -> {len(b[0]):,}, "
+              f"{'identical to' if same else 'differs from'} imblearn SMOTE")
+        if not args.rows:
+            raise SystemExit(0)
+
+        # About 30% of synthetic claims survive cleaning (rows with "?" / "None" are dropped)
+        from approx_svm import synthetic_csv
+        source_rows = max(args.rows) * 4
+        csv = os.path.join(workdir, "synthetic.csv")
+        print(f"🧪 Generating {source_rows:,} synthetic claims...")
+        synthetic_csv(source_rows, csv)
+        directory = os.path.join(workdir, "columns")
+        os.makedirs(directory)
+        available = len(load_training_claims(csv, directory)[1])
+
+        context = get_context("forkserver" if "forkserver" in get_all_start_methods() else "spawn")
+        for rows in args.rows:
+            rows = min(rows, available)
+            X, y = load_training_claims(csv, directory, rows)
+            print(f"\n📊 {rows:,} rows ({int(y.sum()):,} fraud), recall@5 of the approximate search: {recall(X, y):.3f}")
+            runs = {}
+            methods = ["imblearn", "chunked"] + (["chunked-parallel"] if args.jobs > 1 else [])
+            for method in methods:
+                if method == "imblearn" and rows > args.imblearn_max_rows:
+                    print(f"   {method:<18} skipped (> --imblearn-max-rows)")
+                    continue
+                jobs = args.jobs if method == "chunked-parallel" else 1
+                with ProcessPoolExecutor(1, mp_context=context) as pool:
+                    runs[method] = pool.submit(_timed_run, method, csv, directory, rows, jobs).result()
+                run = runs[method]
+                print(f"   {method:<18} {run['seconds']:>8.2f}s   peak RSS {run['peak_rss_mb']:>7.0f} MB   "
+                      f"-> {run['rows']:,} rows")
+            if "imblearn" in runs:
+                reference = runs["imblearn"]
+                varying = reference["std"] > 0
+                run = runs["chunked"]
+                shift = np.abs(run["mean"] - reference["mean"])[varying] / reference["std"][varying]
+                ratio = run["std"][varying] / reference["std"][varying]
+                print(f"   synthetic samples vs imblearn: max |mean diff| {shift.max():.3f} sd, "
+                      f"std ratio {ratio.min():.3f}-{ratio.max():.3f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
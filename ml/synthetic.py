@@ -0,0 +1,367 @@
+"""
+Synthetic claims for scale testing
+Learns the distribution of insurance_claims.csv and streams out any number
+of claims in the same schema, chunk by chunk in constant memory. The
+output can go to model.py, the batch scorer or load tests.
+
+The model is a Gaussian copula per fraud class:
+- every column keeps its own empirical distribution (categories and
+  discrete values by frequency, continuous values by quantiles)
+- the dependence between columns is the correlation of their normal
+  scores
+
+Categories are ranked alphabetically for the copula, so dependence
+between two unordered categories is only approximated. auto_model is
+sampled given auto_make, so make / model pairs are always real ones.
+The claim parts are fixed fractions of total_claim_amount in the source
+(e.g. 1/10 injury, 1/10 property, the rest vehicle). So the total is
+modeled together with the split pattern as one category, and the parts
+are derived from both. A policy is never older than its holder, and it is
+bound before the incident.
+
+--anomaly-rate replaces that share of claims with out-of-pattern ones
+(ANOMALIES below). --label-anomalies adds an injected_anomaly column
+naming the kind.
+
+Usage:
+    python synthetic.py --rows 5000000 -o synthetic_claims.csv
+    python synthetic.py --rows 1000000 --fraud-rate 0.1 --anomaly-rate 0.01 -o claims.ndjson
+    python synthetic.py --rows 200000 --report      # compare with the source data, write nothing
+"""
+
+import argparse
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+from scipy.stats import rankdata
+
+LABEL_COLUMN = "fraud_reported"
+ID_COLUMN = "policy_number"
+DATE_COLUMNS = ("policy_bind_date", "incident_date")
+LOCATION_COLUMN = "incident_location"
+CLAIM_PARTS = ("injury_claim", "property_claim", "vehicle_claim")
+TOTAL_COLUMN = "total_claim_amount"
+# Modeled stand-in for the parts: "<injury share>/<property share>" of the total
+SPLIT_COLUMN = "claim_split"
+# child -> parent: the child is sampled from its values seen with the parent
+CONDITIONAL_COLUMNS = {"auto_model": "auto_make"}
+# Columns with at most this many distinct values are sampled as discrete
+DISCRETE_MAX_VALUES = 64
+ANOMALIES = ("inflated_claim", "premium_spike", "tenure_mismatch", "bind_after_incident")
+FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson", ".parquet": "parquet"}
+
+EPOCH = np.datetime64("1970-01-01", "D")
+
+
+@dataclass
+class Marginal:
+    kind: str               # "category" | "int" | "float" | "date"
+    discrete: bool
+    values: np.ndarray      # distinct values (discrete) or all values sorted (continuous)
+    cdf: np.ndarray         # cumulative share per distinct value (discrete only)
+    step: float             # rounding granularity of continuous values
+
+    @classmethod
+    def fit(cls, kind: str, values: np.ndarray) -> "Marginal":
+        distinct, counts = np.unique(values, return_counts=True)
+        if kind == "category" or len(distinct) <= DISCRETE_MAX_VALUES:
+            return cls(kind, True, distinct, np.cumsum(counts) / len(values), 0.0)
+        if kind == "float":
+            step = 0.01
+        else:
+            nonzero = np.abs(distinct[distinct != 0]).astype(np.int64)
+            step = float(np.gcd.reduce(nonzero)) if len(nonzero) else 1.0
+        return cls(kind, False, np.sort(values), np.empty(0), step)
+
+    def codes(self, values: np.ndarray) -> np.ndarray:
+        """Numeric stand-in used to rank the column"""
+        return np.searchsorted(self.values, values) if self.kind == "category" else values
+
+    def sample(self, u: np.ndarray) -> np.ndarray:
+        """Values at uniform quantiles u"""
+        if self.discrete:
+            return self.values[np.minimum(np.searchsorted(self.cdf, u, side="right"), len(self.values) - 1)]
+        n = len(self.values)
+        x = np.interp(u, (np.arange(n) + 0.5) / n, self.values)
+        return np.round(x / self.step) * self.step
+
+
+class ClassCopula:
+    """Marginals plus normal-score correlation for the claims of one class"""
+
+    def __init__(self, columns: Dict[str, np.ndarray], kinds: Dict[str, str]):
+        self.names = list(columns)
+        self.marginals = {name: Marginal.fit(kinds[name], values) for name, values in columns.items()}
+
+        n = len(next(iter(columns.values())))
+        scores = np.column_stack([
+            ndtri(rankdata(self.marginals[name].codes(values)) / (n + 1))
+            for name, values in columns.items()
+        ])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            correlation = np.nan_to_num(np.corrcoef(scores, rowvar=False))
+        np.fill_diagonal(correlation, 1.0)
+
+        # Nearest positive definite matrix with a unit diagonal
+        eigenvalues, eigenvectors = np.linalg.eigh(correlation)
+        correlation = (eigenvectors * np.maximum(eigenvalues, 1e-6)) @ eigenvectors.T
+        scale = np.sqrt(np.diag(correlation))
+        self.cholesky = np.linalg.cholesky(correlation / np.outer(scale, scale))
+
+    def sample(self, n: int, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+        u = ndtr(rng.standard_normal((n, len(self.names))) @ self.cholesky.T)
+        return {name: self.marginals[name].sample(u[:, j]) for j, name in enumerate(self.names)}
+
+
+class ClaimSynthesizer:
+    """Fitted on a claims DataFrame; chunks() generates new ones"""
+
+    def __init__(self, df: pd.DataFrame):
+        self.columns = list(df.columns)
+        self.fraud_rate = float((df[LABEL_COLUMN] == "Y").mean())
+        self.constants = {c: df[c].iloc[0] for c in df.columns if df[c].nunique() == 1}
+
+        kinds = {}
+        for column in df.columns:
+            if column in DATE_COLUMNS:
+                kinds[column] = "date"
+            elif pd.api.types.is_integer_dtype(df[column]):
+                kinds[column] = "int"
+            elif pd.api.types.is_float_dtype(df[column]):
+                kinds[column] = "float"
+            else:
+                kinds[column] = "category"
+        self.kinds = kinds
+
+        total = df[TOTAL_COLUMN].where(df[TOTAL_COLUMN] != 0, 1)
+        df = df.assign(**{SPLIT_COLUMN: [
+            f"{injury:.4f}/{prop:.4f}"
+            for injury, prop in zip(df[CLAIM_PARTS[0]] / total, df[CLAIM_PARTS[1]] / total)
+        ]})
+        kinds[SPLIT_COLUMN] = "category"
+
+        skip = {LABEL_COLUMN, ID_COLUMN, LOCATION_COLUMN, *CLAIM_PARTS, *CONDITIONAL_COLUMNS, *self.constants}
+        modeled = [c for c in df.columns if c not in skip]
+
+        self.copulas = {}
+        for label in ("Y", "N"):
+            part = df[df[LABEL_COLUMN] == label]
+            self.copulas[label] = ClassCopula({c: self._to_numeric(c, part[c]) for c in modeled}, kinds)
+
+        self.conditionals = {}
+        for child, parent in CONDITIONAL_COLUMNS.items():
+            self.conditionals[child] = (parent, {
+                value: Marginal.fit("category", group[child].to_numpy())
+                for value, group in df.groupby(parent)
+            })
+
+        # "9935 4th Drive" -> a new house number on an observed street
+        self.streets = df[LOCATION_COLUMN].str.split(" ", n=1).str[1].dropna().unique()
+
+    def _to_numeric(self, column: str, series: pd.Series) -> np.ndarray:
+        if self.kinds[column] == "date":
+            return (pd.to_datetime(series).to_numpy().astype("datetime64[D]") - EPOCH).astype(np.int64)
+        return series.to_numpy()
+
+    def _sample(self, n: int, fraud_rate: float, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+        fraud = rng.random(n) < fraud_rate
+        columns: Dict[str, np.ndarray] = {}
+        for label, mask in (("Y", fraud), ("N", ~fraud)):
+            count = int(mask.sum())
+            if not count:
+                continue
+            for name, values in self.copulas[label].sample(count, rng).items():
+                if name not in columns:
+                    columns[name] = np.empty(n, dtype=values.dtype)
+                columns[name][mask] = values
+        columns[LABEL_COLUMN] = np.where(fraud, "Y", "N")
+
+        for child, (parent, by_parent) in self.conditionals.items():
+            values = np.empty(n, dtype=object)
+            for parent_value, marginal in by_parent.items():
+                rows = columns[parent] == parent_value
+                values[rows] = marginal.sample(rng.random(int(rows.sum())))
+            columns[child] = values
+
+        shares = np.array([split.split("/") for split in columns.pop(SPLIT_COLUMN)], dtype=float)
+        total = columns.pop(TOTAL_COLUMN)
+        injury = np.round(total * shares[:, 0] / 10) * 10
+        prop = np.round(total * shares[:, 1] / 10) * 10
+        columns.update(zip(CLAIM_PARTS, (injury, prop, total - injury - prop)))
+
+        # Consistency the copula doesn't guarantee on its own
+        if "months_as_customer" in columns and "age" in columns:
+            columns["months_as_customer"] = np.minimum(columns["months_as_customer"], columns["age"] * 12)
+        if all(c in columns for c in DATE_COLUMNS):
+            columns["policy_bind_date"] = np.minimum(columns["policy_bind_date"], columns["incident_date"] - 1)
+        return columns
+
+    def _inject(self, columns: Dict[str, np.ndarray], rows: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """Turn the given rows into anomalies; returns the kind per row"""
+        kinds = rng.choice(len(ANOMALIES), len(rows))
+        for k, kind in enumerate(ANOMALIES):
+            idx = rows[kinds == k]
+            if not len(idx):
+                continue
+            if kind == "inflated_claim":
+                factor = rng.uniform(5, 15, len(idx))
+                for part in CLAIM_PARTS:
+                    columns[part][idx] = np.round(columns[part][idx] * factor / 10) * 10
+            elif kind == "premium_spike":
+                columns["policy_annual_premium"][idx] = np.round(
+                    columns["policy_annual_premium"][idx] * rng.uniform(3, 8, len(idx)), 2)
+            elif kind == "tenure_mismatch":
+                columns["months_as_customer"][idx] = columns["age"][idx] * 12 + rng.integers(24, 240, len(idx))
+            elif kind == "bind_after_incident":
+                columns["policy_bind_date"][idx] = columns["incident_date"][idx] + rng.integers(1, 365, len(idx))
+        return np.asarray(ANOMALIES)[kinds]
+
+    def chunks(
+        self,
+        rows: int,
+        chunk_size: int = 50_000,
+        fraud_rate: Optional[float] = None,
+        anomaly_rate: float = 0.0,
+        label_anomalies: bool = False,
+        seed: Optional[int] = None,
+        first_id: int = 100_000
+    ) -> Iterator[pd.DataFrame]:
+        """DataFrames of at most chunk_size claims, rows in total, in the source schema"""
+        rng = np.random.default_rng(seed)
+        fraud_rate = self.fraud_rate if fraud_rate is None else fraud_rate
+
+        for offset in range(0, rows, chunk_size):
+            n = min(chunk_size, rows - offset)
+            columns = self._sample(n, fraud_rate, rng)
+
+            injected = np.full(n, "", dtype=object)
+            anomalous = np.flatnonzero(rng.random(n) < anomaly_rate)
+            if len(anomalous):
+                injected[anomalous] = self._inject(columns, anomalous, rng)
+
+            columns[TOTAL_COLUMN] = sum(columns[part] for part in CLAIM_PARTS)
+            columns[ID_COLUMN] = np.arange(first_id + offset, first_id + offset + n)
+            columns[LOCATION_COLUMN] = [
+                f"{number} {street}"
+                for number, street in zip(rng.integers(1000, 10000, n), rng.choice(self.streets, n))
+            ]
+            for column in DATE_COLUMNS:
+                columns[column] = (EPOCH + columns[column].astype("timedelta64[D]")).astype(str)
+            for column, value in self.constants.items():
+                columns[column] = np.full(n, value, dtype=object)
+            for column, kind in self.kinds.items():
+                if kind == "int" and column in columns:
+                    columns[column] = columns[column].astype(np.int64)
+
+            chunk = pd.DataFrame({column: columns[column] for column in self.columns})
+            if label_anomalies:
+                chunk["injected_anomaly"] = injected
+            yield chunk
+
+
+# ============================================
+# Output
+# ============================================
+
+def write_chunks(chunks: Iterator[pd.DataFrame], path: str, fmt: str) -> Iterator[int]:
+    """Append each chunk to path as it is generated; yields rows written so far"""
+    written = 0
+    if fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("❌ Parquet output needs pyarrow (pip install pyarrow)")
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                written += len(chunk)
+                yield written
+        finally:
+            if writer is not None:
+                writer.close()
+        return
+
+    with open(path, "w", newline="") as f:
+        for chunk in chunks:
+            if fmt == "csv":
+                chunk.to_csv(f, header=written == 0, index=False)
+            else:
+                f.write(chunk.to_json(orient="records", lines=True))
+            written += len(chunk)
+            yield written
+
+
+def report(real: pd.DataFrame, synthetic: pd.DataFrame) -> None:
+    """How closely the synthetic claims match the source, column by column"""
+    print(f"fraud rate: real {(real[LABEL_COLUMN] == 'Y').mean():.3f}, "
+          f"synthetic {(synthetic[LABEL_COLUMN] == 'Y').mean():.3f}")
+    print(f"{'column':<30} {'distance':>9}  (categories: total variation, numbers: KS statistic)")
+    for column in real.columns:
+        if column in (ID_COLUMN, LOCATION_COLUMN) or real[column].nunique() == 1:
+            continue
+        if column in DATE_COLUMNS:
+            real_values, synthetic_values = pd.to_datetime(real[column]), pd.to_datetime(synthetic[column])
+        else:
+            real_values, synthetic_values = real[column], synthetic[column]
+        if pd.api.types.is_numeric_dtype(real_values) or column in DATE_COLUMNS:
+            grid = np.union1d(real_values, synthetic_values)
+            cdf_real = np.searchsorted(np.sort(real_values), grid, side="right") / len(real)
+            cdf_synth = np.searchsorted(np.sort(synthetic_values), grid, side="right") / len(synthetic)
+            distance = np.abs(cdf_real - cdf_synth).max()
+        else:
+            shares = pd.concat([
+                real[column].value_counts(normalize=True), synthetic[column].value_counts(normalize=True)
+            ], axis=1).fillna(0)
+            distance = 0.5 * np.abs(shares.iloc[:, 0] - shares.iloc[:, 1]).sum()
+        print(f"{column:<30} {distance:>9.3f}")
+
+    numeric = [c for c in real.select_dtypes("number").columns if c != ID_COLUMN and real[c].nunique() > 1]
+    diff = np.abs(real[numeric].corr(method="spearman") - synthetic[numeric].corr(method="spearman")).to_numpy()
+    print(f"rank correlation between numeric columns: mean |Δ| {diff[np.triu_indices(len(numeric), 1)].mean():.3f}, "
+          f"max |Δ| {diff.max():.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic insurance claims")
+    parser.add_argument("--source", default="insurance_claims.csv")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("-o", "--output", default="synthetic_claims.csv")
+    parser.add_argument("--format", choices=sorted(set(FORMATS.values())), help="default: from the file extension")
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--fraud-rate", type=float, help="share of fraud_reported=Y (default: as in the source)")
+    parser.add_argument("--anomaly-rate", type=float, default=0.0)
+    parser.add_argument("--label-anomalies", action="store_true", help="add an injected_anomaly column")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--report", action="store_true", help="compare --rows claims with the source instead of writing")
+    args = parser.parse_args()
+
+    source = pd.read_csv(args.source, keep_default_na=False)
+    synthesizer = ClaimSynthesizer(source)
+    print(f"✅ Learned {len(synthesizer.columns)} columns from {len(source)} claims in {args.source}")
+
+    chunks = synthesizer.chunks(
+        args.rows, args.chunk_size, args.fraud_rate, args.anomaly_rate, args.label_anomalies, args.seed
+    )
+    if args.report:
+        report(source, pd.concat(chunks, ignore_index=True))
+        raise SystemExit(0)
+
+    fmt = args.format or FORMATS.get(os.path.splitext(args.output)[1].lower())
+    if fmt is None:
+        parser.error(f"can't tell the format of {args.output}, pass --format")
+
+    start = time.perf_counter()
+    for written in write_chunks(chunks, args.output, fmt):
+        elapsed = time.perf_counter() - start
+        print(f"  {written:,} / {args.rows:,} claims ({written / elapsed:,.0f} rows/s)", end="\r", flush=True)
+    print(f"\n✅ Wrote {args.rows:,} claims to {args.output} in {time.perf_counter() - start:.1f}s")
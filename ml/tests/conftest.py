@@ -0,0 +1,80 @@
+"""
+Shared fixtures: the shipped artifacts, the real claims from
+insurance_claims.csv (scaled exactly like model.py scales them, and as
+API payloads) and the API module itself.
+"""
+
+import os
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLAIMS_CSV = os.path.join(ML_DIR, "insurance_claims.csv")
+sys.path.insert(0, ML_DIR)
+
+
+def load_artifact(name: str):
+    with open(os.path.join(ML_DIR, name), "rb") as f:
+        return pickle.load(f)
+
+
+@pytest.fixture(scope="session")
+def claims(tmp_path_factory) -> np.ndarray:
+    """Every usable claim in insurance_claims.csv as scaled model inputs"""
+    from ingest import ingest_claims, load_matrix
+
+    directory = str(tmp_path_factory.mktemp("claims_columns"))
+    info = ingest_claims(CLAIMS_CSV, directory)
+    feature_names = load_artifact("feature_names.pkl")
+    assert info["feature_names"] == list(feature_names)
+
+    columns = {
+        name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+        for name in feature_names
+    }
+    return load_artifact("scaler.pkl").transform(load_matrix(columns, feature_names))
+
+
+@pytest.fixture(scope="session")
+def claim_records() -> list:
+    """insurance_claims.csv rows as /predict payloads (ClaimInput field names)"""
+    df = pd.read_csv(CLAIMS_CSV, keep_default_na=False)
+    df.columns = [c.replace("-", "_") for c in df.columns]
+    return df.drop(columns=["_c39"]).to_dict("records")
+
+
+@pytest.fixture(scope="session")
+def api(tmp_path_factory):
+    """
+    app_explainable serving the shipped pickles: an empty registry, no
+    watcher, no cascade. Module globals (registry, cascade, ADMIN_TOKEN...)
+    are read per call, so tests monkeypatch them instead of reimporting.
+    """
+    cwd = os.getcwd()
+    os.environ.update(
+        MODEL_REGISTRY=str(tmp_path_factory.mktemp("registry")),
+        MODEL_BUNDLE=str(tmp_path_factory.mktemp("bundle") / "model_bundle.cwb"),
+        MODEL_WATCH_INTERVAL="0",
+        LAZY_WARMUP="0"
+    )
+    os.chdir(ML_DIR)  # artifacts are loaded relative to the working directory
+    try:
+        import app_explainable
+        assert app_explainable.active_models.loaded
+        assert app_explainable.active_models.anomaly_model is not None
+        yield app_explainable
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture
+def client(api):
+    from fastapi.testclient import TestClient
+
+    api.prediction_cache.clear()
+    with TestClient(api.app) as test_client:
+        yield test_client
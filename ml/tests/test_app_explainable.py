@@ -0,0 +1,75 @@
+import pytest
+
+
+@pytest.fixture(scope="module")
+def claim_inputs(api, claim_records):
+    return [api.ClaimInput(**row) for row in claim_records[:200]]
+
+
+def test_status_same_for_every_fields_preset(api, claim_inputs):
+    selections = [*api.FIELD_PRESETS, *sorted(api.OUTPUT_GROUPS)]
+    statuses = {
+        fields: [output.status for output in api.score_claims(claim_inputs, api.parse_fields(fields))]
+        for fields in selections
+    }
+    assert "Critical" in statuses["full"]
+    for fields in selections:
+        assert statuses[fields] == statuses["full"], fields
+
+
+def test_batch_matches_single_predictions(client, claim_records):
+    claims = claim_records[:40]
+    response = client.post("/predict/batch", json={"claims": claims})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["count"] == len(claims) and body["errors"] == 0
+
+    for item, claim in zip(body["results"], claims):
+        single = client.post("/predict", json=claim)
+        assert single.status_code == 200
+        assert item["prediction"] == single.json(), item["index"]
+
+
+def test_batch_reports_item_errors_in_place(api, client, claim_records):
+    missing_field = {k: v for k, v in claim_records[1].items() if k != "age"}
+    bad_date = {**claim_records[2], "incident_date": "not a date"}
+    body = client.post("/predict/batch", json={"claims": [claim_records[0], missing_field, bad_date]}).json()
+
+    assert [item["index"] for item in body["results"]] == [0, 1, 2]
+    assert body["errors"] == 1
+    assert "age" in body["results"][1]["error"] and body["results"][1].get("prediction") is None
+    # A claim that validates but can't be featurised gets the heuristic fallback
+    assert body["results"][2]["prediction"]["model_version"] == "2.0-XAI-Fallback"
+    assert body["results"][0]["prediction"]["model_version"] == api.active_models.version
+
+
+def test_unseen_categories_score_like_first_class(api, client, claim_records):
+    encoders = api.active_models.feature_builder.encoders
+    claim = claim_records[0]
+    unseen = {**claim, "insured_hobbies": "surfing", "auto_make": "Tesla"}
+    first = {**claim, "insured_hobbies": encoders["insured_hobbies"].classes[0], "auto_make": encoders["auto_make"].classes[0]}
+    assert encoders["insured_hobbies"].lookup[first["insured_hobbies"]] == 0
+
+    response = client.post("/predict", json=unseen)
+    assert response.status_code == 200
+    scored = response.json()
+    assert scored["model_version"] == api.active_models.version  # the ML path, not the fallback
+    assert scored.pop("unknown_categories") == ["insured_hobbies", "auto_make"]
+
+    reference = client.post("/predict", json=first).json()
+    assert "unknown_categories" not in reference
+    # Rule reasons read the raw values ("Risky hobby: base-jumping"), the models see codes
+    scored.pop("reasons"), reference.pop("reasons")
+    assert scored == reference
+
+    batch = client.post("/predict/batch", json={"claims": [unseen, first]}).json()
+    assert batch["results"][0]["prediction"]["unknown_categories"] == ["insured_hobbies", "auto_make"]
+
+
+def test_explanation_method_names_what_ran(client, claim_records):
+    full = client.post("/predict", json=claim_records[0]).json()
+    assert full["explanation_method"] == "ML Ensemble: path contributions (RandomForest, DecisionTree) + TreeSHAP (XGBoost)"
+
+    for fields in ("score", "anomaly,ensemble"):
+        output = client.post(f"/predict?fields={fields}", json=claim_records[0]).json()
+        assert "explanation_method" not in output and "reasons" not in output, fields
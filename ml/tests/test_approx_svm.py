@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from sklearn.metrics import roc_auc_score
+
+from approx_svm import RFFSVMClassifier, load_claims
+from conftest import CLAIMS_CSV
+
+
+@pytest.fixture(scope="module")
+def data(tmp_path_factory):
+    """insurance_claims.csv split and scaled like approx_svm.py compares it"""
+    return load_claims(CLAIMS_CSV, str(tmp_path_factory.mktemp("svm_columns")))
+
+
+@pytest.fixture(scope="module")
+def fitted(data):
+    return RFFSVMClassifier(random_state=42).fit(data["X_train"], data["y_train"])
+
+
+def test_predictions_are_consistent(fitted, data):
+    X = data["X_test"]
+    proba = fitted.predict_proba(X)
+    assert proba.shape == (len(X), 2)
+    assert ((proba >= 0) & (proba <= 1)).all()
+    np.testing.assert_allclose(proba.sum(axis=1), 1.0)
+
+    # Labels follow the sign of the margin, like SVC
+    margins = fitted.decision_function(X)
+    np.testing.assert_array_equal(fitted.predict(X), fitted.classes_[(margins > 0).astype(int)])
+    assert (fitted.predict(X) == 1).any() and (fitted.predict(X) == 0).any()
+
+
+def test_auc_floor_on_claims(fitted, data):
+    # 0.774 with random_state=42
+    assert roc_auc_score(data["y_test"], fitted.predict_proba(data["X_test"])[:, 1]) > 0.74
+
+
+def test_binary_only(data):
+    y = np.arange(len(data["y_train"])) % 3
+    with pytest.raises(ValueError):
+        RFFSVMClassifier(random_state=0).fit(data["X_train"], y)
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+
+import httpx
+
+from batcher import MicroBatcher
+
+
+class StubScorer:
+    """score_fn that records each call and answers one row per item"""
+
+    def __init__(self, delay: float = 0.0, error: Exception = None):
+        self.calls = []
+        self.delay = delay
+        self.error = error
+        self.threads = set()
+
+    def __call__(self, items, key):
+        self.calls.append((list(items), key))
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return [f"{key}:{item}" for item in items]
+
+
+def test_concurrent_submits_share_one_call():
+    scorer = StubScorer()
+    batcher = MicroBatcher(scorer, max_wait_ms=50, max_batch_size=64)
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(i, "full") for i in range(10)))
+
+    assert asyncio.run(run()) == [f"full:{i}" for i in range(10)]
+    assert scorer.calls == [(list(range(10)), "full")]
+    assert threading.get_ident() not in scorer.threads  # scored off the event loop
+    assert batcher.stats()["batch_size"]["count"] == 1
+
+
+def test_batches_split_by_key_and_size():
+    scorer = StubScorer()
+    batcher = MicroBatcher(scorer, max_wait_ms=50, max_batch_size=4)
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(i, "score" if i % 2 else "full") for i in range(6)))
+
+    assert asyncio.run(run()) == [f"{'score' if i % 2 else 'full'}:{i}" for i in range(6)]
+    assert sorted(len(items) for items, _ in scorer.calls) == [1, 1, 2, 2]
+    for items, key in scorer.calls:
+        assert all((i % 2 == 1) == (key == "score") for i in items)
+
+
+def test_error_reaches_every_waiter_without_stalling_the_loop():
+    scorer = StubScorer(delay=0.2, error=RuntimeError("model crashed"))
+    batcher = MicroBatcher(scorer, max_wait_ms=20, max_batch_size=64)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        outcomes = await asyncio.gather(*(batcher.submit(i) for i in range(5)), return_exceptions=True)
+        ticking.cancel()
+
+        # The worker survives the failure and serves the next batch
+        scorer.error, scorer.delay = None, 0.0
+        after = await asyncio.wait_for(batcher.submit("next"), 1.0)
+        return outcomes, ticks, after
+
+    outcomes, ticks, after = asyncio.run(run())
+    assert len(scorer.calls) == 2
+    assert all(isinstance(outcome, RuntimeError) and str(outcome) == "model crashed" for outcome in outcomes)
+    assert ticks >= 10  # the loop kept running while the batch was scored
+    assert after == "None:next"
+
+
+def test_api_concurrent_predicts_merge(api, claim_records, monkeypatch):
+    scorer = StubScorer()
+    scorer_fn = api.predict_batcher.score_fn
+
+    def counting(claims, groups):
+        scorer(claims, groups)
+        return scorer_fn(claims, groups)
+
+    monkeypatch.setattr(api.predict_batcher, "score_fn", counting)
+    monkeypatch.setattr(api.predict_batcher, "max_wait", 0.2)
+    api.prediction_cache.clear()
+    claims = claim_records[10:18]
+
+    async def run():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.post("/predict", json=claim) for claim in claims))
+
+    responses = asyncio.run(run())
+    assert [response.status_code for response in responses] == [200] * len(claims)
+    assert len(scorer.calls) == 1 and len(scorer.calls[0][0]) == len(claims)
+
+    # Each caller got its own claim's result
+    expected = api.score_claims([api.ClaimInput(**claim) for claim in claims], check_cache=False)
+    assert [response.json() for response in responses] == [
+        output.model_dump(exclude_none=True) for output in expected
+    ]
@@ -0,0 +1,66 @@
+import mmap
+
+import numpy as np
+import pytest
+
+from bundle import load_model_bundle, save_model_bundle
+from compiled_trees import compile_xgboost
+from conftest import load_artifact
+
+
+@pytest.fixture(scope="module")
+def pickles():
+    return {
+        "rf": load_artifact("fraud_model.pkl"),
+        "dt": load_artifact("dt_model.pkl"),
+        "xgb": load_artifact("xgb_model.pkl"),
+        "scaler": load_artifact("scaler.pkl"),
+        "feature_names": load_artifact("feature_names.pkl"),
+        "encoders": load_artifact("encoders.pkl"),
+        "anomaly_model": load_artifact("anomaly_model.pkl")
+    }
+
+
+@pytest.fixture(scope="module")
+def bundle_path(pickles, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("bundle") / "model_bundle.cwb")
+    version = save_model_bundle(path, **pickles)
+    assert load_model_bundle(path).version == version
+    return path
+
+
+def test_bundle_round_trip_is_memory_mapped(pickles, bundle_path):
+    artifacts = load_model_bundle(bundle_path)
+    assert isinstance(artifacts.bundle._map, mmap.mmap)
+    threshold = artifacts.rf_compiled.threshold
+    assert not threshold.flags.owndata and not threshold.flags.writeable  # a view into the mapped file
+
+    assert artifacts.feature_names == list(pickles["feature_names"])
+    assert np.array_equal(artifacts.scaler.mean_, pickles["scaler"].mean_)
+    assert np.array_equal(artifacts.scaler.scale_, pickles["scaler"].scale_)
+    for column, encoder in pickles["encoders"].items():
+        assert list(artifacts.category_tables[column].lookup) == list(encoder.classes_)
+    assert np.array_equal(artifacts.feature_importances, pickles["rf"].feature_importances_)
+
+
+def test_bundle_predictions_identical_to_pickles(claims, pickles, bundle_path):
+    artifacts = load_model_bundle(bundle_path)
+    X = claims.astype(np.float32)
+
+    for compiled, name in ((artifacts.rf_compiled, "rf"), (artifacts.dt_compiled, "dt")):
+        assert np.array_equal(compiled.predict_proba(X), pickles[name].predict_proba(X)), name
+    assert np.array_equal(artifacts.xgb_compiled.predict_proba(X), compile_xgboost(pickles["xgb"]).predict_proba(X))
+    assert np.array_equal(artifacts.xgb_model.predict_proba(X), pickles["xgb"].predict_proba(X))
+    assert np.array_equal(artifacts.anomaly_model.decision_function(X), pickles["anomaly_model"].decision_function(X))
+
+
+def test_api_scores_bundle_like_pickles(api, claim_records, bundle_path):
+    claims = [api.ClaimInput(**row) for row in claim_records[:300]]
+    from_bundle = api.load_bundle_models(bundle_path, "bundle")
+    assert api.active_models.source != bundle_path  # the fixture serves the pickles
+
+    expected = api.score_uncached(claims, models=api.active_models)
+    actual = api.score_uncached(claims, models=from_bundle)
+    for ours, theirs in zip(actual, expected):
+        assert ours.model_version == "bundle"
+        assert ours.model_dump(exclude={"model_version"}) == theirs.model_dump(exclude={"model_version"})
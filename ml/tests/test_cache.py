@@ -0,0 +1,118 @@
+import json
+
+import pytest
+from claimwatch_rules import RuleSet
+
+import cache
+from cache import PredictionCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Manually advanced time.monotonic() for cache.py"""
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_hit_returns_the_stored_result():
+    store = PredictionCache()
+    store.set_version("v1")
+    key = store.key(["a", 1.0], {"explanation"})
+    assert store.get(key) is None
+    store.put(key, "result", 10, "v1")
+    assert store.get(key) == "result"
+    assert (store.hits, store.misses) == (1, 1)
+    # Same values and groups under another version is another key
+    assert store.key(["a", 1.0], {"explanation"}, "v2") != key
+    assert store.key(["a", 1.0], {"anomaly"}) != key
+
+
+def test_version_switch_drops_entries_and_stale_puts():
+    store = PredictionCache()
+    store.set_version("v1")
+    key = store.key(["a"])
+    store.put(key, "old", 10, "v1")
+    store.set_version("v2")
+    assert store.get(key) is None and store.invalidations == 1
+    # A result scored by v1 that lands after the switch is not stored
+    store.put(key, "late", 10, "v1")
+    assert store.stats()["entries"] == 0
+
+
+def test_entries_expire_after_ttl(clock):
+    store = PredictionCache(ttl_seconds=60)
+    store.put(b"k", "result", 10)
+    clock[0] += 59
+    assert store.get(b"k") == "result"
+    clock[0] += 2
+    assert store.get(b"k") is None
+    assert store.expirations == 1 and store.stats()["entries"] == 0
+
+
+def test_least_recently_used_is_evicted_first():
+    store = PredictionCache(max_entries=2)
+    store.put(b"a", "A", 10)
+    store.put(b"b", "B", 10)
+    assert store.get(b"a") == "A"  # b is now the least recently used
+    store.put(b"c", "C", 10)
+    assert store.get(b"b") is None
+    assert (store.get(b"a"), store.get(b"c")) == ("A", "C")
+    assert store.evictions == 1
+
+
+def test_byte_budget_evicts_and_oversized_results_are_skipped():
+    store = PredictionCache(max_bytes=100)
+    store.put(b"a", "A", 60)
+    store.put(b"b", "B", 60)
+    assert store.get(b"a") is None and store.get(b"b") == "B"
+    store.put(b"huge", "H", 101)
+    assert store.get(b"huge") is None and store.stats()["bytes"] == 60
+
+
+def test_disabled_cache_stores_nothing():
+    store = PredictionCache(max_entries=0)
+    store.put(b"a", "A", 10)
+    assert not store.enabled and store.get(b"a") is None
+
+
+def cache_counts(api) -> tuple:
+    stats = api.prediction_cache.stats()
+    return stats["hits"], stats["misses"]
+
+
+def test_api_repeat_claim_is_a_hit(api, client, claim_records):
+    first = client.post("/predict", json=claim_records[0]).json()
+    hits, misses = cache_counts(api)
+    assert client.post("/predict", json=claim_records[0]).json() == first
+    assert cache_counts(api) == (hits + 1, misses)
+    # Other output fields are cached separately
+    client.post("/predict?fields=score", json=claim_records[0])
+    assert cache_counts(api)[1] > misses
+
+
+def test_api_model_swap_misses(api, client, claim_records, monkeypatch):
+    client.post("/predict", json=claim_records[0])
+    monkeypatch.setattr(api.active_models, "version", "swapped")
+    hits, _ = cache_counts(api)
+    output = client.post("/predict", json=claim_records[0]).json()
+    assert output["model_version"] == "swapped"
+    assert cache_counts(api)[0] == hits
+    assert api.prediction_cache.version.startswith("swapped+rules.")
+
+
+def test_api_rules_change_misses(api, client, claim_records, monkeypatch):
+    claim = {**claim_records[0], "incident_severity": "Major Damage"}
+    before = client.post("/predict", json=claim).json()
+    assert "Incident severity is Major Damage" in before["reasons"]
+
+    with open(api.heuristic_rules.path) as f:
+        table = json.load(f)
+    table["rules"][0]["reason"] = "Severe incident: {incident_severity}"
+    monkeypatch.setattr(api.heuristic_rules, "reload_interval", 0)
+    monkeypatch.setattr(api.heuristic_rules, "rules", RuleSet(table))
+
+    hits, _ = cache_counts(api)
+    after = client.post("/predict", json=claim).json()
+    assert cache_counts(api)[0] == hits
+    assert "Severe incident: Major Damage" in after["reasons"]
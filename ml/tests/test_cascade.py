@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from cascade import Cascade
+
+LOW, HIGH = 0.25, 0.75
+
+
+@pytest.fixture
+def claim_inputs(api, claim_records):
+    return [api.ClaimInput(**row) for row in claim_records[:300]]
+
+
+@pytest.fixture
+def screen_scores(api, claim_inputs, monkeypatch):
+    """tree+rules screen score per claim, computed without the cascade"""
+    monkeypatch.setattr(api, "cascade", Cascade("tree+rules", LOW, HIGH))
+    X, valid = api.active_models.feature_builder.transform_batch(claim_inputs)
+    assert valid.all()
+    return api.screen_claims(api.active_models, X, claim_inputs).ensemble_probability
+
+
+def test_split_and_counters():
+    cascade = Cascade("tree+rules", LOW, HIGH)
+    decided, escalated = cascade.split(np.array([0.1, 0.25, 0.5, 0.75, 0.9, 0.0]))
+    assert decided.tolist() == [0, 4, 5] and escalated.tolist() == [1, 2, 3]
+    assert cascade.stats() == {**cascade.stats(), "claims": 6, "decided_low": 2, "decided_high": 1, "escalated": 3, "screen_hit_rate": 0.5}
+
+    with pytest.raises(ValueError):
+        Cascade("forest")
+    with pytest.raises(ValueError):
+        Cascade("tree", low=0.8, high=0.2)
+
+
+def test_band_routes_claims(api, claim_inputs, screen_scores, monkeypatch):
+    monkeypatch.setattr(api, "cascade", None)
+    full = api.score_uncached(claim_inputs)
+
+    cascade = Cascade("tree+rules", LOW, HIGH)
+    monkeypatch.setattr(api, "cascade", cascade)
+    paths_before = api.predictions.snapshot()
+    scored = api.score_uncached(claim_inputs)
+    paths = {path: count - paths_before.get(path, 0) for path, count in api.predictions.snapshot().items()}
+
+    below = screen_scores < LOW
+    above = screen_scores > HIGH
+    inside = ~(below | above)
+    assert below.any() and above.any() and inside.any()
+
+    for i, output in enumerate(scored):
+        if inside[i]:
+            # Escalated claims get exactly the full ensemble answer
+            assert output == full[i], i
+        else:
+            assert output.probability == round(float(screen_scores[i]), 3), i
+            assert set(output.ensemble_votes) == {"DecisionTree", "Heuristic"}
+            assert output.explanation_method.startswith("Cascade Screen (DecisionTree + Heuristic): ")
+
+    stats = cascade.stats()
+    assert stats["claims"] == len(claim_inputs)
+    assert (stats["decided_low"], stats["decided_high"], stats["escalated"]) == (below.sum(), above.sum(), inside.sum())
+    assert stats["decided_low"] + stats["decided_high"] + stats["escalated"] == stats["claims"]
+    assert paths.get(("screen",), 0) == below.sum() + above.sum()
+    assert paths.get(("ml",), 0) == inside.sum()
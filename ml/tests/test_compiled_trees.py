@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from conftest import load_artifact
+from compiled_trees import CompiledBooster, CompiledForest, compile_trees, compile_xgboost
+
+
+@pytest.mark.parametrize("name", ["fraud_model.pkl", "dt_model.pkl"])
+def test_sklearn_trees_bit_identical(claims, tmp_path, name):
+    estimator = load_artifact(name)
+    compiled = compile_trees(estimator)
+    expected = estimator.predict_proba(claims)
+
+    assert np.array_equal(compiled.predict_proba(claims), expected)
+    assert np.array_equal(compiled.predict(claims), estimator.predict(claims))
+
+    path = str(tmp_path / "model.compiled.npz")
+    compiled.save(path)
+    assert np.array_equal(CompiledForest.load(path).predict_proba(claims), expected)
+
+
+def test_xgboost_within_float32_rounding(claims, tmp_path):
+    xgb_model = load_artifact("xgb_model.pkl")
+    compiled = compile_xgboost(xgb_model)
+    expected = xgb_model.predict_proba(claims)
+
+    # Margins are summed like xgboost; only the sigmoid rounds differently
+    assert np.allclose(compiled.predict_proba(claims), expected, rtol=0, atol=1e-6)
+
+    path = str(tmp_path / "xgb_model.compiled.npz")
+    compiled.save(path)
+    assert np.allclose(CompiledBooster.load(path).predict_proba(claims), expected, rtol=0, atol=1e-6)
@@ -0,0 +1,98 @@
+"""
+FeatureBuilder against the pandas path it replaced: a one-row DataFrame
+per claim, LabelEncoder.transform for the categoricals and
+scaler.transform(df[feature_names]), cast to float32 for the models.
+All three entry points must match it exactly on insurance_claims.csv.
+The old path raised on values training never saw ("?" is missing there,
+so those rows were dropped), so parity covers the rows it could encode.
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import CLAIMS_CSV, load_artifact
+from encoding import compile_encoders
+from features import FeatureBuilder
+
+
+@pytest.fixture(scope="module")
+def artifacts():
+    return load_artifact("feature_names.pkl"), load_artifact("scaler.pkl"), load_artifact("encoders.pkl")
+
+
+@pytest.fixture(scope="module")
+def builder(artifacts):
+    feature_names, scaler, encoders = artifacts
+    return FeatureBuilder(feature_names, scaler, compile_encoders(encoders))
+
+
+def reference_row(data, artifacts):
+    """The old DataFrame + scaler path for one claim, None where it raised"""
+    feature_names, scaler, encoders = artifacts
+    policy_bind = datetime.fromisoformat(data["policy_bind_date"])
+    incident = datetime.fromisoformat(data["incident_date"])
+    df = pd.DataFrame([{
+        **data,
+        "incident_location": data["incident_location"] or f"{data['incident_city']} Area",
+        "capital-gains": data["capital_gains"],
+        "capital-loss": data["capital_loss"],
+        "policy_bind_year": policy_bind.year,
+        "incident_year": incident.year,
+        "incident_month": incident.month,
+    }])
+    try:
+        for column, encoder in encoders.items():
+            df[column] = encoder.transform(df[column].astype(str))
+    except ValueError:
+        return None  # unseen label
+    return scaler.transform(df[feature_names].to_numpy())[0].astype(np.float32)
+
+
+@pytest.fixture(scope="module")
+def reference(claim_records, artifacts):
+    """(positions the old path could encode, their expected rows)"""
+    rows = [reference_row(record, artifacts) for record in claim_records]
+    positions = np.array([i for i, row in enumerate(rows) if row is not None])
+    assert len(positions) > 300
+    return positions, np.stack([rows[i] for i in positions])
+
+
+def test_transform_one_matches_pandas_path(builder, claim_records, reference):
+    positions, expected = reference
+    for i, row in zip(positions, expected):
+        X = builder.transform_one(SimpleNamespace(**claim_records[i]))
+        assert X.dtype == np.float32
+        np.testing.assert_array_equal(X[0], row, err_msg=f"claim {i}")
+
+
+def test_transform_batch_matches_pandas_path(builder, claim_records, reference):
+    positions, expected = reference
+    X, valid = builder.transform_batch([SimpleNamespace(**record) for record in claim_records])
+    assert valid.all()
+    np.testing.assert_array_equal(X[positions], expected)
+
+
+def test_transform_frame_matches_pandas_path(builder, claim_records, reference):
+    positions, expected = reference
+    X, valid = builder.transform_frame(pd.DataFrame(claim_records))
+    assert valid.all()
+    np.testing.assert_array_equal(X[positions], expected)
+
+    # insurance_claims.csv column names (capital-gains/capital-loss) work too
+    X, valid = builder.transform_frame(pd.read_csv(CLAIMS_CSV, keep_default_na=False))
+    assert valid.all()
+    np.testing.assert_array_equal(X[positions], expected)
+
+
+def test_bad_date_marks_row_invalid(builder, claim_records, reference):
+    positions, expected = reference
+    first = positions[:3]
+    claims = [SimpleNamespace(**claim_records[i]) for i in first]
+    claims[1].incident_date = "not a date"
+    X, valid = builder.transform_batch(claims)
+    assert valid.tolist() == [True, False, True]
+    np.testing.assert_array_equal(X[[0, 2]], expected[[0, 2]])
@@ -0,0 +1,93 @@
+"""
+ingest_claims() against the in-memory prepare() it replaced (model.py
+before c55b122): same rows dropped, same codes, labels and vocabularies,
+and full_scaler statistics equal to a StandardScaler fitted on the old X.
+A 37-row chunk size spreads the dropped rows and each column's
+categories over many chunks.
+"""
+
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from conftest import CLAIMS_CSV
+from ingest import LABEL_COLUMN, ingest_claims, read_chunks, source_columns
+
+
+def old_prepare(csv_path: str) -> dict:
+    """model.prepare() before the columnar cache, verbatim"""
+    df = pd.read_csv(csv_path)
+    df.drop(columns=['policy_number', '_c39'], inplace=True, errors='ignore')
+    df.replace('?', np.nan, inplace=True)
+    df.dropna(inplace=True)
+
+    df['policy_bind_date'] = pd.to_datetime(df['policy_bind_date'])
+    df['incident_date'] = pd.to_datetime(df['incident_date'])
+    df['policy_bind_year'] = df['policy_bind_date'].dt.year
+    df['incident_year'] = df['incident_date'].dt.year
+    df['incident_month'] = df['incident_date'].dt.month
+    df.drop(columns=['policy_bind_date', 'incident_date'], inplace=True)
+
+    df['fraud_reported'] = df['fraud_reported'].map({'Y': 1, 'N': 0})
+
+    encoders = {}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # pandas 3: 'object' still selects str columns
+        categorical = df.select_dtypes(include='object').columns
+    for col in categorical:
+        le = LabelEncoder()
+        df[col] = le.fit_transform(df[col])
+        encoders[col] = le
+
+    X = df.drop('fraud_reported', axis=1)
+    return {"X": X, "y": df['fraud_reported'], "encoders": encoders, "feature_names": list(X.columns)}
+
+
+@pytest.fixture(scope="module")
+def old():
+    return old_prepare(CLAIMS_CSV)
+
+
+@pytest.mark.parametrize("chunk_size", [37, 100000])
+def test_ingest_matches_old_prepare(old, tmp_path, chunk_size):
+    info = ingest_claims(CLAIMS_CSV, str(tmp_path), chunk_size)
+    X = old["X"]
+
+    # Dropped rows: the same claims survive, in file order
+    assert info["rows"] == len(X) < 1000
+    assert info["feature_names"] == old["feature_names"]
+    assert set(info["encoders"]) == set(old["encoders"])
+    for column, encoder in old["encoders"].items():
+        assert info["encoders"][column].classes_.tolist() == encoder.classes_.tolist(), column
+
+    for name in info["feature_names"]:
+        # int32 codes and integers, float32 amounts (policy_annual_premium)
+        codes = np.load(os.path.join(tmp_path, f"{name}.npy"))
+        np.testing.assert_array_equal(codes, X[name].to_numpy().astype(codes.dtype), err_msg=name)
+    labels = np.load(os.path.join(tmp_path, f"{LABEL_COLUMN}.npy"))
+    np.testing.assert_array_equal(labels, old["y"].to_numpy())
+
+    full_scaler = StandardScaler().fit(X)
+    assert info["full_scaler"].n_samples_seen_ == len(X)
+    np.testing.assert_allclose(info["full_scaler"].mean_, full_scaler.mean_, rtol=1e-9)
+    np.testing.assert_allclose(info["full_scaler"].scale_, full_scaler.scale_, rtol=1e-6)
+
+
+def test_small_chunks_split_rows_and_categories(old):
+    """The 37-row case above really exercises cross-chunk state"""
+    chunks = list(read_chunks(CLAIMS_CSV, source_columns(CLAIMS_CSV), 37))
+    assert len(chunks) == 28
+    dropped = [int(chunk.isna().any(axis=1).sum()) for chunk in chunks]
+    assert sum(1 for n in dropped if n) > 20
+
+    # These vocabularies are spread over several chunks: no chunk sees all
+    # of them, and some categories first appear after the first chunk
+    for column in ("insured_hobbies", "auto_model", "incident_location"):
+        classes = set(old["encoders"][column].classes_)
+        seen = [set(chunk[column].dropna()) for chunk in chunks]
+        assert not any(classes <= s for s in seen), column
+        assert classes - seen[0], column
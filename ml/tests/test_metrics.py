@@ -0,0 +1,77 @@
+import math
+import re
+from collections import defaultdict
+
+# name{label="value",...} value   (text exposition format 0.0.4)
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(?:[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*",?)*\})? (\S+)$')
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+HISTOGRAM_SUFFIXES = ("_bucket", "_sum", "_count")
+
+
+def parse_exposition(text: str) -> dict:
+    """
+    {(name, sorted label pairs): value}, asserting the text is well formed:
+    every sample follows HELP/TYPE for its family and histogram buckets
+    are cumulative up to le="+Inf" == _count
+    """
+    assert text.endswith("\n")
+    types, helped, samples = {}, set(), {}
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            helped.add(line.split(" ", 3)[2])
+        elif line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            assert kind in ("counter", "gauge", "histogram", "summary", "untyped"), line
+            assert name in helped and name not in types, line
+            types[name] = kind
+        else:
+            match = SAMPLE.match(line)
+            assert match, f"malformed sample: {line!r}"
+            name, labels, value = match.group(1), match.group(2) or "", match.group(3)
+            family = name
+            if name not in types:
+                family = next((name[:-len(s)] for s in HISTOGRAM_SUFFIXES if name.endswith(s)), name)
+                assert types.get(family) == "histogram", f"sample before its TYPE: {line!r}"
+            key = (name, tuple(sorted(LABEL.findall(labels))))
+            assert key not in samples, f"duplicate sample: {line!r}"
+            samples[key] = float(value)
+
+    buckets = defaultdict(list)
+    for (name, labels), value in samples.items():
+        if name.endswith("_bucket"):
+            le = dict(labels)["le"]
+            series = (name[:-len("_bucket")], tuple(pair for pair in labels if pair[0] != "le"))
+            buckets[series].append((math.inf if le == "+Inf" else float(le), value))
+    for (family, labels), series in buckets.items():
+        counts = [count for _, count in sorted(series)]
+        assert counts == sorted(counts), family
+        assert sorted(series)[-1][0] == math.inf
+        assert counts[-1] == samples[(f"{family}_count", labels)], family
+    return samples
+
+
+def stage_counts(client) -> dict:
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = parse_exposition(response.text)
+    return {
+        dict(labels)["stage"]: value
+        for (name, labels), value in samples.items() if name == "claimwatch_stage_seconds_count"
+    }, samples
+
+
+def test_metrics_exposition_and_stage_histograms(api, client, claim_records):
+    before, _ = stage_counts(client)
+    assert client.post("/predict", json=claim_records[3]).status_code == 200
+    after, samples = stage_counts(client)
+
+    for stage in ("features", "scaling", "ensemble", "anomaly", "explanation", "response"):
+        assert after.get(stage, 0) > before.get(stage, 0), stage
+
+    requests = {
+        dict(labels)["path"]: value
+        for (name, labels), value in samples.items() if name == "claimwatch_http_request_seconds_count"
+    }
+    assert requests.get("/predict", 0) >= 1
+    assert samples[("claimwatch_model_info", (("mode", "ml"), ("source", api.active_models.source), ("version", api.active_models.version)))] == 1
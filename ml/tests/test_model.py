@@ -0,0 +1,81 @@
+"""
+model.py end to end on insurance_claims.csv, in a scratch directory:
+stage cache hits on re-runs, registry publishing and the --svm choice.
+Forests are kept small so a cold run takes seconds.
+"""
+
+import json
+import sys
+
+import pytest
+
+import model
+from conftest import CLAIMS_CSV
+from registry import ModelRegistry
+
+SMALL = ["--set", "rf.n_estimators=10", "--set", "rf_final.n_estimators=10",
+         "--set", "xgb.n_estimators=10", "--set", "anomaly.n_estimators=20"]
+MODEL_STAGES = {f"model-{name}" for name in model.MODELS}
+
+
+@pytest.fixture
+def train(tmp_path, monkeypatch):
+    """Run model.main() with extra arguments; returns this run's runs.jsonl record"""
+    monkeypatch.chdir(tmp_path)  # pickles, bundle and registry land here
+    cache_dir = str(tmp_path / "train_cache")
+
+    def run(*args: str) -> dict:
+        monkeypatch.setattr(sys, "argv", ["model.py", "--csv", CLAIMS_CSV, "--cache-dir", cache_dir, "--cores", "1", *SMALL, *args])
+        model.main()
+        with open(tmp_path / "train_cache" / "runs.jsonl") as f:
+            return json.loads(f.readlines()[-1])
+
+    return run
+
+
+def cached(run: dict) -> dict:
+    return {row["stage"]: row["cached"] for row in run["stages"] if row["stage"] not in ("train", "evaluate", "artifacts")}
+
+
+def test_warm_rerun_hits_the_cache_and_set_retrains_one_model(train):
+    cold = train()
+    assert cached(cold) == dict.fromkeys({"prepare", "split", *MODEL_STAGES}, False)
+
+    warm = train()
+    assert cached(warm) == dict.fromkeys({"prepare", "split", *MODEL_STAGES}, True)
+    assert warm["registry_version"] == cold["registry_version"]  # identical bundle bytes
+
+    changed = train("--set", "dt.max_depth=4")
+    assert cached(changed) == {**dict.fromkeys({"prepare", "split", *MODEL_STAGES}, True), "model-dt": False}
+    assert changed["registry_version"] != cold["registry_version"]
+
+
+def test_publishes_without_activating_unless_asked(train):
+    registry = ModelRegistry()
+    first = train()
+    assert not first["activated"]
+    assert registry.current() is None and first["registry_version"] in registry.versions()
+
+    second = train("--set", "dt.max_depth=4", "--activate")
+    assert second["activated"] and registry.current() == second["registry_version"]
+
+
+def test_svm_auto_switches_at_exact_max_rows(train, monkeypatch):
+    monkeypatch.setattr(model, "SVM_EXACT_MAX_ROWS", 10**9)
+    first = train()
+    rows = first["train_rows"]
+    assert first["svm"] == "exact"
+
+    monkeypatch.setattr(model, "SVM_EXACT_MAX_ROWS", rows)
+    at_limit = train()
+    assert at_limit["svm"] == "exact" and cached(at_limit)["model-svm"]
+
+    monkeypatch.setattr(model, "SVM_EXACT_MAX_ROWS", rows - 1)
+    above = train()
+    assert above["svm"] == "rff" and not cached(above)["model-svm"]
+    assert all(hit for stage, hit in cached(above).items() if stage != "model-svm")
+
+    # --svm overrides the row count either way
+    assert train("--svm", "exact")["svm"] == "exact"
+    monkeypatch.setattr(model, "SVM_EXACT_MAX_ROWS", 10**9)
+    assert train("--svm", "rff")["svm"] == "rff"
@@ -0,0 +1,106 @@
+"""
+predict.py --resume: a run interrupted after N chunks (with the next chunk
+already written but not checkpointed) and then resumed must leave exactly
+the output of an uninterrupted run.
+"""
+
+import argparse
+import os
+
+import pandas as pd
+import pytest
+
+import predict
+from conftest import CLAIMS_CSV
+
+CHUNK_SIZE = 128  # 8 chunks of insurance_claims.csv
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def scorer(api, monkeypatch):
+    monkeypatch.setattr(predict, "api", api)
+
+
+@pytest.fixture(scope="module")
+def ndjson_input(tmp_path_factory) -> str:
+    path = str(tmp_path_factory.mktemp("input") / "claims.ndjson")
+    pd.read_csv(CLAIMS_CSV, keep_default_na=False).to_json(path, orient="records", lines=True)
+    return path
+
+
+def run(input_path: str, output: str, workers: int, explain: bool, resume: bool = False) -> None:
+    predict.score_file(argparse.Namespace(
+        input=input_path, output=output, format=None, output_format=None,
+        chunk_size=CHUNK_SIZE, workers=workers, explain=explain, resume=resume
+    ))
+
+
+def read_output(path: str, fmt: str) -> pd.DataFrame:
+    if fmt == "parquet":
+        parts = sorted(os.listdir(path))
+        return pd.concat([pd.read_parquet(os.path.join(path, part)) for part in parts], ignore_index=True)
+    if fmt == "csv":
+        return pd.read_csv(path, keep_default_na=False)
+    return pd.read_json(path, lines=True, dtype=False)
+
+
+@pytest.mark.parametrize("fmt", ["csv", "ndjson", "parquet"])
+@pytest.mark.parametrize("workers, explain", [(1, False), (2, True)])
+def test_resume_matches_uninterrupted_run(scorer, tmp_path, monkeypatch, ndjson_input, fmt, workers, explain):
+    if fmt == "parquet":
+        pytest.importorskip("pyarrow")
+    input_path = ndjson_input if fmt == "ndjson" else CLAIMS_CSV
+    suffix = {"csv": ".csv", "ndjson": ".ndjson", "parquet": ".parquet"}[fmt]
+    complete = str(tmp_path / f"complete{suffix}")
+    resumed = str(tmp_path / f"resumed{suffix}")
+    run(input_path, complete, workers, explain)
+
+    # Die right after writing chunk 4, before its checkpoint is saved
+    write = predict.ResultWriter.write
+
+    def interrupted_write(self, scores):
+        position = write(self, scores)
+        if self.parts == 4:
+            raise Interrupted()
+        return position
+
+    monkeypatch.setattr(predict.ResultWriter, "write", interrupted_write)
+    with pytest.raises(Interrupted):
+        run(input_path, resumed, workers, explain)
+    monkeypatch.setattr(predict.ResultWriter, "write", write)
+
+    checkpoint = f"{resumed}.checkpoint"
+    assert os.path.exists(checkpoint)
+    run(input_path, resumed, workers, explain, resume=True)
+    assert not os.path.exists(checkpoint)
+
+    expected = read_output(complete, fmt)
+    assert len(expected) == 1000 and expected["row_id"].tolist() == list(range(1000))
+    pd.testing.assert_frame_equal(read_output(resumed, fmt), expected)
+    if fmt != "parquet":
+        with open(complete, "rb") as a, open(resumed, "rb") as b:
+            assert a.read() == b.read()
+
+
+def test_resume_rejects_a_different_run(scorer, tmp_path):
+    output = str(tmp_path / "scores.csv")
+    run(CLAIMS_CSV, output, 1, False)
+    predict.save_checkpoint(f"{output}.checkpoint", {"input": "/elsewhere.csv", "explain": False, "rows": 128, "parts": 1, "bytes": 10})
+    with pytest.raises(SystemExit):
+        run(CLAIMS_CSV, output, 1, False, resume=True)
+
+
+def test_parquet_resume_ignores_stray_part_files(tmp_path):
+    directory = tmp_path / "scores.parquet"
+    directory.mkdir()
+    names = ["part-00000.parquet", "part-00001.parquet", "part-00002.parquet", "part-00010.parquet",
+             "part-notes.txt", "part-.parquet", "part-00003.parquet.tmp"]
+    for name in names:
+        (directory / name).write_bytes(b"")
+
+    predict.ResultWriter(str(directory), "parquet", {"parts": 2})
+    assert sorted(os.listdir(directory)) == sorted(set(names) - {"part-00002.parquet", "part-00010.parquet"})
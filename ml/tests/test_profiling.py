@@ -0,0 +1,41 @@
+import pytest
+
+TOKEN = "secret"
+HEADER = {"X-Profile": "1"}
+ADMIN = {"X-Admin-Token": TOKEN}
+
+
+@pytest.mark.parametrize("admin_token, sample_rate, draw, headers, query, status, profiled", [
+    # Profiling off: the header is ignored
+    ("", 0.0, 0.0, HEADER, "", 200, False),
+    # Sampling only: the header is ignored, not rejected, and sampling decides
+    ("", 0.5, 0.9, HEADER, "", 200, False),
+    ("", 0.5, 0.9, {**HEADER, **ADMIN}, "", 200, False),
+    ("", 0.5, 0.1, {}, "", 200, True),
+    # Admin token: the header needs the token
+    (TOKEN, 0.0, 0.0, {**HEADER, **ADMIN}, "", 200, True),
+    (TOKEN, 0.0, 0.0, {}, "?profile=1", 401, False),
+    (TOKEN, 0.0, 0.0, {"X-Admin-Token": TOKEN}, "?profile=1", 200, True),
+    (TOKEN, 0.0, 0.0, HEADER, "", 401, False),
+    (TOKEN, 0.0, 0.0, {**HEADER, "X-Admin-Token": "wrong"}, "", 401, False),
+    (TOKEN, 0.0, 0.0, {}, "", 200, False),
+    # Both: the header or a sample
+    (TOKEN, 0.5, 0.9, {**HEADER, **ADMIN}, "", 200, True),
+    (TOKEN, 0.5, 0.9, {}, "", 200, False),
+    (TOKEN, 0.5, 0.1, {}, "", 200, True),
+])
+def test_profile_header_per_mode(api, client, claim_records, monkeypatch,
+                                 admin_token, sample_rate, draw, headers, query, status, profiled):
+    monkeypatch.setattr(api, "ADMIN_TOKEN", admin_token)
+    monkeypatch.setattr(api, "PROFILE_SAMPLE_RATE", sample_rate)
+    monkeypatch.setattr(api, "profiling_enabled", bool(admin_token) or sample_rate > 0)
+    monkeypatch.setattr(api.random, "random", lambda: draw)
+
+    response = client.post(f"/predict{query}", json=claim_records[5], headers=headers)
+    assert response.status_code == status, response.text
+    assert ("X-Profile-Id" in response.headers) == profiled
+    if status == 200:
+        # Profiling never changes the answer
+        assert response.json() == client.post("/predict", json=claim_records[5]).json()
+    if profiled:
+        assert api.profiles.get(response.headers["X-Profile-Id"]) is not None
@@ -0,0 +1,211 @@
+"""
+Registry hot-swap: two published bundles (the shipped models, and the same
+set with a 50-tree RandomForest) behind the admin endpoints and the
+registry watcher.
+"""
+
+import copy
+import os
+import threading
+import time
+
+import pytest
+
+from bundle import save_model_bundle
+from conftest import load_artifact
+from registry import ModelRegistry
+
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+@pytest.fixture(scope="module")
+def bundles(tmp_path_factory):
+    """Paths of two bundles that score differently"""
+    directory = tmp_path_factory.mktemp("bundles")
+    artifacts = {
+        "rf": load_artifact("fraud_model.pkl"),
+        "dt": load_artifact("dt_model.pkl"),
+        "xgb": load_artifact("xgb_model.pkl"),
+        "scaler": load_artifact("scaler.pkl"),
+        "feature_names": load_artifact("feature_names.pkl"),
+        "encoders": load_artifact("encoders.pkl"),
+        "anomaly_model": load_artifact("anomaly_model.pkl")
+    }
+    small_rf = copy.deepcopy(artifacts["rf"])
+    small_rf.estimators_ = small_rf.estimators_[:50]
+    small_rf.n_estimators = 50
+
+    paths = [str(directory / "full.cwb"), str(directory / "small.cwb")]
+    save_model_bundle(paths[0], **artifacts)
+    save_model_bundle(paths[1], **{**artifacts, "rf": small_rf})
+    return paths
+
+
+@pytest.fixture
+def registry(api, bundles, tmp_path, monkeypatch):
+    """A tmp registry with both bundles published (none active), served by api"""
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    registry.v1 = registry.publish(bundles[0])
+    registry.v2 = registry.publish(bundles[1])
+    assert registry.v1 != registry.v2
+
+    monkeypatch.setattr(api, "registry", registry)
+    monkeypatch.setattr(api, "ADMIN_TOKEN", "secret")
+    # Swaps rebind these globals; monkeypatch puts the originals back
+    monkeypatch.setattr(api, "active_models", api.active_models)
+    monkeypatch.setattr(api, "previous_models", api.previous_models)
+    return registry
+
+
+def publish_broken(registry: ModelRegistry) -> str:
+    """A registry version whose bundle file can't be loaded"""
+    version = "20000101-000000-broken00"
+    os.makedirs(os.path.dirname(registry.bundle_path(version)))
+    with open(registry.bundle_path(version), "wb") as f:
+        f.write(b"not a bundle")
+    return version
+
+
+def registry_state(registry: ModelRegistry) -> tuple:
+    return registry.current(), registry.history()
+
+
+def serving_when_recorded(api, registry, monkeypatch) -> list:
+    """Version active in api at each registry write"""
+    seen = []
+    for name in ("activate", "rollback"):
+        write = getattr(registry, name)
+
+        def recorded(*args, write=write):
+            seen.append(api.active_models.version)
+            return write(*args)
+
+        monkeypatch.setattr(registry, name, recorded)
+    return seen
+
+
+def test_activate_switches_then_records(api, client, registry, claim_records, monkeypatch):
+    seen = serving_when_recorded(api, registry, monkeypatch)
+    for version in (registry.v1, registry.v2):
+        response = client.post(f"/admin/models/activate?version={version}", headers=ADMIN)
+        assert response.status_code == 200, response.text
+        assert response.json()["active"] == version
+        assert client.post("/predict", json=claim_records[0]).json()["model_version"] == version
+
+    assert seen == [registry.v1, registry.v2]  # the registry moved only once the set was live
+    assert registry_state(registry) == (registry.v2, [registry.v1, registry.v2])
+    assert client.post("/admin/models/activate?version=nope", headers=ADMIN).status_code == 404
+
+
+def test_rollback_switches_then_records(api, client, registry, monkeypatch):
+    for version in (registry.v1, registry.v2):
+        client.post(f"/admin/models/activate?version={version}", headers=ADMIN)
+    seen = serving_when_recorded(api, registry, monkeypatch)
+
+    response = client.post("/admin/models/rollback", headers=ADMIN)
+    assert response.status_code == 200, response.text
+    assert response.json() == {**response.json(), "active": registry.v1, "previous": registry.v2}
+    assert api.active_models.version == registry.v1
+    assert seen == [registry.v1]
+    assert registry_state(registry) == (registry.v1, [registry.v1])
+
+    assert client.post("/admin/models/rollback", headers=ADMIN).status_code == 409
+
+
+def test_failed_load_keeps_old_set_and_registry(api, client, registry, claim_records):
+    client.post(f"/admin/models/activate?version={registry.v1}", headers=ADMIN)
+    broken = publish_broken(registry)
+    before = registry_state(registry)
+
+    response = client.post(f"/admin/models/activate?version={broken}", headers=ADMIN)
+    assert response.status_code == 500
+    assert api.active_models.version == registry.v1
+    assert registry_state(registry) == before
+    assert client.post("/predict", json=claim_records[0]).json()["model_version"] == registry.v1
+
+    # Rolling back onto a broken version fails the same way
+    registry.activate(broken)
+    registry.activate(registry.v1)
+    before = registry_state(registry)
+    assert client.post("/admin/models/rollback", headers=ADMIN).status_code == 500
+    assert api.active_models.version == registry.v1
+    assert registry_state(registry) == before
+
+
+def test_swaps_do_not_drop_in_flight_requests(api, registry, claim_records):
+    claims = [api.ClaimInput(**row) for row in claim_records[:20]]
+    api.switch_models(registry.v1)
+    expected = {registry.v1: api.score_uncached(claims, models=api.active_models)}
+    api.switch_models(registry.v2)
+    expected[registry.v2] = api.score_uncached(claims, models=api.active_models)
+    assert [o.probability for o in expected[registry.v1]] != [o.probability for o in expected[registry.v2]]
+
+    # A request that picked up a set finishes on it after a swap
+    holding = api.active_models
+    api.switch_models(registry.v1)
+    assert api.score_uncached(claims, models=holding) == expected[registry.v2]
+
+    results, errors, stop = [], [], threading.Event()
+
+    def serve():
+        while not stop.is_set():
+            try:
+                results.append(api.score_claims(claims, check_cache=False))
+            except Exception as e:  # pragma: no cover - reported below
+                errors.append(e)
+
+    worker = threading.Thread(target=serve)
+    worker.start()
+    try:
+        for version in (registry.v2, registry.v1) * 3:
+            api.switch_models(version)
+            time.sleep(0.02)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert not errors and len(results) > 1
+    for outputs in results:
+        versions = {output.model_version for output in outputs}
+        assert len(versions) == 1  # one set per request, never mixed
+        assert outputs == expected[versions.pop()]
+
+
+class StopWatcher(BaseException):
+    pass
+
+
+def test_watcher_survives_unreadable_current(api, registry, monkeypatch):
+    broken = publish_broken(registry)
+    # What CURRENT holds on each pass: unreadable twice, a version that
+    # can't load (tried once), then a good one
+    script = [OSError("CURRENT half-written"), OSError("CURRENT missing"), broken, broken, broken, registry.v2]
+    passes = []
+
+    def current():
+        step = script[min(len(passes), len(script)) - 1]
+        if isinstance(step, Exception):
+            raise step
+        return step
+
+    def sleep(seconds):
+        if len(passes) == len(script) + 1:
+            raise StopWatcher()
+        passes.append(seconds)
+
+    loads = []
+    load_bundle_models = api.load_bundle_models
+
+    def counting_load(path, *args):
+        loads.append(path)
+        return load_bundle_models(path, *args)
+
+    monkeypatch.setattr(registry, "current", current)
+    monkeypatch.setattr(api, "load_bundle_models", counting_load)
+    monkeypatch.setattr(api.time, "sleep", sleep)
+    with pytest.raises(StopWatcher):
+        api.watch_registry(1.0)
+
+    assert api.active_models.version == registry.v2
+    assert loads == [registry.bundle_path(broken), registry.bundle_path(registry.v2)]
+    assert ModelRegistry(registry.root).current() is None  # following never writes the registry
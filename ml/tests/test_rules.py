@@ -0,0 +1,195 @@
+"""
+The shared rule table against the three inline heuristics it replaced
+(backend/ml-api/app.py, ml/app.py and app_explainable.heuristic_predict /
+generate_reasons before 2d4ad95), scored on every claim in
+insurance_claims.csv. Differences are the documented ones only.
+"""
+
+import importlib.util
+import os
+
+import pandas as pd
+import pytest
+from claimwatch_rules import RuleEngine
+
+from conftest import CLAIMS_CSV, ML_DIR
+
+BACKEND_APP = os.path.join(ML_DIR, "..", "backend", "ml-api", "app.py")
+
+# The old if-chains, rule by rule: (weight, confidence step, predicate)
+RISKY_JOBS = {"exec-managerial", "prof-specialty", "sales", "armed-forces"}
+RISKY_HOBBIES = {"skydiving", "base-jumping", "bungie-jumping", "yachting", "polo", "cross-fit"}
+LEGACY_RULES = {
+    "high_coverage_limit": (10, 0.05, lambda d: d.policy_csl in {"500/1000", "250/500"}),
+    "risky_occupation": (10, 0.05, lambda d: d.insured_occupation in RISKY_JOBS),
+    "risky_hobby": (15, 0.07, lambda d: d.insured_hobbies in RISKY_HOBBIES),
+    "severe_incident": (25, 0.10, lambda d: d.incident_severity in {"Total Loss", "Major Damage"}),
+    "high_risk_incident_type": (15, 0.07, lambda d: d.incident_type in {"Multi-vehicle Collision", "Vehicle Theft"}),
+    "unknown_collision_type": (10, 0.05, lambda d: d.collision_type == "?"),
+    "damage_without_police_report": (15, 0.07, lambda d: d.property_damage == "Yes" and d.police_report_available == "No"),
+    "fraud_already_reported": (20, 0.10, lambda d: getattr(d, "fraud_reported", None) == "Yes"),
+    "high_claim_amount": (20, 0.10, lambda d: d.total_claim_amount > 20000),
+    "no_witnesses": (5, 0.03, lambda d: d.witnesses == 0),
+    "many_vehicles": (5, 0.03, lambda d: d.number_of_vehicles_involved > 2),
+    "large_claim_component": (10, 0.05, lambda d: d.injury_claim > 10000 or d.property_claim > 10000 or d.vehicle_claim > 15000),
+}
+# ml/app.py had no fraud-reported rule, heuristic_predict no large-claim rule
+APP_RULES = [name for name in LEGACY_RULES if name != "fraud_already_reported"]
+FALLBACK_RULES = [name for name in LEGACY_RULES if name != "large_claim_component"]
+
+
+def legacy_score(data, names) -> int:
+    return max(0, min(100, sum(LEGACY_RULES[name][0] for name in names if LEGACY_RULES[name][2](data))))
+
+
+def legacy_confidence(data, names) -> float:
+    return min(0.85, 0.5 + sum(LEGACY_RULES[name][1] for name in names if LEGACY_RULES[name][2](data)))
+
+
+def fires(data, name) -> bool:
+    return LEGACY_RULES[name][2](data)
+
+
+def backend_reasons(d) -> list:
+    reasons = []
+    if fires(d, "severe_incident"):
+        reasons.append(f"Incident severity is {d.incident_severity}")
+    if fires(d, "risky_hobby"):
+        reasons.append(f"Risky hobby: {d.insured_hobbies}")
+    if fires(d, "high_risk_incident_type"):
+        reasons.append(f"High-risk incident type: {d.incident_type}")
+    if fires(d, "damage_without_police_report"):
+        reasons.append("Property damage without police report")
+    if fires(d, "fraud_already_reported"):
+        reasons.append("Fraud already reported flag is Yes")
+    return reasons
+
+
+def app_reasons(d) -> list:
+    reasons = []
+    if fires(d, "severe_incident"):
+        reasons.append(f"Incident severity is {d.incident_severity}")
+    if fires(d, "risky_hobby"):
+        reasons.append(f"Risky hobby: {d.insured_hobbies}")
+    if fires(d, "high_risk_incident_type"):
+        reasons.append(f"High-risk incident type: {d.incident_type}")
+    if fires(d, "damage_without_police_report"):
+        reasons.append("Property damage without police report")
+    if fires(d, "high_claim_amount"):
+        reasons.append(f"High claim amount: ${d.total_claim_amount}")
+    return reasons or ["No strong fraud indicators"]
+
+
+def app_factors(d) -> list:
+    factors = []
+    if fires(d, "severe_incident"):
+        factors.append({"feature": f"Incident Severity ({d.incident_severity})", "importance": 0.25})
+    if fires(d, "risky_hobby"):
+        factors.append({"feature": f"Risky Hobby ({d.insured_hobbies})", "importance": 0.15})
+    if fires(d, "high_claim_amount"):
+        factors.append({"feature": f"High Claim Amount (${d.total_claim_amount})", "importance": 0.20})
+    if fires(d, "damage_without_police_report"):
+        factors.append({"feature": "Property Damage without Police Report", "importance": 0.15})
+    return factors
+
+
+def explanation_reasons(d) -> list:
+    """generate_reasons()' feature-based reasons before 8b2be24"""
+    reasons = []
+    if fires(d, "risky_hobby"):
+        reasons.append(f"Risky hobby identified: {d.insured_hobbies}")
+    if fires(d, "severe_incident"):
+        reasons.append(f"High-severity incident: {d.incident_severity}")
+    if fires(d, "damage_without_police_report"):
+        reasons.append("Property damage reported but no police report available")
+    if fires(d, "fraud_already_reported"):
+        reasons.append("Fraud already reported by claimant")
+    if fires(d, "high_claim_amount"):
+        reasons.append(f"High claim amount: ${d.total_claim_amount}")
+    if fires(d, "high_risk_incident_type"):
+        reasons.append(f"High-risk incident type: {d.incident_type}")
+    return reasons
+
+
+# 8b2be24: generate_reasons() took the table's wording, in table order
+REWORDED = {
+    "Risky hobby identified: ": "Risky hobby: ",
+    "High-severity incident: ": "Incident severity is ",
+    "Property damage reported but no police report available": "Property damage without police report",
+    "Fraud already reported by claimant": "Fraud already reported flag is Yes",
+}
+TABLE_ORDER = ["Incident severity", "Risky hobby", "High-risk incident type", "Property damage", "Fraud already", "High claim amount"]
+
+
+def reword(reasons: list) -> list:
+    for old, new in REWORDED.items():
+        reasons = [reason.replace(old, new) for reason in reasons]
+    return sorted(reasons, key=lambda reason: next(i for i, p in enumerate(TABLE_ORDER) if reason.startswith(p)))
+
+
+@pytest.fixture(scope="module")
+def backend():
+    spec = importlib.util.spec_from_file_location("backend_ml_api", BACKEND_APP)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="module")
+def light_api():
+    import app
+    return app
+
+
+def test_backend_matches_its_old_heuristic(backend, claim_records):
+    fired = set()
+    for row in claim_records:
+        data = backend.ClaimInput(**row)
+        output = backend.predict_claim(data)
+        prob = round(legacy_score(data, LEGACY_RULES) / 100.0, 2)
+        assert (output.probability, output.fraud, output.riskScore) == (prob, int(prob >= 0.5), int(round(prob * 100)))
+
+        # Documented change: the backend now lists "High claim amount" too
+        expected = backend_reasons(data) + ([f"High claim amount: ${data.total_claim_amount}"] if fires(data, "high_claim_amount") else [])
+        assert output.reasons == (expected or ["No strong fraud indicators"])
+        fired.update(name for name in LEGACY_RULES if fires(data, name))
+    # "Yes"/"No" literals never match the data's YES/NO/Y
+    assert fired == set(LEGACY_RULES) - {"damage_without_police_report", "fraud_already_reported"}
+
+
+def test_app_matches_its_old_heuristic(light_api, claim_records):
+    for row in claim_records:
+        data = light_api.ClaimInput(**row)
+        output = light_api.predict_claim(data)
+        prob = round(legacy_score(data, APP_RULES) / 100.0, 3)
+        assert (output.probability, output.fraud, output.riskScore) == (prob, int(prob >= 0.5), int(round(prob * 100)))
+        assert output.reasons == app_reasons(data)
+        # Documented change: factors are listed in table order
+        key = lambda factor: factor["feature"]
+        assert sorted(output.top_contributing_factors, key=key) == sorted(app_factors(data), key=key)
+
+
+def test_fallback_and_explanation_reasons(api, claim_records):
+    large_claims = 0
+    for row in claim_records:
+        data = api.ClaimInput(**row)
+        fraud, prob, info = api.heuristic_predict(data)
+        # Documented change: the fallback gained the large-claim rule (+10, +0.05)
+        large = fires(data, "large_claim_component")
+        large_claims += large
+        score = min(100, legacy_score(data, FALLBACK_RULES) + 10 * large)
+        assert prob == pytest.approx(score / 100.0)
+        assert fraud == int(score >= 50)
+        assert info["confidence"] == pytest.approx(min(0.85, legacy_confidence(data, FALLBACK_RULES) + 0.05 * large))
+
+        assert api.heuristic_rules.score([data]).reasons(0) == reword(explanation_reasons(data))
+    assert large_claims > 0
+
+
+def test_columnar_scores_match_per_claim(light_api, claim_records):
+    engine = RuleEngine(reload_interval=0)
+    df = pd.read_csv(CLAIMS_CSV, keep_default_na=False)
+    columnar = engine.score_columns(df)
+    batch = engine.score([light_api.ClaimInput(**row) for row in claim_records])
+    legacy = [legacy_score(light_api.ClaimInput(**row), APP_RULES) for row in claim_records]
+    assert columnar.score.tolist() == batch.score.tolist() == legacy
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from imblearn.over_sampling import SMOTE
+
+from conftest import CLAIMS_CSV
+from smote import ChunkedSMOTE, load_training_claims, recall
+
+
+@pytest.fixture(scope="module")
+def training_claims(tmp_path_factory):
+    """Unscaled claims features and labels, as model.py's split oversamples them"""
+    return load_training_claims(CLAIMS_CSV, str(tmp_path_factory.mktemp("smote_columns")))
+
+
+def multiclass(seed: int = 0):
+    rng = np.random.default_rng(seed)
+    y = np.repeat([0, 1, 2, 3], [150, 40, 70, 25])
+    return rng.normal(size=(len(y), 6)), y
+
+
+def assert_same(a, b):
+    np.testing.assert_array_equal(a[0], b[0])
+    np.testing.assert_array_equal(a[1], b[1])
+
+
+@pytest.mark.parametrize("block_bytes", [32 << 20, 4096])
+def test_matches_imblearn_on_claims(training_claims, block_bytes):
+    X, y = training_claims
+    expected = SMOTE(random_state=42).fit_resample(X, y)
+    assert_same(ChunkedSMOTE(random_state=42, block_bytes=block_bytes).fit_resample(X, y), expected)
+
+
+@pytest.mark.parametrize("random_state", [42, "instance"])
+def test_matches_imblearn_on_several_classes(random_state):
+    # An int seed restarts imblearn's stream for every class; a
+    # RandomState instance is shared by all of them
+    X, y = multiclass()
+    seed = lambda: np.random.RandomState(7) if random_state == "instance" else random_state
+    expected = SMOTE(random_state=seed()).fit_resample(X, y)
+    resampled = ChunkedSMOTE(random_state=seed()).fit_resample(X, y)
+    assert_same(resampled, expected)
+    assert np.bincount(resampled[1]).tolist() == [150] * 4
+
+
+def test_approximate_search_recall():
+    # Minority class above n_probe * cell_size rows: the k-means path
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(15000, 10)).astype(np.float32)
+    y = np.repeat([0, 1], [9000, 6000])
+    sampler = ChunkedSMOTE(random_state=42)
+    assert 6000 > sampler.n_probe * sampler.cell_size
+    assert len(sampler.tasks(X[y == 1])) > 1
+    assert recall(X, y) > 0.8  # 0.888 here
+
+    X_res, y_res = sampler.fit_resample(X, y)
+    assert np.bincount(y_res).tolist() == [9000, 9000]
+    np.testing.assert_array_equal(X_res[:len(X)], X)
@@ -0,0 +1,55 @@
+import json
+
+
+def chunked(body: bytes, size: int = 700):
+    """The upload in odd-sized pieces, so lines straddle chunks"""
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+def test_stream_mixes_results_and_line_errors_in_order(api, client, claim_records, monkeypatch):
+    monkeypatch.setattr(api, "STREAM_BATCH_SIZE", 3)
+    monkeypatch.setattr(api, "STREAM_MAX_LINE_BYTES", 4096)
+    claims = claim_records[20:27]
+    missing_field = {k: v for k, v in claims[2].items() if k != "incident_date"}
+
+    lines = [
+        json.dumps(claims[0]),
+        "{not json",
+        json.dumps(claims[1]),
+        "",  # blank lines are skipped but still counted
+        json.dumps(missing_field),
+        "[1, 2, 3]",
+        json.dumps({**claims[3], "padding": "x" * 10000}),  # over STREAM_MAX_LINE_BYTES
+        json.dumps(claims[4]),
+        json.dumps(claims[5]),
+        json.dumps(claims[6]),  # last line without a trailing newline
+    ]
+    response = client.post("/predict/stream", content=chunked("\n".join(lines).encode()))
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    items = [json.loads(line) for line in response.text.splitlines()]
+
+    assert [item["index"] for item in items] == [0, 1, 2, 4, 5, 6, 7, 8, 9]
+    errors = {item["index"]: item["error"] for item in items if "error" in item}
+    assert set(errors) == {1, 4, 5, 6}
+    assert errors[1].startswith("Invalid JSON")
+    assert "incident_date" in errors[4]
+    assert "expected a JSON object" in errors[5]
+    assert errors[6] == "Line longer than 4096 bytes"
+
+    # Valid lines score exactly like /predict/batch
+    valid = [claims[0], claims[1], claims[4], claims[5], claims[6]]
+    batch = client.post("/predict/batch", json={"claims": valid}).json()
+    streamed = [item["prediction"] for item in items if "prediction" in item]
+    assert streamed == [item["prediction"] for item in batch["results"]]
+
+
+def test_stream_fields_and_empty_body(client, claim_records):
+    body = (json.dumps(claim_records[0]) + "\n").encode()
+    item = json.loads(client.post("/predict/stream?fields=score", content=body).text)
+    assert item["index"] == 0
+    assert set(item["prediction"]) == {"fraud", "probability", "riskScore", "status", "confidence", "model_version"}
+
+    response = client.post("/predict/stream", content=b"")
+    assert response.status_code == 200 and response.text == ""